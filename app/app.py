@@ -1,6 +1,9 @@
 import reflex as rx
 import reflex_enterprise as rxe
+from app import metrics, services
 from app.components import dashboard
+from app.fleet.shared import SHARED_FLEET
+from app.states.maritime_state import MaritimeState
 
 
 def index() -> rx.Component:
@@ -14,11 +17,9 @@ def index() -> rx.Component:
                 ),
                 class_name="flex items-center justify-center h-16 w-full",
             ),
+            dashboard.fleet_refresher(),
             rx.el.div(
-                rx.el.div(
-                    "TIMELINE",
-                    class_name="border border-gray-200 rounded-lg px-4 py-2 text-sm font-medium text-gray-700 bg-white shadow-sm w-full text-center mb-4",
-                ),
+                dashboard.timeline_bar(),
                 rx.el.div(
                     rx.el.div(dashboard.map_component(), class_name="lg:col-span-5"),
                     rx.el.div(dashboard.summary_tables(), class_name="lg:col-span-3"),
@@ -53,5 +54,19 @@ app = rxe.App(
             cross_origin="",
         ),
     ],
+    api_transformer=metrics.metrics_api() if metrics.METRICS_ENABLED else None,
 )
-app.add_page(index)
\ No newline at end of file
+if metrics.METRICS_ENABLED:
+    metrics.instrument_state(MaritimeState)
+    app.add_middleware(metrics.MetricsMiddleware())
+    metrics.REGISTRY.gauge(
+        "maritime_result_cache",
+        "Shared result cache counters since start, and its current size.",
+        lambda: {(name,): value for name, value in SHARED_FLEET.results.counters().items()},
+        ("counter",),
+    )
+app.add_page(index)
+app.register_lifespan_task(services.sync_fleet_from_database)
+app.register_lifespan_task(services.ingest_ais_positions)
+app.register_lifespan_task(services.share_fleet_snapshots)
+app.register_lifespan_task(services.checkpoint_fleet)
@@ -0,0 +1,236 @@
+"""Times the dashboard state's hot paths on synthetic fleets and checks a JSON baseline.
+
+    python -m app.benchmark                       # compare with the baseline
+    python -m app.benchmark --write               # record a new baseline
+    python -m app.benchmark --sizes 1000 1000000  # pick fleet sizes
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import reflex as rx
+from reflex.utils import format
+from app.fleet.events import EventLog
+from app.fleet.shared import SHARED_FLEET
+from app.fleet.store import FleetStore
+from app.fleet.synthetic import FLEET_SIZES, generate_events, generate_vessels
+from app.metrics import COMPUTED_VAR_SECONDS, instrument_state
+from app.states.maritime_state import DataState, FilterState, MapViewState, MaritimeState
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "baseline.json"
+DEFAULT_SIZES = FLEET_SIZES[:3]
+REPEATS = 5
+# A regression is a slowdown beyond both the relative and the absolute slack.
+TOLERANCE = 0.5
+NOISE_FLOOR_MS = 1.0
+TIMED_VARS = (
+    "filtered_vessel_count",
+    "vessel_page",
+    "voyage_stats",
+    "recent_events",
+    "facet_counts",
+    "vessel_layer",
+    "vessel_clusters",
+    "emissions_totals",
+    "unique_segments",
+    "unique_vessel_types",
+    "search_matches",
+    "unique_sizebands",
+    "unique_origin_ports",
+    "unique_destination_ports",
+)
+RESET = {
+    "selected_segment": "",
+    "selected_type": "",
+    "selected_mmsi": "",
+    "selected_sizeband": "",
+    "selected_origin_port": "",
+    "selected_destination_port": "",
+    "vessel_offset": 0,
+    "search_query": "",
+}
+SUBSTATES = (MapViewState, FilterState, DataState)
+# A typical session: zoom and pan, narrow the filters step by step, page,
+# sort, zoom in, reset.
+SCENARIO = (
+    ("initial", {}),
+    ("zoom", {"zoom": 4.0, "cluster_zoom": 4}),
+    ("pan", {"map_bounds": {"south": 0.0, "west": 60.0, "north": 50.0, "east": 150.0}}),
+    ("segment", {"selected_segment": "Deep Sea"}),
+    ("type", {"selected_type": "Container"}),
+    ("origin", {"selected_origin_port": "Port of Shanghai"}),
+    ("sizeband", {"selected_sizeband": "Large"}),
+    ("next_page", {"vessel_offset": 25}),
+    ("sort", {"vessel_sort_key": "mmsi", "vessel_offset": 0}),
+    ("search", {"search_query": "golden"}),
+    (
+        "zoom_in",
+        {
+            "map_bounds": {"south": 20.0, "west": 100.0, "north": 40.0, "east": 135.0},
+            "cluster_zoom": 5,
+        },
+    ),
+    ("reset", RESET),
+)
+
+
+def _substate(root: rx.State, state_cls: type[MaritimeState]) -> MaritimeState:
+    return root.get_substate(state_cls.get_full_name().split(".")[1:])
+
+
+def _owner(name: str, attribute: str) -> type[MaritimeState]:
+    """The substate defining (or inheriting) a var or computed var."""
+    return next(cls for cls in SUBSTATES if name in getattr(cls, attribute))
+
+
+def _recomputations() -> dict[str, int]:
+    """How many times each computed var has been computed so far."""
+    return {
+        labels[1]: sum(child.snapshot()[0])
+        for labels, child in COMPUTED_VAR_SECONDS._children.items()
+    }
+
+
+def _time_ms(call, repeats: int = REPEATS) -> float:
+    """Median wall time of a call in milliseconds, without shared cached results."""
+    samples = []
+    for _ in range(repeats):
+        SHARED_FLEET.results.invalidate()
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run_size(size: int, seed: int = 0) -> dict:
+    """Load a synthetic fleet of ``size`` vessels and replay SCENARIO on a session."""
+    started = time.perf_counter()
+    vessels = generate_vessels(size, seed)
+    events = generate_events(vessels, seed)
+    generated = time.perf_counter()
+    SHARED_FLEET.publish(FleetStore.from_records(vessels), EventLog.from_events(events))
+    loaded = time.perf_counter()
+    result = {
+        "vessels": size,
+        "events": len(events),
+        "generate_s": round(generated - started, 3),
+        "load_s": round(loaded - generated, 3),
+        "steps": {},
+    }
+    instrument_state(MaritimeState)
+    root = rx.State(_reflex_internal_init=True)
+    _substate(root, MaritimeState).fleet_version = SHARED_FLEET.version
+    for step, changes in SCENARIO:
+        for field, value in changes.items():
+            setattr(_substate(root, _owner(field, "vars")), field, value)
+        before = _recomputations()
+        started = time.perf_counter()
+        delta = root.get_delta()
+        delta_ms = (time.perf_counter() - started) * 1000
+        after = _recomputations()
+        payload = format.json_dumps(delta)
+        root._clean()
+        timed = {}
+        for name in TIMED_VARS:
+            state_cls = _owner(name, "computed_vars")
+            fget = state_cls.computed_vars[name].fget
+            state = _substate(root, state_cls)
+            timed[name] = _time_ms(lambda: fget(state))
+        result["steps"][step] = {
+            "delta_ms": round(delta_ms, 3),
+            "delta_bytes": len(payload.encode()),
+            "recomputed": sorted(
+                name for name, count in after.items() if count != before.get(name, 0)
+            ),
+            "vars_ms": timed,
+        }
+        logger.info(
+            f"{size:>9,} vessels | {step:<10} delta {delta_ms:8.2f} ms "
+            f"{len(payload):>10,} B, {len(result['steps'][step]['recomputed'])} vars"
+        )
+    result["result_cache"] = SHARED_FLEET.results.counters()
+    return result
+
+
+def _metrics(results: dict) -> dict[str, float]:
+    """Flatten results into "size/step/metric" keys."""
+    flat = {}
+    for size, result in results.items():
+        flat[f"{size}/load_s"] = result["load_s"] * 1000
+        for step, timings in result["steps"].items():
+            flat[f"{size}/{step}/delta_ms"] = timings["delta_ms"]
+            flat[f"{size}/{step}/delta_bytes"] = timings["delta_bytes"]
+            for name, value in timings["vars_ms"].items():
+                flat[f"{size}/{step}/{name}_ms"] = value
+    return flat
+
+
+def regressions(baseline: dict, results: dict) -> list[str]:
+    """Metrics that got worse than the baseline beyond the allowed slack.
+
+    Payload sizes and recomputed vars are deterministic for a seed, so any
+    growth counts; timings must exceed both TOLERANCE and NOISE_FLOOR_MS.
+    """
+    before, after = _metrics(baseline["results"]), _metrics(results)
+    found = []
+    for size, result in results.items():
+        old_steps = baseline["results"].get(size, {}).get("steps", {})
+        for step, timings in result["steps"].items():
+            if step not in old_steps:
+                continue
+            extra = set(timings["recomputed"]) - set(old_steps[step].get("recomputed", ()))
+            if extra:
+                found.append(f"{size}/{step}/recomputed: +{', '.join(sorted(extra))}")
+    for key, value in after.items():
+        old = before.get(key)
+        if old is None:
+            continue
+        if key.endswith("delta_bytes"):
+            worse = value > old
+        else:
+            worse = value > old * (1 + TOLERANCE) and value - old > NOISE_FLOOR_MS
+        if worse:
+            found.append(f"{key}: {old:,.3f} -> {value:,.3f}")
+    return found
+
+
+def main(sizes: list[int], baseline_path: Path, write: bool) -> int:
+    results = {str(size): run_size(size) for size in sizes}
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if write:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        logger.info(f"Wrote baseline to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        logger.warning(f"No baseline at {baseline_path}; run with --write to record one")
+        return 0
+    found = regressions(json.loads(baseline_path.read_text()), results)
+    for line in found:
+        logger.error(f"Regression {line}")
+    if not found:
+        logger.info("No regressions against the baseline")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard state.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--write", action="store_true", help="record a new baseline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(args.sizes, args.baseline, args.write))
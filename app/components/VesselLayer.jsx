@@ -0,0 +1,148 @@
+import { useEffect, useRef } from "react";
+import { Popup, useMap } from "react-leaflet";
+import L from "leaflet";
+
+const UNKNOWN_HEADING = 0xffff;
+const HEADING_SCALE = 100;
+const HIT_RADIUS_PX = 8;
+
+const decode = (text, ArrayType) => {
+  if (!text) return new ArrayType(0);
+  const binary = atob(text);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return new ArrayType(bytes.buffer);
+};
+
+// One canvas in the overlay pane, redrawn after every move or zoom; vessels
+// with a heading are drawn as arrows, the others as dots.
+const CanvasVessels = L.Layer.extend({
+  initialize(onClick) {
+    this._onVesselClick = onClick;
+    this._data = null;
+    this._points = new Float32Array(0);
+  },
+
+  onAdd(map) {
+    this._canvas = L.DomUtil.create("canvas", "leaflet-zoom-hide");
+    this._canvas.style.pointerEvents = "none";
+    map.getPanes().overlayPane.appendChild(this._canvas);
+    map.on("moveend zoomend resize viewreset", this._redraw, this);
+    map.on("click", this._click, this);
+    this._redraw();
+  },
+
+  onRemove(map) {
+    map.off("moveend zoomend resize viewreset", this._redraw, this);
+    map.off("click", this._click, this);
+    L.DomUtil.remove(this._canvas);
+  },
+
+  setData(data) {
+    this._data = data;
+    this._redraw();
+  },
+
+  _redraw() {
+    if (!this._map || !this._data) return;
+    const map = this._map;
+    const size = map.getSize();
+    const ratio = window.devicePixelRatio || 1;
+    const canvas = this._canvas;
+    L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+    canvas.width = size.x * ratio;
+    canvas.height = size.y * ratio;
+    canvas.style.width = `${size.x}px`;
+    canvas.style.height = `${size.y}px`;
+    const ctx = canvas.getContext("2d");
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, size.x, size.y);
+    ctx.lineWidth = 1;
+    ctx.strokeStyle = "#ffffff";
+
+    const { positions, headings, categories, palette } = this._data;
+    const count = headings.length;
+    const points = new Float32Array(count * 2);
+    for (let i = 0; i < count; i++) {
+      const p = map.latLngToContainerPoint([positions[2 * i], positions[2 * i + 1]]);
+      points[2 * i] = p.x;
+      points[2 * i + 1] = p.y;
+      if (p.x < -10 || p.y < -10 || p.x > size.x + 10 || p.y > size.y + 10) continue;
+      ctx.fillStyle = palette[categories[i] % palette.length];
+      ctx.beginPath();
+      if (headings[i] === UNKNOWN_HEADING) {
+        ctx.arc(p.x, p.y, 4, 0, 2 * Math.PI);
+      } else {
+        const angle = ((headings[i] / HEADING_SCALE) * Math.PI) / 180;
+        const sin = Math.sin(angle);
+        const cos = Math.cos(angle);
+        ctx.moveTo(p.x + 7 * sin, p.y - 7 * cos);
+        ctx.lineTo(p.x - 4 * cos - 5 * sin, p.y - 4 * sin + 5 * cos);
+        ctx.lineTo(p.x + 4 * cos - 5 * sin, p.y + 4 * sin + 5 * cos);
+        ctx.closePath();
+      }
+      ctx.fill();
+      ctx.stroke();
+    }
+    this._points = points;
+  },
+
+  _click(event) {
+    const { x, y } = event.containerPoint;
+    const points = this._points;
+    let nearest = -1;
+    let best = HIT_RADIUS_PX * HIT_RADIUS_PX;
+    for (let i = 0; i < points.length / 2; i++) {
+      const dx = points[2 * i] - x;
+      const dy = points[2 * i + 1] - y;
+      const distance = dx * dx + dy * dy;
+      if (distance <= best) {
+        best = distance;
+        nearest = i;
+      }
+    }
+    if (nearest < 0) return;
+    const { positions } = this._data;
+    this._onVesselClick(nearest, positions[2 * nearest], positions[2 * nearest + 1]);
+  },
+});
+
+export const VesselLayer = ({ positions, headings, categories, palette, onVesselClick }) => {
+  const map = useMap();
+  const layer = useRef(null);
+  const data = useRef(null);
+  const onClick = useRef(onVesselClick);
+  onClick.current = onVesselClick;
+
+  useEffect(() => {
+    layer.current = new CanvasVessels((...args) => onClick.current && onClick.current(...args));
+    layer.current.addTo(map);
+    if (data.current) layer.current.setData(data.current);
+    return () => layer.current.remove();
+  }, [map]);
+
+  useEffect(() => {
+    data.current = {
+      positions: decode(positions, Float32Array),
+      headings: decode(headings, Uint16Array),
+      categories: decode(categories, Uint8Array),
+      palette: palette && palette.length ? palette : ["#2563eb"],
+    };
+    layer.current.setData(data.current);
+  }, [positions, headings, categories, palette]);
+
+  return null;
+};
+
+export const VesselPopup = ({ lat, lng, onClose, children }) => {
+  const onRemove = useRef(onClose);
+  onRemove.current = onClose;
+  return (
+    <Popup
+      position={[lat, lng]}
+      eventHandlers={{ remove: () => onRemove.current && onRemove.current() }}
+    >
+      {children}
+    </Popup>
+  );
+};
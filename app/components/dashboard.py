@@ -1,7 +1,21 @@
 import reflex as rx
 import reflex_enterprise as rxe
-from app.states.maritime_state import MaritimeState, Vessel
-from reflex_enterprise.components.map.types import latlng
+from app.components import vessel_layer
+from app.states.maritime_state import (
+    PLAYBACK_SPEEDS,
+    DataState,
+    FilterState,
+    MapViewState,
+    MaritimeState,
+    SearchMatch,
+    TimelineVessel,
+    Vessel,
+    VesselCluster,
+    VesselTrack,
+)
+from reflex_enterprise.components.map.types import LatLng, latlng
+
+FLEET_REFRESH_MS = 2000
 
 
 def card(
@@ -15,17 +29,97 @@ def card(
     )
 
 
-def vessel_marker(vessel: Vessel) -> rx.Component:
-    return rxe.map.marker(
+def fleet_refresher() -> rx.Component:
+    """Invisible ticker that picks up new versions of the shared fleet."""
+    return rx.moment(
+        interval=FLEET_REFRESH_MS, on_change=MaritimeState.refresh_fleet, display="none"
+    )
+
+
+def vessel_popup(vessel: Vessel) -> rx.Component:
+    return vessel_layer.vessel_popup(
+        rx.el.div(
+            rx.el.p(vessel["name"], class_name="font-bold"),
+            rx.el.p(f"Type: {vessel['type']}"),
+            rx.el.p(f"Status: {vessel['status']}"),
+            rx.el.button(
+                "Nearest vessels",
+                on_click=DataState.show_nearby(vessel),
+                class_name="mt-1 text-sm text-blue-600 hover:underline",
+            ),
+        ),
+        lat=vessel["lat"],
+        lng=vessel["lng"],
+        on_close=MapViewState.close_vessel_popup,
+    )
+
+
+def track_line(track: VesselTrack) -> rx.Component:
+    return rxe.map.polyline(
+        positions=track["points"].to(list[LatLng]),
+        path_options=rxe.map.path_options(color="#2563eb", weight=2, opacity=0.6),
+    )
+
+
+def cluster_marker(cluster: VesselCluster) -> rx.Component:
+    return rxe.map.circle_marker(
         rxe.map.popup(
             rx.el.div(
-                rx.el.p(vessel["name"], class_name="font-bold"),
-                rx.el.p(f"Type: {vessel['type']}"),
-                rx.el.p(f"Status: {vessel['status']}"),
+                rx.el.p(f"{cluster['count']} vessels", class_name="font-bold"),
+                rx.el.button(
+                    "Zoom to area",
+                    on_click=MapViewState.fly_to_cluster(cluster),
+                    class_name="mt-1 text-sm text-blue-600 hover:underline",
+                ),
             )
         ),
-        rxe.map.tooltip(vessel["name"]),
-        position=latlng(lat=vessel["lat"], lng=vessel["lng"]),
+        rxe.map.tooltip(cluster["count"]),
+        center=latlng(lat=cluster["lat"], lng=cluster["lng"]),
+        radius=18,
+    )
+
+
+def timeline_marker(vessel: TimelineVessel) -> rx.Component:
+    return rxe.map.circle_marker(
+        rxe.map.tooltip(f"{vessel['name']} ({vessel['status']})"),
+        center=latlng(lat=vessel["lat"], lng=vessel["lng"]),
+        radius=5,
+    )
+
+
+def timeline_bar() -> rx.Component:
+    """Scrubber and playback controls for viewing the fleet at a past time."""
+    button = "text-sm font-medium text-gray-700 border border-gray-300 rounded-md px-3 py-1 bg-white hover:bg-gray-100"
+    return rx.el.div(
+        rx.el.button(
+            rx.cond(MapViewState.timeline_playing, "Pause", "Play"),
+            on_click=MapViewState.toggle_playback,
+            class_name=button,
+        ),
+        rx.el.input(
+            type="range",
+            min=MapViewState.timeline_start,
+            max=MapViewState.timeline_end,
+            value=rx.cond(
+                MapViewState.timeline_time > 0,
+                MapViewState.timeline_time,
+                MapViewState.timeline_end,
+            ),
+            on_change=MapViewState.scrub_timeline.debounce(100),
+            class_name="flex-1",
+        ),
+        rx.el.select(
+            *[
+                rx.el.option(f"{speed // 60} min/s" if speed < 3600 else f"{speed // 3600} h/s", value=str(speed))
+                for speed in PLAYBACK_SPEEDS
+            ],
+            value=MapViewState.timeline_speed.to_string(),
+            on_change=MapViewState.set_timeline_speed,
+            class_name="text-sm border border-gray-300 rounded-md px-2 py-1",
+        ),
+        rx.el.span(MapViewState.timeline_label, class_name="text-sm text-gray-700 w-44 text-right"),
+        rx.el.button("Live", on_click=MapViewState.go_live, class_name=button),
+        class_name="flex items-center gap-3 border border-gray-200 rounded-lg px-4 py-2 bg-white shadow-sm w-full mb-4",
     )
 
 
@@ -37,12 +131,23 @@ def map_component() -> rx.Component:
             url="https://{s}.basemaps.cartocdn.com/rastertiles/voyager/{z}/{x}/{y}{r}.png",
             attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors &copy; <a href="https://carto.com/attributions">CARTO</a>',
         ),
-        rx.foreach(MaritimeState.filtered_vessels, vessel_marker),
+        rx.foreach(MapViewState.visible_tracks, track_line),
+        rx.foreach(MapViewState.vessel_clusters, cluster_marker),
+        vessel_layer.vessel_layer(
+            positions=MapViewState.vessel_layer["positions"],
+            headings=MapViewState.vessel_layer["headings"],
+            categories=MapViewState.vessel_layer["categories"],
+            palette=vessel_layer.VESSEL_PALETTE,
+            on_vessel_click=MapViewState.open_vessel_popup,
+        ),
+        rx.foreach(MapViewState.popup_vessels, vessel_popup),
+        rx.foreach(MapViewState.timeline_frame, timeline_marker),
         rxe.map.zoom_control(position="bottomright"),
         id="maritime_map",
-        center=MaritimeState.center,
-        zoom=MaritimeState.zoom,
-        on_zoom=MaritimeState.handle_zoom,
+        center=MapViewState.center,
+        zoom=MapViewState.zoom,
+        on_zoom=MapViewState.handle_zoom,
+        on_move_end=MapViewState.handle_move_end,
         class_name="border border-gray-200 rounded-lg w-full h-full min-h-[600px] lg:min-h-0 z-0",
     )
 
@@ -71,7 +176,7 @@ def summary_tables() -> rx.Component:
                         class_name="border-t px-4 py-2 text-sm text-gray-700",
                     ),
                     rx.el.td(
-                        MaritimeState.voyage_stats["total_voyages"],
+                        FilterState.voyage_stats["total_voyages"],
                         class_name="border-t px-4 py-2 text-sm font-medium text-gray-900",
                     ),
                 ),
@@ -81,7 +186,7 @@ def summary_tables() -> rx.Component:
                         class_name="border-t px-4 py-2 text-sm text-gray-700",
                     ),
                     rx.el.td(
-                        MaritimeState.voyage_stats["avg_duration_days"],
+                        FilterState.voyage_stats["avg_duration_days"],
                         class_name="border-t px-4 py-2 text-sm font-medium text-gray-900",
                     ),
                 ),
@@ -91,7 +196,7 @@ def summary_tables() -> rx.Component:
                         class_name="border-t px-4 py-2 text-sm text-gray-700",
                     ),
                     rx.el.td(
-                        MaritimeState.voyage_stats["total_distance_nm"],
+                        FilterState.voyage_stats["total_distance_nm"],
                         class_name="border-t px-4 py-2 text-sm font-medium text-gray-900",
                     ),
                 ),
@@ -101,7 +206,7 @@ def summary_tables() -> rx.Component:
                         class_name="border-t px-4 py-2 text-sm text-gray-700",
                     ),
                     rx.el.td(
-                        MaritimeState.voyage_stats["total_fuel_mt"],
+                        FilterState.voyage_stats["total_fuel_mt"],
                         class_name="border-t px-4 py-2 text-sm font-medium text-gray-900",
                     ),
                 ),
@@ -110,7 +215,26 @@ def summary_tables() -> rx.Component:
         )
 
     def vessel_char_table() -> rx.Component:
-        header = ["Vessel", "Type", "Segment", "MMSI", "Sizeband", "Status"]
+        header = [
+            ("Vessel", "name"),
+            ("Type", "type"),
+            ("Segment", "segment"),
+            ("MMSI", "mmsi"),
+            ("Sizeband", "sizeband"),
+            ("Status", "status"),
+        ]
+
+        def header_cell(label: str, key: str) -> rx.Component:
+            return rx.el.th(
+                label,
+                rx.cond(
+                    DataState.vessel_sort_key == key,
+                    rx.cond(DataState.vessel_sort_desc, " ▼", " ▲"),
+                    "",
+                ),
+                on_click=DataState.sort_vessels(key),
+                class_name="px-4 py-2 text-left text-xs font-semibold text-gray-600 uppercase bg-gray-50 cursor-pointer select-none",
+            )
 
         def row(vessel: Vessel):
             return rx.el.tr(
@@ -138,32 +262,82 @@ def summary_tables() -> rx.Component:
                     vessel["status"],
                     class_name="border-t px-4 py-2 text-sm text-gray-700 whitespace-nowrap",
                 ),
-                on_click=MaritimeState.fly_to_vessel(vessel),
+                on_click=MapViewState.fly_to_vessel(vessel),
                 class_name="cursor-pointer hover:bg-gray-50",
             )
 
         return rx.el.div(
+            rx.el.div(
+                rx.el.table(
+                    rx.el.thead(
+                        rx.el.tr(*[header_cell(label, key) for label, key in header])
+                    ),
+                    rx.el.tbody(rx.foreach(DataState.vessel_page, row)),
+                    class_name="min-w-full divide-y divide-gray-200",
+                ),
+                class_name="overflow-x-auto border border-gray-200 rounded-lg",
+            ),
+            rx.el.div(
+                rx.el.span(
+                    DataState.vessel_window_label,
+                    class_name="text-xs text-gray-500",
+                ),
+                rx.el.div(
+                    rx.el.button(
+                        "Prev",
+                        on_click=DataState.prev_vessel_page,
+                        class_name="text-sm text-gray-700 hover:underline",
+                    ),
+                    rx.el.button(
+                        "Next",
+                        on_click=DataState.next_vessel_page,
+                        class_name="text-sm text-gray-700 hover:underline",
+                    ),
+                    class_name="flex gap-3",
+                ),
+                class_name="flex items-center justify-between mt-2",
+            ),
+        )
+
+    def nearby_table() -> rx.Component:
+        return rx.el.div(
+            rx.el.div(
+                rx.el.span(
+                    "Nearest to ",
+                    DataState.nearby_vessel_name,
+                    class_name="text-xs text-gray-500",
+                ),
+                rx.el.button(
+                    "Clear",
+                    on_click=DataState.clear_nearby,
+                    class_name="text-sm text-gray-700 hover:underline",
+                ),
+                class_name="flex items-center justify-between",
+            ),
             rx.el.table(
-                rx.el.thead(
-                    rx.el.tr(
-                        rx.foreach(
-                            header,
-                            lambda h: rx.el.th(
-                                h,
-                                class_name="px-4 py-2 text-left text-xs font-semibold text-gray-600 uppercase bg-gray-50",
+                rx.el.tbody(
+                    rx.foreach(
+                        DataState.nearby_vessels,
+                        lambda vessel: rx.el.tr(
+                            rx.el.td(vessel["name"], class_name="py-1 text-sm text-gray-700"),
+                            rx.el.td(
+                                f"{vessel['distance_nm']} nm",
+                                class_name="py-1 text-sm text-gray-700 text-right",
                             ),
-                        )
+                        ),
                     )
                 ),
-                rx.el.tbody(rx.foreach(MaritimeState.filtered_vessels, row)),
-                class_name="min-w-full divide-y divide-gray-200",
+                class_name="w-full mt-2",
             ),
-            class_name="overflow-x-auto border border-gray-200 rounded-lg",
         )
 
     return rx.el.div(
         card("Voyages stats Summary table", voyage_stats_table()),
         card("Vessel Characteristic Summary", vessel_char_table()),
+        rx.cond(
+            DataState.nearby_vessel_id != "",
+            card("Nearby vessels", nearby_table()),
+        ),
         class_name="flex flex-col gap-4 w-full",
     )
 
@@ -173,12 +347,18 @@ def select_filter(
     options: rx.Var[list[str]],
     value: rx.Var[str],
     on_change: rx.event.EventSpec,
+    counts: rx.Var[dict[str, int]] | None = None,
 ) -> rx.Component:
+    def option_item(option: rx.Var[str]) -> rx.Component:
+        if counts is None:
+            return rx.el.option(option, value=option)
+        return rx.el.option(f"{option} ({counts[option]})", value=option)
+
     return rx.el.div(
         rx.el.label(label, class_name="text-xs font-medium text-gray-600"),
         rx.el.select(
             rx.el.option("All", value=""),
-            rx.foreach(options, lambda option: rx.el.option(option, value=option)),
+            rx.foreach(options, option_item),
             value=value,
             on_change=on_change,
             class_name="w-full mt-1 p-2 border border-gray-300 rounded-lg bg-white text-sm",
@@ -187,6 +367,51 @@ def select_filter(
     )
 
 
+def search_filter() -> rx.Component:
+    """Search-as-you-type for a vessel by MMSI or name, filtering on its MMSI."""
+
+    def match_item(match: rx.Var[SearchMatch]) -> rx.Component:
+        return rx.el.button(
+            rx.el.span(match["name"], class_name="truncate"),
+            rx.el.span(match["mmsi"], class_name="text-xs text-gray-500"),
+            on_click=FilterState.pick_search_match(match),
+            class_name="w-full flex justify-between gap-2 px-2 py-1 text-left text-sm hover:bg-gray-100",
+        )
+
+    return rx.el.div(
+        rx.el.label("Vessel", class_name="text-xs font-medium text-gray-600"),
+        rx.cond(
+            MaritimeState.selected_mmsi != "",
+            rx.el.div(
+                rx.el.span(f"MMSI {MaritimeState.selected_mmsi}"),
+                rx.el.button(
+                    "Clear",
+                    on_click=MaritimeState.set_selected_mmsi(""),
+                    class_name="text-xs text-blue-600 hover:underline",
+                ),
+                class_name="flex justify-between items-center mt-1 p-2 border border-gray-300 rounded-lg bg-gray-50 text-sm",
+            ),
+        ),
+        rx.debounce_input(
+            rx.el.input(
+                placeholder="Search MMSI or name",
+                value=FilterState.search_query,
+                on_change=FilterState.set_search_query,
+                class_name="w-full mt-1 p-2 border border-gray-300 rounded-lg bg-white text-sm",
+            ),
+            debounce_timeout=150,
+        ),
+        rx.cond(
+            FilterState.search_matches.length() > 0,
+            rx.el.div(
+                rx.foreach(FilterState.search_matches, match_item),
+                class_name="mt-1 border border-gray-200 rounded-lg bg-white shadow-sm",
+            ),
+        ),
+        class_name="w-full",
+    )
+
+
 def filter_panel() -> rx.Component:
     """Filter controls for vessels and routes."""
     return rx.el.div(
@@ -195,32 +420,40 @@ def filter_panel() -> rx.Component:
             on_click=MaritimeState.reset_filters,
             class_name="w-full bg-gray-100 hover:bg-gray-200 text-gray-800 font-semibold py-2 px-4 rounded-lg border border-gray-300 transition-colors",
         ),
+        rx.el.label(
+            rx.el.input(
+                type="checkbox",
+                checked=MapViewState.show_tracks,
+                on_change=MapViewState.toggle_tracks,
+                class_name="mr-2",
+            ),
+            "Show vessel tracks",
+            class_name="flex items-center mt-3 text-sm text-gray-700",
+        ),
         card(
             "Vessels Filters",
             rx.el.div(
                 select_filter(
                     "Segment",
-                    MaritimeState.unique_segments,
+                    FilterState.unique_segments,
                     MaritimeState.selected_segment,
                     MaritimeState.set_selected_segment,
+                    FilterState.facet_counts["segment"],
                 ),
                 select_filter(
                     "Vessel type",
-                    MaritimeState.unique_vessel_types,
+                    FilterState.unique_vessel_types,
                     MaritimeState.selected_type,
                     MaritimeState.set_selected_type,
+                    FilterState.facet_counts["type"],
                 ),
-                select_filter(
-                    "MMSI",
-                    MaritimeState.unique_mmsi,
-                    MaritimeState.selected_mmsi,
-                    MaritimeState.set_selected_mmsi,
-                ),
+                search_filter(),
                 select_filter(
                     "Sizeband",
-                    MaritimeState.unique_sizebands,
+                    FilterState.unique_sizebands,
                     MaritimeState.selected_sizeband,
                     MaritimeState.set_selected_sizeband,
+                    FilterState.facet_counts["sizeband"],
                 ),
                 class_name="space-y-3",
             ),
@@ -231,15 +464,17 @@ def filter_panel() -> rx.Component:
             rx.el.div(
                 select_filter(
                     "Origin Port",
-                    MaritimeState.unique_origin_ports,
+                    FilterState.unique_origin_ports,
                     MaritimeState.selected_origin_port,
                     MaritimeState.set_selected_origin_port,
+                    FilterState.facet_counts["origin_port"],
                 ),
                 select_filter(
                     "Destination Port",
-                    MaritimeState.unique_destination_ports,
+                    FilterState.unique_destination_ports,
                     MaritimeState.selected_destination_port,
                     MaritimeState.set_selected_destination_port,
+                    FilterState.facet_counts["destination_port"],
                 ),
                 class_name="space-y-3",
             ),
@@ -249,15 +484,74 @@ def filter_panel() -> rx.Component:
     )
 
 
+def emissions_bar_chart(data: rx.Var, bars: list[tuple[str, str]], stacked: bool = False) -> rx.Component:
+    """A horizontal bar chart of emission groups, one bar series per data key."""
+    return rx.recharts.bar_chart(
+        rx.recharts.cartesian_grid(stroke_dasharray="3 3", horizontal=False),
+        rx.recharts.x_axis(type_="number"),
+        rx.recharts.y_axis(data_key="label", type_="category", width=140, font_size=11),
+        rx.recharts.graphing_tooltip(),
+        rx.recharts.legend(),
+        *[
+            rx.recharts.bar(
+                data_key=key, name=name, fill=color, stack_id="total" if stacked else None
+            )
+            for (key, name), color in zip(bars, ["#2563eb", "#f59e0b", "#10b981"])
+        ],
+        data=data,
+        layout="vertical",
+        width="100%",
+        height=280,
+    )
+
+
+def emissions_totals() -> rx.Component:
+    rows = [
+        ("Fuel burnt (t)", "fuel_mt"),
+        ("CO2 (t)", "co2_t"),
+        ("SOx (t)", "sox_t"),
+        ("NOx (t)", "nox_t"),
+    ]
+    return rx.el.div(
+        *[
+            rx.el.div(
+                rx.el.p(label, class_name="text-xs text-gray-500"),
+                rx.el.p(
+                    FilterState.emissions_totals[key],
+                    class_name="text-lg font-semibold text-gray-800",
+                ),
+            )
+            for label, key in rows
+        ],
+        class_name="grid grid-cols-2 gap-4",
+    )
+
+
 def analytics_graphs() -> rx.Component:
-    """Placeholder for analytics graphs."""
+    """Emission charts for the filtered vessels."""
     return card(
         "Analytic graphs",
         rx.el.div(
-            card("Stacked Bar chart for totals...", class_name="bg-gray-50"),
-            card("Emissions by Port", class_name="bg-gray-50"),
-            card("tbd", class_name="bg-gray-50"),
-            card("Emissions by Route", class_name="bg-gray-50"),
+            card(
+                "CO2 by machinery (t)",
+                emissions_bar_chart(
+                    FilterState.emissions_by_machinery,
+                    [("propulsion", "Propulsion"), ("auxiliary", "Auxiliary"), ("boiler", "Boiler")],
+                    stacked=True,
+                ),
+                class_name="bg-gray-50",
+            ),
+            card(
+                "Emissions by Port (departure, t CO2)",
+                emissions_bar_chart(FilterState.emissions_by_port, [("co2_t", "CO2")]),
+                class_name="bg-gray-50",
+            ),
+            card("Emission totals", emissions_totals(), class_name="bg-gray-50"),
+            card(
+                "Emissions by Route (t CO2)",
+                emissions_bar_chart(FilterState.emissions_by_route, [("co2_t", "CO2")]),
+                class_name="bg-gray-50",
+            ),
             class_name="grid grid-cols-1 md:grid-cols-2 gap-4 mt-2",
         ),
         class_name="w-full mt-4",
@@ -290,7 +584,9 @@ def sequence_table() -> rx.Component:
     return rx.el.div(
         rx.el.p("Sequence of events table", class_name="font-semibold text-gray-800"),
         rx.el.p(
-            "(time ordered showing the most recent calling/journey)",
+            "(time ordered showing the most recent calling/journey, ",
+            DataState.recent_events_total,
+            " events)",
             class_name="text-sm text-gray-500 mt-1 mb-4",
         ),
         rx.el.div(
@@ -306,10 +602,29 @@ def sequence_table() -> rx.Component:
                         )
                     )
                 ),
-                rx.el.tbody(rx.foreach(MaritimeState.recent_events, row)),
+                rx.el.tbody(rx.foreach(DataState.recent_events, row)),
                 class_name="w-full",
             ),
             class_name="w-full overflow-x-auto rounded-lg border border-gray-200 bg-white shadow-sm",
         ),
+        rx.el.div(
+            rx.cond(
+                DataState.events_cursor != "",
+                rx.el.button(
+                    "Latest events",
+                    on_click=DataState.show_latest_events,
+                    class_name="text-sm text-gray-700 hover:underline",
+                ),
+            ),
+            rx.cond(
+                DataState.recent_events_next_cursor != "",
+                rx.el.button(
+                    "Older events",
+                    on_click=DataState.show_older_events,
+                    class_name="text-sm text-gray-700 hover:underline",
+                ),
+            ),
+            class_name="flex justify-end gap-4 mt-2",
+        ),
         class_name="w-full mt-6",
     )
\ No newline at end of file
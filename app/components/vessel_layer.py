@@ -0,0 +1,50 @@
+import reflex as rx
+from reflex.event import no_args_event_spec, passthrough_event_spec
+from reflex.vars.base import Var
+from reflex_enterprise.components.map.base import BaseLeafletComponent
+
+# Colors of the vessel types, by their order in the store's type dictionary.
+VESSEL_PALETTE = [
+    "#2563eb",
+    "#dc2626",
+    "#16a34a",
+    "#d97706",
+    "#7c3aed",
+    "#0891b2",
+    "#db2777",
+    "#4b5563",
+]
+
+
+class VesselLayer(BaseLeafletComponent):
+    """Every drawn vessel on one canvas, from packed typed arrays.
+
+    Clicks are hit-tested in the browser and reported with the vessel's index
+    in the packed arrays and its position, so popups are fetched on demand.
+    """
+
+    library = "$/public" + rx.asset("VesselLayer.jsx", shared=True)
+    tag = "VesselLayer"
+
+    positions: Var[str]
+    headings: Var[str]
+    categories: Var[str]
+    palette: Var[list[str]]
+
+    on_vessel_click: rx.EventHandler[passthrough_event_spec(int, float, float)]
+
+
+class VesselPopup(BaseLeafletComponent):
+    """A popup opened at a position rather than on a marker."""
+
+    library = "$/public" + rx.asset("VesselLayer.jsx", shared=True)
+    tag = "VesselPopup"
+
+    lat: Var[float]
+    lng: Var[float]
+
+    on_close: rx.EventHandler[no_args_event_spec]
+
+
+vessel_layer = VesselLayer.create
+vessel_popup = VesselPopup.create
@@ -1,11 +1,19 @@
 import os
 import logging
-from contextlib import contextmanager
+import time
+from contextlib import asynccontextmanager, contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.metrics import DB_SESSION_SECONDS, METRICS_ENABLED, instrument_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
 
 def get_db_url() -> str:
     """Constructs the database URL from environment variables."""
@@ -24,17 +32,88 @@ def get_db_url() -> str:
     )
 
 
+def get_async_db_url(db_url: str) -> str:
+    """Derives the async driver URL, unless ASYNC_DATABASE_URL overrides it."""
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_options(db_url: str) -> dict:
+    """Connection pool settings from DB_POOL_* environment variables."""
+    options = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+    }
+    url = make_url(db_url)
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options["pool_size"] = _env_int("DB_POOL_SIZE", 10)
+        options["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 20)
+        options["pool_timeout"] = _env_int("DB_POOL_TIMEOUT", 30)
+    return options
+
+
+def _make_read_only(sync_engine: Engine):
+    """Puts every new pooled connection in read-only mode, once, on connect."""
+    backend = sync_engine.url.get_backend_name()
+
+    @event.listens_for(sync_engine, "connect")
+    def set_read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if backend == "sqlite":
+                cursor.execute("PRAGMA query_only = ON")
+            else:
+                cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+        finally:
+            cursor.close()
+
+
 DATABASE_URL = get_db_url()
-engine = create_engine(DATABASE_URL)
+DB_READ_ONLY = _env_bool("DB_READ_ONLY", True)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+if DB_READ_ONLY:
+    _make_read_only(engine)
+if METRICS_ENABLED:
+    instrument_engine(engine)
+_async_engine: AsyncEngine | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide async engine, created on first use."""
+    global _async_engine
+    if _async_engine is None:
+        async_url = get_async_db_url(DATABASE_URL)
+        _async_engine = create_async_engine(async_url, **pool_options(async_url))
+        if DB_READ_ONLY:
+            _make_read_only(_async_engine.sync_engine)
+        if METRICS_ENABLED:
+            instrument_engine(_async_engine.sync_engine)
+    return _async_engine
 
 
 @contextmanager
 def get_session():
     """Context manager for providing a database session for read-only queries."""
     session = None
+    started = time.perf_counter()
     try:
         with Session(engine) as session:
-            session.exec("SET default_transaction_read_only = on;")
             yield session
     except Exception as e:
         logger.exception(f"Database session error: {e}")
@@ -43,4 +122,24 @@ def get_session():
         raise
     finally:
         if session:
-            session.close()
\ No newline at end of file
+            session.close()
+        if METRICS_ENABLED:
+            DB_SESSION_SECONDS.observe(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def get_async_session():
+    """Async context manager for read-only queries from background event handlers."""
+    session = None
+    started = time.perf_counter()
+    try:
+        async with AsyncSession(get_async_engine()) as session:
+            yield session
+    except Exception as e:
+        logger.exception(f"Database session error: {e}")
+        if session:
+            await session.rollback()
+        raise
+    finally:
+        if METRICS_ENABLED:
+            DB_SESSION_SECONDS.observe(time.perf_counter() - started)
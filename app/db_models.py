@@ -0,0 +1,42 @@
+import datetime
+from sqlmodel import Field, SQLModel
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class VesselRecord(SQLModel, table=True):
+    """A vessel row; ``updated_at`` is bumped on every write."""
+
+    __tablename__ = "vessels"
+
+    id: str = Field(primary_key=True)
+    name: str
+    type: str
+    segment: str
+    mmsi: str = Field(index=True)
+    sizeband: str
+    lat: float
+    lng: float
+    status: str
+    origin_port: str
+    destination_port: str
+    voyage_duration_days: int = 0
+    distance_travelled_nm: int = 0
+    fuel_consumption_mt: int = 0
+    updated_at: datetime.datetime = Field(default_factory=_utcnow, index=True)
+
+
+class EventRecord(SQLModel, table=True):
+    """A vessel event row; ``seq`` increases in insertion order."""
+
+    __tablename__ = "vessel_events"
+
+    seq: int | None = Field(default=None, primary_key=True)
+    id: str = Field(unique=True)
+    vessel_id: str = Field(index=True)
+    timestamp: datetime.datetime = Field(index=True)
+    event_type: str
+    location: str
+    vessel_name: str
@@ -0,0 +1,255 @@
+from typing import Iterable, Mapping
+import numpy as np
+
+ARRAY_LIMIT = 4096
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _to_words(low: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << CHUNK_BITS, dtype=np.uint8)
+    bits[low] = 1
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _to_low(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _pack(low: np.ndarray, cardinality: int) -> np.ndarray:
+    """Pick the array or bitmap container representation for a chunk."""
+    if low.dtype == np.uint64:
+        return _to_low(low) if cardinality <= ARRAY_LIMIT else low
+    return low if cardinality <= ARRAY_LIMIT else _to_words(low)
+
+
+def _contains(container: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Vectorized membership test of low bits against either container kind."""
+    if container.dtype == np.uint64:
+        words = container[low >> 6]
+        return ((words >> (low & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+    index = np.searchsorted(container, low)
+    index[index == len(container)] = 0
+    return container[index] == low
+
+
+class Bitmap:
+    """A compressed bitset of row positions in the style of a roaring bitmap.
+
+    Positions are split into 2**16-wide chunks. Sparse chunks are kept as a
+    sorted uint16 array, dense chunks as a 1024-word uint64 bitmap.
+    """
+
+    __slots__ = ("_containers", "_counts")
+
+    def __init__(self):
+        self._containers: dict[int, np.ndarray] = {}
+        self._counts: dict[int, int] = {}
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[int] | np.ndarray) -> "Bitmap":
+        bitmap = cls()
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if not len(positions):
+            return bitmap
+        keys, starts = np.unique(positions >> CHUNK_BITS, return_index=True)
+        for key, chunk in zip(keys.tolist(), np.split(positions, starts[1:])):
+            low = (chunk & CHUNK_MASK).astype(np.uint16)
+            bitmap._set(key, _pack(low, len(low)), len(low))
+        return bitmap
+
+    def _set(self, key: int, container: np.ndarray, cardinality: int):
+        if cardinality:
+            self._containers[key] = container
+            self._counts[key] = cardinality
+        else:
+            self._containers.pop(key, None)
+            self._counts.pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __contains__(self, position: int) -> bool:
+        container = self._containers.get(position >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = np.array([position & CHUNK_MASK], dtype=np.uint16)
+        return bool(_contains(container, low)[0])
+
+    def add(self, position: int):
+        key, low = position >> CHUNK_BITS, position & CHUNK_MASK
+        container = self._containers.get(key)
+        if container is None:
+            self._set(key, np.array([low], dtype=np.uint16), 1)
+            return
+        count = self._counts[key]
+        if container.dtype == np.uint64:
+            bit = np.uint64(1) << np.uint64(low & 63)
+            if not container[low >> 6] & bit:
+                container[low >> 6] |= bit
+                self._counts[key] = count + 1
+            return
+        index = int(np.searchsorted(container, low))
+        if index < count and container[index] == low:
+            return
+        container = np.insert(container, index, low)
+        self._set(key, _pack(container, count + 1), count + 1)
+
+    def discard(self, position: int):
+        key, low = position >> CHUNK_BITS, position & CHUNK_MASK
+        container = self._containers.get(key)
+        if container is None:
+            return
+        count = self._counts[key]
+        if container.dtype == np.uint64:
+            bit = np.uint64(1) << np.uint64(low & 63)
+            if container[low >> 6] & bit:
+                container[low >> 6] &= ~bit
+                self._set(key, _pack(container, count - 1), count - 1)
+            return
+        index = int(np.searchsorted(container, low))
+        if index < count and container[index] == low:
+            self._set(key, np.delete(container, index), count - 1)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        result = Bitmap()
+        if len(other._containers) < len(self._containers):
+            self, other = other, self
+        for key, left in self._containers.items():
+            right = other._containers.get(key)
+            if right is None:
+                continue
+            if left.dtype == np.uint64 and right.dtype == np.uint64:
+                words = left & right
+                result._set(key, *self._packed_words(words))
+            elif left.dtype == np.uint64:
+                low = right[_contains(left, right)]
+                result._set(key, low, len(low))
+            elif right.dtype == np.uint64:
+                low = left[_contains(right, left)]
+                result._set(key, low, len(low))
+            else:
+                low = np.intersect1d(left, right, assume_unique=True)
+                result._set(key, low, len(low))
+        return result
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        result = Bitmap()
+        for key in self._containers.keys() | other._containers.keys():
+            left = self._containers.get(key)
+            right = other._containers.get(key)
+            if right is None:
+                result._set(key, left.copy(), self._counts[key])
+            elif left is None:
+                result._set(key, right.copy(), other._counts[key])
+            elif left.dtype == np.uint16 and right.dtype == np.uint16:
+                low = np.union1d(left, right).astype(np.uint16)
+                result._set(key, _pack(low, len(low)), len(low))
+            else:
+                words = _words(left) | _words(right)
+                result._set(key, *self._packed_words(words))
+        return result
+
+    @staticmethod
+    def _packed_words(words: np.ndarray) -> tuple[np.ndarray, int]:
+        cardinality = _popcount(words)
+        return _pack(words, cardinality), cardinality
+
+    def to_array(self) -> np.ndarray:
+        """Return the stored positions as a sorted int64 array."""
+        if not self._containers:
+            return np.empty(0, dtype=np.int64)
+        parts = []
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            low = _to_low(container) if container.dtype == np.uint64 else container
+            parts.append(low.astype(np.int64) + (key << CHUNK_BITS))
+        return np.concatenate(parts)
+
+
+def _words(container: np.ndarray) -> np.ndarray:
+    return container if container.dtype == np.uint64 else _to_words(container)
+
+
+class InvertedIndex:
+    """Maps each dictionary code of the indexed fields to a Bitmap of rows."""
+
+    def __init__(self, fields: Iterable[str]):
+        self._bitmaps: dict[str, dict[int, Bitmap]] = {field: {} for field in fields}
+        self._sorted: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_sorted(cls, fields: Mapping[str, tuple[np.ndarray, np.ndarray]]) -> "InvertedIndex":
+        """An index over rows grouped by code, each bitmap built on first use.
+
+        Each field maps to ``rows`` ordered by code and ``offsets``, where
+        ``rows[offsets[code]:offsets[code + 1]]`` hold that code.
+        """
+        index = cls(fields)
+        index._sorted = dict(fields)
+        return index
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._bitmaps
+
+    def _bitmap(self, field: str, code: int) -> Bitmap | None:
+        bitmaps = self._bitmaps[field]
+        bitmap = bitmaps.get(code)
+        if bitmap is None and field in self._sorted:
+            rows, offsets = self._sorted[field]
+            if code + 1 < len(offsets) and offsets[code + 1] > offsets[code]:
+                bitmap = Bitmap.from_positions(rows[offsets[code] : offsets[code + 1]])
+                bitmaps[code] = bitmap
+        return bitmap
+
+    def extend(self, field: str, codes: np.ndarray, rows: np.ndarray):
+        """Index a batch of rows holding the given codes for a field."""
+        bitmaps = self._bitmaps[field]
+        order = np.argsort(codes, kind="stable")
+        codes, rows = codes[order], rows[order]
+        values, starts = np.unique(codes, return_index=True)
+        for code, chunk in zip(values.tolist(), np.split(rows, starts[1:])):
+            added = Bitmap.from_positions(chunk)
+            existing = self._bitmap(field, code)
+            bitmaps[code] = added if existing is None else existing | added
+
+    def add(self, field: str, row: int, code: int):
+        bitmap = self._bitmap(field, code)
+        if bitmap is None:
+            bitmap = self._bitmaps[field][code] = Bitmap()
+        bitmap.add(row)
+
+    def discard(self, field: str, row: int, code: int):
+        bitmap = self._bitmap(field, code)
+        if bitmap is not None:
+            bitmap.discard(row)
+
+    def move(self, field: str, row: int, old_code: int, new_code: int):
+        """Re-index a single row whose value for a field changed."""
+        self.discard(field, row, old_code)
+        self.add(field, row, new_code)
+
+    def lookup(self, field: str, code: int) -> Bitmap:
+        return self._bitmap(field, code) or Bitmap()
+
+    def query(self, codes: Mapping[str, int]) -> Bitmap:
+        """Intersect the bitmaps of every (field, code) pair, smallest first."""
+        bitmaps = sorted(
+            (self.lookup(field, code) for field, code in codes.items()), key=len
+        )
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if not result:
+                break
+            result = result & bitmap
+        return result
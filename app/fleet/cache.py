@@ -0,0 +1,117 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from itertools import islice
+from typing import Callable, Hashable, TypeVar
+import numpy as np
+
+MAX_ENTRIES = 1024
+MAX_BYTES = 64 * 1024 * 1024
+SIZE_SAMPLE = 8
+
+T = TypeVar("T")
+
+
+def approximate_size(value) -> int:
+    """Rough memory footprint of a result: arrays, strings and nested containers.
+
+    Containers are sized from their first SIZE_SAMPLE items.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        items = list(islice(value.items(), SIZE_SAMPLE))
+        sample = sum(approximate_size(key) + approximate_size(item) for key, item in items)
+    elif isinstance(value, (list, tuple, set)):
+        items = list(islice(value, SIZE_SAMPLE))
+        sample = sum(approximate_size(item) for item in items)
+    else:
+        return sys.getsizeof(value)
+    return sys.getsizeof(value) + (sample * len(value) // len(items) if items else 0)
+
+
+class ResultCache:
+    """A bounded LRU cache of query results shared by every session.
+
+    Entries are evicted least recently used first once there are more than
+    ``max_entries`` or their approximate size exceeds ``max_bytes``.
+    Concurrent misses on one key compute it once, the other threads waiting
+    for that result. ``invalidate`` drops every entry, and results still
+    being computed when it is called are returned but not stored. Arrays are
+    stored read-only, since every caller shares them.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[object, int]] = OrderedDict()
+        self._pending: dict[Hashable, tuple[Future, int]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._bytes = 0
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "waits", "evictions", "invalidations"), 0
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """The cached result for ``key``, computing and storing it on a miss."""
+        thread = threading.get_ident()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[0]
+            pending = self._pending.get(key)
+            if pending is None:
+                future = Future()
+                self._pending[key] = (future, thread)
+                self._counters["misses"] += 1
+                generation = self._generation
+            elif pending[1] != thread:
+                self._counters["waits"] += 1
+        if pending is not None:
+            # The same thread asking again while computing it must not wait on itself.
+            return pending[0].result() if pending[1] != thread else compute()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(e)
+            raise
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+        size = approximate_size(value)
+        with self._lock:
+            self._pending.pop(key, None)
+            if generation == self._generation and size <= self.max_bytes:
+                self._store(key, value, size)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: Hashable, value: object, size: int):
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self._counters["evictions"] += 1
+
+    def invalidate(self):
+        """Drop every entry, such as when the data they were computed from changed."""
+        with self._lock:
+            if self._entries or self._pending:
+                self._counters["invalidations"] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._generation += 1
+
+    def counters(self) -> dict[str, int]:
+        """Hits, misses, waits, evictions and invalidations since start, and the current size."""
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes}
@@ -0,0 +1,155 @@
+"""Periodic on-disk checkpoints of the fleet, for warm starts.
+
+A checkpoint is one fleet segment (see ``app.fleet.snapshot``): columns,
+dictionaries, the sorted rows behind the bitmap index, events, tracks and
+the playback timeline when one was built from that very data, plus the
+sync watermarks it is consistent with. The
+``manifest.json`` next to them lists the checkpoints kept, newest last, and
+is replaced atomically after each new file is complete.
+
+On start the newest checkpoint is mapped copy-on-write and used as the live
+fleet, so startup time no longer depends on history size: pages are read as
+they are touched, and only the ones written to are copied into memory.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+from app.fleet.events import EventLog
+from app.fleet.shared import SharedFleet
+from app.fleet.snapshot import FleetEncoder, build_fleet, read_segment, write_segment
+from app.fleet.store import FleetStore
+from app.fleet.timeline import ARRAY_FIELDS, Timeline
+from app.fleet.tracks import TrackStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+MANIFEST_FORMAT = 1
+KEEP_CHECKPOINTS = 2
+
+
+@dataclass
+class Checkpoint:
+    """A fleet mapped from a checkpoint, with the metadata it was written with."""
+
+    file: str
+    created_at: float
+    version: int
+    watermarks: dict
+    store: FleetStore
+    events: EventLog
+    tracks: TrackStore
+    timeline: Timeline | None
+
+
+def read_manifest(directory: Path) -> dict:
+    """The manifest of a checkpoint directory, empty if there is none yet."""
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {"format": MANIFEST_FORMAT, "checkpoints": []}
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"Unsupported checkpoint manifest format {manifest.get('format')}")
+    return manifest
+
+
+def _write_manifest(directory: Path, manifest: dict):
+    temporary = directory / f"{MANIFEST}.tmp"
+    temporary.write_text(json.dumps(manifest, indent=2) + "\n")
+    os.replace(temporary, directory / MANIFEST)
+
+
+class CheckpointWriter:
+    """Writes checkpoints of the shared fleet into a directory.
+
+    ``capture`` must run where the fleet is written (the event loop), so the
+    arrays and watermarks agree; ``write`` does the file I/O and may run in a
+    thread.
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._encoder = FleetEncoder()
+
+    def capture(
+        self, fleet: SharedFleet, watermarks: dict
+    ) -> tuple[dict, dict[str, np.ndarray]]:
+        """The header fields and arrays of a checkpoint of the fleet as it is now."""
+        header, arrays = self._encoder.encode(fleet.store, fleet.events, fleet.tracks)
+        timeline = fleet.current_timeline()
+        if timeline is not None:
+            timeline, timeline_arrays = timeline.to_arrays()
+            arrays.update({f"timeline/{name}": array for name, array in timeline_arrays.items()})
+        header.update(
+            version=fleet.version,
+            created_at=time.time(),
+            vessels=len(fleet.store),
+            events=len(fleet.events),
+            watermarks=watermarks,
+            timeline=timeline,
+        )
+        return header, arrays
+
+    def write(self, header: dict, arrays: dict[str, np.ndarray]) -> Path:
+        """Write a captured checkpoint, list it in the manifest and drop old ones."""
+        manifest = read_manifest(self.directory)
+        checkpoints = manifest["checkpoints"]
+        number = checkpoints[-1]["number"] + 1 if checkpoints else 1
+        path = self.directory / f"checkpoint-{number:06d}.fleet"
+        write_segment(path, header, arrays)
+        checkpoints.append(
+            {
+                "number": number,
+                "file": path.name,
+                "created_at": header["created_at"],
+                "version": header["version"],
+                "vessels": header["vessels"],
+                "events": header["events"],
+                "watermarks": header["watermarks"],
+            }
+        )
+        manifest["checkpoints"] = checkpoints[-KEEP_CHECKPOINTS:]
+        _write_manifest(self.directory, manifest)
+        kept = {entry["file"] for entry in manifest["checkpoints"]}
+        for old in self.directory.glob("checkpoint-*.fleet"):
+            if old.name not in kept:
+                old.unlink(missing_ok=True)
+        return path
+
+
+def load_checkpoint(directory: Path | str) -> Checkpoint | None:
+    """Map the newest readable checkpoint copy-on-write, or None if there is none.
+
+    Falls back to older checkpoints listed in the manifest if the newest
+    cannot be read.
+    """
+    directory = Path(directory)
+    for entry in reversed(read_manifest(directory)["checkpoints"]):
+        try:
+            header, arrays = read_segment(directory / entry["file"], writable=True)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping fleet checkpoint {entry['file']}: {e}")
+            continue
+        store, events, tracks = build_fleet(header, arrays)
+        timeline = None
+        if header.get("timeline"):
+            timeline = Timeline.from_arrays(
+                header["timeline"], {name: arrays[f"timeline/{name}"] for name in ARRAY_FIELDS}
+            )
+        return Checkpoint(
+            entry["file"],
+            header["created_at"],
+            header["version"],
+            header["watermarks"],
+            store,
+            events,
+            tracks,
+            timeline,
+        )
+    return None
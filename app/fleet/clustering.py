@@ -0,0 +1,161 @@
+import math
+import numpy as np
+from app.fleet.spatial import Bounds, intersects
+from app.models import VesselCluster
+
+MAX_MERCATOR_LAT = 85.05112878
+FINEST_BITS = 24
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 32 bits of every value."""
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in (
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_codes(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Z-order codes of the finest web-mercator grid cell of each position."""
+    cells = 1 << FINEST_BITS
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0
+    sin_lat = np.sin(
+        np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    )
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    ix = np.clip((x * cells).astype(np.int64), 0, cells - 1)
+    iy = np.clip((y * cells).astype(np.int64), 0, cells - 1)
+    return (_spread_bits(ix) | (_spread_bits(iy) << np.uint64(1))).astype(np.int64)
+
+
+class ClusterIndex:
+    """Zoom-dependent marker clustering in the style of supercluster.
+
+    Each position gets the Morton code of its web-mercator cell at the finest
+    resolution, and rows are kept sorted by that code. The cells of any coarser
+    zoom are then contiguous runs sharing a code prefix, so every zoom level is
+    a precomputed array of run starts over one shared order. Moving vessels
+    re-slots only the moved rows instead of re-sorting the fleet.
+    """
+
+    def __init__(self, max_zoom: int = 9, radius_px: int = 64, tile_size: int = 256):
+        self.max_zoom = max_zoom
+        self._cell_bits = max(int(math.log2(tile_size / radius_px)), 0)
+        self._order = np.empty(0, dtype=np.int64)
+        self._codes = np.empty(0, dtype=np.int64)
+        self._lat = np.empty(0, dtype=np.float64)
+        self._lng = np.empty(0, dtype=np.float64)
+        self._starts: list[np.ndarray] = []
+        self._version = 0
+        self._memo: tuple | None = None
+
+    def _shift(self, zoom: int) -> int:
+        return 2 * (FINEST_BITS - min(zoom + self._cell_bits, FINEST_BITS))
+
+    def _reindex(self):
+        self._starts = []
+        for zoom in range(self.max_zoom + 1):
+            prefixes = self._codes >> self._shift(zoom)
+            self._starts.append(
+                np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+                if len(prefixes)
+                else np.empty(0, dtype=np.int64)
+            )
+        self._version += 1
+        self._memo = None
+
+    def rebuild(self, lat: np.ndarray, lng: np.ndarray):
+        """Index every position from scratch."""
+        codes = morton_codes(lat, lng)
+        self._order = np.argsort(codes, kind="stable")
+        self._codes = codes[self._order]
+        self._lat = np.asarray(lat, dtype=np.float64)[self._order]
+        self._lng = np.asarray(lng, dtype=np.float64)[self._order]
+        self._reindex()
+
+    def move(self, rows: np.ndarray, lat: np.ndarray, lng: np.ndarray):
+        """Re-slot rows whose positions changed, keeping the order sorted."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        keep = ~np.isin(self._order, rows)
+        order, codes = self._order[keep], self._codes[keep]
+        moved_codes = morton_codes(lat, lng)
+        by_code = np.argsort(moved_codes, kind="stable")
+        rows, moved_codes = rows[by_code], moved_codes[by_code]
+        at = np.searchsorted(codes, moved_codes, side="right")
+        self._order = np.insert(order, at, rows)
+        self._codes = np.insert(codes, at, moved_codes)
+        self._lat = np.insert(self._lat[keep], at, np.asarray(lat)[by_code])
+        self._lng = np.insert(self._lng[keep], at, np.asarray(lng)[by_code])
+        self._reindex()
+
+    def query(
+        self, zoom: int, rows: np.ndarray, bounds: Bounds
+    ) -> tuple[list[VesselCluster], np.ndarray]:
+        """Clusters of the given rows at a zoom level, culled to bounds.
+
+        Returns the multi-vessel clusters and the sorted rows that stand alone
+        in their cell and should be drawn as individual markers.
+        """
+        zoom = min(max(zoom, 0), self.max_zoom)
+        key = (
+            self._version,
+            zoom,
+            tuple(bounds.values()),
+            hash(np.asarray(rows, dtype=np.int64).tobytes()),
+        )
+        if self._memo is not None and self._memo[0] == key:
+            return self._memo[1]
+        selected = np.zeros(len(self._order), dtype=bool)
+        selected[rows] = True
+        selected = selected[self._order]
+        starts = self._starts[zoom]
+        if not len(starts):
+            result = ([], np.empty(0, dtype=np.int64))
+            self._memo = (key, result)
+            return result
+        counts = np.add.reduceat(selected.astype(np.int64), starts)
+        lat_sum = np.add.reduceat(np.where(selected, self._lat, 0.0), starts)
+        lng_sum = np.add.reduceat(np.where(selected, self._lng, 0.0), starts)
+        south = np.minimum.reduceat(np.where(selected, self._lat, np.inf), starts)
+        north = np.maximum.reduceat(np.where(selected, self._lat, -np.inf), starts)
+        west = np.minimum.reduceat(np.where(selected, self._lng, np.inf), starts)
+        east = np.maximum.reduceat(np.where(selected, self._lng, -np.inf), starts)
+        in_view = intersects(bounds, south, west, north, east)
+        lengths = np.diff(np.r_[starts, len(self._order)])
+        alone = selected & (np.repeat(counts, lengths) == 1)
+        singles = np.sort(self._order[alone])
+        grouped = np.flatnonzero(in_view & (counts > 1))
+        prefixes = (self._codes[starts[grouped]] >> self._shift(zoom)).tolist()
+        clusters: list[VesselCluster] = [
+            {
+                "id": f"{zoom}:{prefix}",
+                "lat": lat / count,
+                "lng": lng / count,
+                "count": count,
+                "south": s,
+                "west": w,
+                "north": n,
+                "east": e,
+            }
+            for prefix, count, lat, lng, s, w, n, e in zip(
+                prefixes,
+                counts[grouped].tolist(),
+                lat_sum[grouped].tolist(),
+                lng_sum[grouped].tolist(),
+                south[grouped].tolist(),
+                west[grouped].tolist(),
+                north[grouped].tolist(),
+                east[grouped].tolist(),
+            )
+        ]
+        result = (clusters, singles)
+        self._memo = (key, result)
+        return result
@@ -0,0 +1,86 @@
+from typing import Iterable, Mapping, Sequence
+import numpy as np
+
+MAX_PACKED_KEYS = 1 << 62
+
+
+class AggregateCube:
+    """Vessel count and metric sums for every combination of dimension values.
+
+    Every group-by over a subset of the dimensions (a cuboid) is kept, keyed by
+    the codes of the dimensions it groups on; the empty subset is the "all"
+    rollup. Any set of equality filters on the dimensions is then answered by
+    one dict lookup, and each change touches one cell per cuboid.
+    """
+
+    def __init__(self, dimensions: Iterable[str], metrics: Iterable[str]):
+        self.dimensions = tuple(dimensions)
+        self.metrics = tuple(metrics)
+        self._positions = {field: i for i, field in enumerate(self.dimensions)}
+        self._cuboids = [
+            tuple(i for i in range(len(self.dimensions)) if mask >> i & 1)
+            for mask in range(1 << len(self.dimensions))
+        ]
+        self._cells: list[dict[tuple[int, ...], list[int]]] = [{} for _ in self._cuboids]
+
+    def __len__(self) -> int:
+        """Number of non-empty cells across all cuboids."""
+        return sum(len(cells) for cells in self._cells)
+
+    @staticmethod
+    def _accumulate(cells: dict, key: tuple[int, ...], totals: Sequence[int]):
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = list(totals)
+            return
+        for i, total in enumerate(totals):
+            cell[i] += total
+        if not cell[0]:
+            del cells[key]
+
+    def add_row(self, codes: Sequence[int], values: Sequence[int], sign: int = 1):
+        """Add (or with ``sign=-1`` remove) one vessel's contribution."""
+        totals = [sign, *(sign * value for value in values)]
+        for cells, dims in zip(self._cells, self._cuboids):
+            self._accumulate(cells, tuple(codes[i] for i in dims), totals)
+
+    def add(self, codes: np.ndarray, values: np.ndarray, sign: int = 1):
+        """Add (or remove) many vessels at once.
+
+        ``codes`` is (rows, dimensions) and ``values`` is (rows, metrics).
+        """
+        if not len(codes):
+            return
+        weights = [np.ones(len(codes))] + [values[:, i] for i in range(len(self.metrics))]
+        sizes = codes.max(axis=0) + 1
+        for cells, dims in zip(self._cells, self._cuboids):
+            if not dims:
+                totals = [sign * int(w.sum()) for w in weights]
+                self._accumulate(cells, (), totals)
+                continue
+            shape = tuple(int(sizes[i]) for i in dims)
+            if np.prod(shape, dtype=float) < MAX_PACKED_KEYS:
+                packed = np.ravel_multi_index(tuple(codes[:, i] for i in dims), shape)
+                keys, inverse = np.unique(packed, return_inverse=True)
+                keys = np.column_stack(np.unravel_index(keys, shape))
+            else:
+                keys, inverse = np.unique(codes[:, dims], axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            sums = np.column_stack(
+                [np.bincount(inverse, weights=w, minlength=len(keys)) for w in weights]
+            )
+            sums = (sign * np.rint(sums)).astype(np.int64)
+            if not cells and sign > 0:
+                cells.update(zip(map(tuple, keys.tolist()), sums.tolist()))
+                continue
+            for key, totals in zip(keys.tolist(), sums.tolist()):
+                self._accumulate(cells, tuple(key), totals)
+
+    def query(self, codes: Mapping[str, int]) -> list[int]:
+        """[count, *metric sums] of the vessels matching every ``field: code``."""
+        positions = sorted(self._positions[field] for field in codes)
+        mask = sum(1 << i for i in positions)
+        by_position = {self._positions[field]: code for field, code in codes.items()}
+        key = tuple(by_position[i] for i in positions)
+        cell = self._cells[mask].get(key)
+        return list(cell) if cell else [0] * (1 + len(self.metrics))
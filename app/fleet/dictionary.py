@@ -0,0 +1,25 @@
+class Dictionary:
+    """Maps the distinct values of a categorical column to dense integer codes."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        """Return the code for a value, assigning a new one if it is unseen."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int | None:
+        """Return the code for a value, or None if it has never been stored."""
+        return self._codes.get(value)
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
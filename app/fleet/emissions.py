@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from typing import Hashable, Mapping
+import numpy as np
+from app.fleet.dictionary import Dictionary
+from app.models import EmissionsGroup, EmissionsReport, MachineryEmissions
+
+POLLUTANTS = ("co2", "sox", "nox")
+MACHINERY = ("propulsion", "auxiliary", "boiler")
+# Tonnes emitted per tonne of fuel burnt (IMO Fourth GHG Study, Tier II NOx).
+FUEL_FACTORS: dict[str, tuple[float, float, float]] = {
+    "VLSFO": (3.151, 0.0098, 0.0759),
+    "MGO": (3.206, 0.0020, 0.0569),
+    "LNG": (2.750, 0.00003, 0.0139),
+}
+DEFAULT_FUEL = "VLSFO"
+FUEL_BY_TYPE = {"Ferry": "MGO"}
+# Share of fuel burnt by each machinery group.
+DEFAULT_SPLIT = (0.80, 0.15, 0.05)
+MACHINERY_SPLIT_BY_TYPE = {
+    "Tanker": (0.70, 0.12, 0.18),
+    "Container": (0.82, 0.14, 0.04),
+    "Ferry": (0.70, 0.28, 0.02),
+}
+TOP_GROUPS = 10
+EMISSION_FIELDS = ("type", "origin_port", "destination_port", "fuel_consumption_mt")
+
+
+def _type_table(types: Dictionary, table: Mapping[str, tuple], default: tuple) -> np.ndarray:
+    """One row per type code, looked up by type name."""
+    return np.array([table.get(name, default) for name in types.values], dtype=np.float64)
+
+
+def _groups(labels: list[str], fuel: np.ndarray, emissions: np.ndarray) -> list[EmissionsGroup]:
+    """The TOP_GROUPS groups by CO2, heaviest first."""
+    top = np.argsort(-emissions[:, 0], kind="stable")[:TOP_GROUPS]
+    top = top[emissions[top, 0] > 0]
+    return [
+        {
+            "label": labels[i],
+            "fuel_mt": round(float(fuel[i]), 1),
+            "co2_t": round(float(emissions[i, 0]), 1),
+            "sox_t": round(float(emissions[i, 1]), 2),
+            "nox_t": round(float(emissions[i, 2]), 2),
+        }
+        for i in top.tolist()
+    ]
+
+
+def _sum_by(codes: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Column-wise sums of ``weights`` grouped by code."""
+    return np.column_stack(
+        [np.bincount(codes, weights=column, minlength=size) for column in weights.T]
+    )
+
+
+class EmissionsEngine:
+    """CO2, SOx and NOx of the fleet's voyages, grouped for the analytics charts.
+
+    Fuel burnt is converted with per-fuel factors (the fuel is inferred from
+    the vessel type) and split by machinery, then grouped by origin port and
+    by route with bincounts over the dictionary codes. Reports are memoized
+    on the caller's key, which should change whenever the selection or the
+    fields it reads change; everything else is a cache hit.
+    """
+
+    def __init__(self, cache_size: int = 64):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[Hashable, EmissionsReport] = OrderedDict()
+
+    def get(self, key: Hashable) -> EmissionsReport | None:
+        """The memoized report for a key, if there is one."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+        return cached
+
+    def report(
+        self,
+        key: Hashable,
+        rows: np.ndarray,
+        columns: Mapping[str, np.ndarray],
+        dictionaries: Mapping[str, Dictionary],
+    ) -> EmissionsReport:
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        report = self._compute(rows, columns, dictionaries)
+        self._cache[key] = report
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return report
+
+    def clear(self):
+        self._cache.clear()
+
+    def _compute(
+        self,
+        rows: np.ndarray,
+        columns: Mapping[str, np.ndarray],
+        dictionaries: Mapping[str, Dictionary],
+    ) -> EmissionsReport:
+        types = dictionaries["type"]
+        fuel_names = list(FUEL_FACTORS)
+        fuel_of_type = np.array(
+            [fuel_names.index(FUEL_BY_TYPE.get(name, DEFAULT_FUEL)) for name in types.values],
+            dtype=np.int64,
+        )
+        factors = np.array([FUEL_FACTORS[name] for name in fuel_names])
+        splits = _type_table(types, MACHINERY_SPLIT_BY_TYPE, DEFAULT_SPLIT)
+
+        type_codes = columns["type"][rows]
+        fuel = columns["fuel_consumption_mt"][rows].astype(np.float64)
+        emissions = fuel[:, None] * factors[fuel_of_type[type_codes]]
+
+        co2_by_type = np.bincount(type_codes, weights=emissions[:, 0], minlength=len(types))
+        machinery = co2_by_type[:, None] * splits
+        by_machinery: list[MachineryEmissions] = [
+            {
+                "label": types.decode(code),
+                **{part: round(float(machinery[code, i]), 1) for i, part in enumerate(MACHINERY)},
+            }
+            for code in np.flatnonzero(co2_by_type).tolist()
+        ]
+
+        ports = dictionaries["origin_port"]
+        origins = columns["origin_port"][rows]
+        port_sums = _sum_by(origins, np.column_stack([fuel, emissions]), len(ports))
+        by_port = _groups(ports.values, port_sums[:, 0], port_sums[:, 1:])
+
+        destinations = dictionaries["destination_port"]
+        route_keys = origins.astype(np.int64) * len(destinations) + columns["destination_port"][rows]
+        routes, inverse = np.unique(route_keys, return_inverse=True)
+        route_sums = _sum_by(inverse.ravel(), np.column_stack([fuel, emissions]), len(routes))
+        route_labels = [
+            f"{ports.decode(key // len(destinations))} → {destinations.decode(key % len(destinations))}"
+            for key in routes.tolist()
+        ]
+        by_route = _groups(route_labels, route_sums[:, 0], route_sums[:, 1:])
+
+        totals = emissions.sum(axis=0) if len(rows) else np.zeros(len(POLLUTANTS))
+        return {
+            "fuel_mt": round(float(fuel.sum()), 1),
+            "co2_t": round(float(totals[0]), 1),
+            "sox_t": round(float(totals[1]), 2),
+            "nox_t": round(float(totals[2]), 2),
+            "by_machinery": by_machinery,
+            "by_port": by_port,
+            "by_route": by_route,
+        }
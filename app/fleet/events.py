@@ -0,0 +1,189 @@
+import datetime
+import heapq
+from bisect import bisect_left, insort
+from typing import Collection, Iterable, Iterator, Mapping, Sequence
+from app.models import Event
+
+GLOBAL_SCAN_RATIO = 0.5
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """Epoch seconds of an ISO 8601 event timestamp (naive times are UTC)."""
+    parsed = datetime.datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def format_cursor(key: tuple[int, int]) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+def parse_cursor(cursor: str) -> tuple[int, int] | None:
+    if not cursor:
+        return None
+    epoch, _, seq = cursor.partition(":")
+    return int(epoch), int(seq)
+
+
+def _merge_into(keys: list[tuple[int, int]], added: list[tuple[int, int]]):
+    """Merge new keys into a sorted key list in place."""
+    added.sort()
+    if not keys or not added or keys[-1] < added[0]:
+        keys.extend(added)
+    else:
+        keys[:] = heapq.merge(keys, added)
+
+
+class EventLog:
+    """Append-optimised, time-ordered event history with a per-vessel index.
+
+    Each event is keyed by (epoch seconds, insertion sequence), parsed once on
+    append. Keys are kept sorted globally and per vessel; in-order appends are
+    O(1), late events are inserted by binary search.
+    """
+
+    def __init__(self):
+        self._events: list[Event] = []
+        self._order: list[tuple[int, int]] = []
+        self._by_vessel: dict[str, list[tuple[int, int]]] = {}
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "EventLog":
+        log = cls()
+        log.extend(events)
+        return log
+
+    @classmethod
+    def from_parts(
+        cls,
+        events: Sequence[Event],
+        order: Sequence[tuple[int, int]],
+        by_vessel: Mapping[str, Sequence[tuple[int, int]]],
+    ) -> "EventLog":
+        """A log over existing events and sorted keys, as returned by ``parts``.
+
+        Any sequences will do, such as views over a mapped snapshot; a log
+        built over read-only ones cannot be appended to.
+        """
+        log = cls()
+        log._events = events
+        log._order = order
+        log._by_vessel = by_vessel
+        return log
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def parts(
+        self,
+    ) -> tuple[list[Event], list[tuple[int, int]], dict[str, list[tuple[int, int]]]]:
+        """The events in insertion order, and the global and per-vessel sorted keys."""
+        return self._events, self._order, self._by_vessel
+
+    def append(self, event: Event):
+        key = (parse_timestamp(event["timestamp"]), len(self._events))
+        self._events.append(event)
+        vessel_keys = self._by_vessel.setdefault(event["vessel_id"], [])
+        for keys in (self._order, vessel_keys):
+            if not keys or keys[-1] < key:
+                keys.append(key)
+            else:
+                insort(keys, key)
+
+    def extend(self, events: Iterable[Event]):
+        """Append a batch, merging it into the sorted orders in one pass."""
+        start = len(self._events)
+        batch = list(events)
+        keys = [
+            (parse_timestamp(event["timestamp"]), start + offset)
+            for offset, event in enumerate(batch)
+        ]
+        self._events.extend(batch)
+        by_vessel: dict[str, list[tuple[int, int]]] = {}
+        for key, event in zip(keys, batch):
+            by_vessel.setdefault(event["vessel_id"], []).append(key)
+        _merge_into(self._order, keys)
+        for vessel_id, vessel_keys in by_vessel.items():
+            _merge_into(self._by_vessel.setdefault(vessel_id, []), vessel_keys)
+
+    def timed(self) -> Iterator[tuple[int, Event]]:
+        """Every event with its epoch seconds, oldest first."""
+        for epoch, seq in self._order:
+            yield epoch, self._events[seq]
+
+    def time_range(self) -> tuple[int, int] | None:
+        """Epoch seconds of the oldest and newest event, or None without any."""
+        if not len(self._order):
+            return None
+        return self._order[0][0], self._order[-1][0]
+
+    def count(self, vessel_ids: Collection[str] | None = None) -> int:
+        """Number of events for the given vessels (None means all)."""
+        if vessel_ids is None:
+            return len(self._events)
+        return sum(len(self._by_vessel.get(vessel_id, ())) for vessel_id in vessel_ids)
+
+    def recent(
+        self,
+        vessel_ids: Collection[str] | None = None,
+        limit: int = 50,
+        cursor: str = "",
+    ) -> tuple[list[Event], str]:
+        """Newest events first for the given vessels (None means all).
+
+        Returns at most ``limit`` events older than ``cursor`` and the cursor
+        for the following page, which is empty when there are no more.
+        """
+        before = parse_cursor(cursor)
+        if vessel_ids is None:
+            keys = self._scan(self._order, before, limit, None)
+        elif len(vessel_ids) > GLOBAL_SCAN_RATIO * len(self._by_vessel):
+            keys = self._scan(self._order, before, limit, vessel_ids)
+        else:
+            keys = self._merge(vessel_ids, before, limit)
+        events = [self._events[seq] for _, seq in keys[:limit]]
+        next_cursor = format_cursor(keys[limit - 1]) if len(keys) > limit else ""
+        return events, next_cursor
+
+    def _scan(
+        self,
+        keys: list[tuple[int, int]],
+        before: tuple[int, int] | None,
+        limit: int,
+        vessel_ids: Collection[str] | None,
+    ) -> list[tuple[int, int]]:
+        """Walk the global order backwards, optionally skipping other vessels."""
+        index = len(keys) if before is None else bisect_left(keys, before)
+        found = []
+        while index > 0 and len(found) <= limit:
+            index -= 1
+            key = keys[index]
+            if vessel_ids is None or self._events[key[1]]["vessel_id"] in vessel_ids:
+                found.append(key)
+        return found
+
+    def _merge(
+        self, vessel_ids: Collection[str], before: tuple[int, int] | None, limit: int
+    ) -> list[tuple[int, int]]:
+        """K-way merge of the selected vessels' streams, newest first."""
+        heap = []
+        for vessel_id in vessel_ids:
+            keys = self._by_vessel.get(vessel_id)
+            if not keys:
+                continue
+            index = len(keys) if before is None else bisect_left(keys, before)
+            if index:
+                key = keys[index - 1]
+                heap.append((-key[0], -key[1], index - 1, keys))
+        heapq.heapify(heap)
+        found = []
+        while heap and len(found) <= limit:
+            epoch, seq, index, keys = heap[0]
+            found.append((-epoch, -seq))
+            if index:
+                key = keys[index - 1]
+                heapq.heapreplace(heap, (-key[0], -key[1], index - 1, keys))
+            else:
+                heapq.heappop(heap)
+        return found
@@ -0,0 +1,105 @@
+import heapq
+from bisect import bisect_left
+from typing import Iterable
+import numpy as np
+from app.fleet.dictionary import Dictionary
+
+
+class Facet:
+    """Per-code counts and the sorted distinct values present for one field."""
+
+    def __init__(self, dictionary: Dictionary):
+        self.dictionary = dictionary
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.values: list[str] = []
+
+    def _grow(self):
+        size = len(self.dictionary)
+        if size > len(self.counts):
+            grown = np.zeros(max(size, 2 * len(self.counts)), dtype=np.int64)
+            grown[: len(self.counts)] = self.counts
+            self.counts = grown
+
+    def add(self, codes: np.ndarray):
+        self._grow()
+        before = self.counts.copy() if len(codes) > 1 else None
+        added = np.bincount(codes, minlength=len(self.counts))
+        self.counts += added
+        if before is None:
+            code = int(codes[0])
+            if self.counts[code] == 1:
+                self._insert(self.dictionary.decode(code))
+            return
+        appeared = np.flatnonzero((before == 0) & (added > 0))
+        if len(appeared):
+            decoded = self.dictionary.values
+            new = sorted(decoded[code] for code in appeared.tolist())
+            self.values = list(heapq.merge(self.values, new))
+
+    def remove(self, code: int):
+        self.counts[code] -= 1
+        if not self.counts[code]:
+            value = self.dictionary.decode(code)
+            del self.values[bisect_left(self.values, value)]
+
+    def _insert(self, value: str):
+        self.values.insert(bisect_left(self.values, value), value)
+
+    def count(self, value: str) -> int:
+        code = self.dictionary.lookup(value)
+        if code is None or code >= len(self.counts):
+            return 0
+        return int(self.counts[code])
+
+
+class FacetEngine:
+    """Keeps the distinct values and their counts of each facet field current.
+
+    Counts are adjusted as rows are added, changed or removed, so the filter
+    dropdowns never need a scan and sort of the whole fleet.
+    """
+
+    def __init__(self, dictionaries: dict[str, Dictionary], fields: Iterable[str]):
+        self._facets = {field: Facet(dictionaries[field]) for field in fields}
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._facets
+
+    def rebind(self, dictionaries: dict[str, Dictionary]):
+        """Point each facet at a newer copy of its (append-only) dictionary."""
+        for field, facet in self._facets.items():
+            facet.dictionary = dictionaries[field]
+
+    def extend(self, field: str, codes: np.ndarray):
+        if len(codes):
+            self._facets[field].add(codes)
+
+    def move(self, field: str, old_code: int, new_code: int):
+        facet = self._facets[field]
+        facet.add(np.array([new_code]))
+        facet.remove(old_code)
+
+    def discard(self, field: str, code: int):
+        self._facets[field].remove(code)
+
+    def values(self, field: str) -> list[str]:
+        """Sorted distinct values of a field present in the fleet."""
+        return list(self._facets[field].values)
+
+    def counts(self, field: str) -> dict[str, int]:
+        """Number of vessels holding each distinct value of a field."""
+        facet = self._facets[field]
+        return {value: facet.count(value) for value in facet.values}
+
+    def cross_counts(self, field: str, codes: np.ndarray | None) -> dict[str, int]:
+        """Counts per value of a field within the rows selected by other filters.
+
+        ``codes`` are the field's codes for those rows, or None when no other
+        filter is active and the maintained totals already answer the question.
+        """
+        if codes is None:
+            return self.counts(field)
+        facet = self._facets[field]
+        tally = np.bincount(codes, minlength=len(facet.counts)).tolist()
+        lookup = facet.dictionary.lookup
+        return {value: tally[lookup(value)] for value in facet.values}
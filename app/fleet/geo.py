@@ -0,0 +1,80 @@
+import math
+import numpy as np
+from app.fleet.spatial import Bounds
+from app.fleet.tracks import TrackStore
+
+EARTH_RADIUS_NM = 3440.065
+HALF_CIRCUMFERENCE_NM = math.pi * EARTH_RADIUS_NM
+MIN_LEG_NM = 0.01
+
+
+def haversine_nm(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in nautical miles, broadcasting over arrays."""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearing_deg(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Initial great-circle bearing in degrees from north, broadcasting over arrays."""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    dlng = lng2 - lng1
+    y = np.sin(dlng) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlng)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def cap_bounds(lat: float, lng: float, radius_nm: float) -> Bounds:
+    """The smallest lat/lng box holding every point within a radius of a point.
+
+    The longitude half-width is the exact extent of the spherical cap, so the
+    box widens towards the poles; a cap over a pole spans every longitude.
+    """
+    angle = radius_nm / EARTH_RADIUS_NM
+    dlat = math.degrees(angle)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90.0 or north >= 90.0 or angle >= math.pi / 2:
+        return {"south": max(south, -90.0), "west": -180.0, "north": min(north, 90.0), "east": 180.0}
+    ratio = math.sin(angle) / math.cos(math.radians(lat))
+    if ratio >= 1.0:
+        return {"south": south, "west": -180.0, "north": north, "east": 180.0}
+    dlng = math.degrees(math.asin(ratio))
+    return {"south": south, "west": lng - dlng, "north": north, "east": lng + dlng}
+
+
+def track_distances_nm(tracks: TrackStore) -> tuple[list[str], np.ndarray]:
+    """Distance sailed along each vessel's retained track, in one pass.
+
+    All tracks are concatenated and every consecutive pair of fixes of the
+    same vessel is measured with one vectorized haversine.
+    """
+    ids, lengths, lats, lngs = [], [], [], []
+    for vessel_id, points in tracks.items():
+        ids.append(vessel_id)
+        lengths.append(len(points))
+        lats.append(points[:, 1])
+        lngs.append(points[:, 2])
+    if not ids:
+        return [], np.empty(0)
+    lat, lng = np.concatenate(lats), np.concatenate(lngs)
+    owner = np.repeat(np.arange(len(ids)), lengths)
+    legs = haversine_nm(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    same = owner[:-1] == owner[1:]
+    totals = np.bincount(owner[:-1][same], weights=legs[same], minlength=len(ids))
+    return ids, totals
+
+
+def headings_deg(tracks: TrackStore, vessel_ids: list[str]) -> np.ndarray:
+    """Each vessel's course over its last leg, NaN when it has no usable leg.
+
+    A leg shorter than MIN_LEG_NM (a vessel at berth) has no heading.
+    """
+    legs = tracks.last_legs(vessel_ids)
+    lat1, lng1, lat2, lng2 = legs.T
+    with np.errstate(invalid="ignore"):
+        bearings = initial_bearing_deg(lat1, lng1, lat2, lng2)
+        moved = haversine_nm(lat1, lng1, lat2, lng2) >= MIN_LEG_NM
+    return np.where(moved, bearings, np.nan)
@@ -0,0 +1,347 @@
+import datetime
+from typing import Literal, Sequence, TypedDict
+import numpy as np
+from app.fleet.dictionary import Dictionary
+from app.models import Event
+
+GRID_CELL_DEG = 0.1
+MOORED_KN = 1.0
+ANCHORED_KN = 0.5
+UNDERWAY_KN = 2.0
+UNSET, AT_SEA, IN_PORT, AT_ANCHOR = -1, 0, 1, 2
+HOLD = -2
+DWELL_S = {AT_SEA: 300.0, IN_PORT: 600.0, AT_ANCHOR: 900.0}
+
+
+class Zone(TypedDict):
+    """A named port or anchorage area, as a polygon of (lat, lng) vertices."""
+
+    name: str
+    kind: Literal["port", "anchorage"]
+    polygon: list[tuple[float, float]]
+
+
+DEFAULT_ZONES: list[Zone] = [
+    {
+        "name": "Port of London",
+        "kind": "port",
+        "polygon": [(51.43, 0.30), (51.47, 0.30), (51.47, 0.42), (51.44, 0.42)],
+    },
+    {
+        "name": "Thames Estuary",
+        "kind": "anchorage",
+        "polygon": [(51.48, 1.00), (51.56, 1.00), (51.56, 1.25), (51.48, 1.25)],
+    },
+    {
+        "name": "Port of Le Havre",
+        "kind": "port",
+        "polygon": [(49.45, 0.08), (49.49, 0.08), (49.48, 0.25), (49.44, 0.25)],
+    },
+    {
+        "name": "Le Havre Roads",
+        "kind": "anchorage",
+        "polygon": [(49.50, -0.15), (49.58, -0.15), (49.58, 0.02), (49.50, 0.02)],
+    },
+    {
+        "name": "Port of Rotterdam",
+        "kind": "port",
+        "polygon": [(51.93, 3.98), (51.99, 3.98), (51.92, 4.30), (51.87, 4.30)],
+    },
+    {
+        "name": "Maas Anchorage",
+        "kind": "anchorage",
+        "polygon": [(52.00, 3.60), (52.12, 3.60), (52.12, 3.90), (52.00, 3.90)],
+    },
+    {
+        "name": "Port of New York",
+        "kind": "port",
+        "polygon": [(40.63, -74.18), (40.71, -74.18), (40.71, -74.00), (40.63, -74.04)],
+    },
+    {
+        "name": "Gravesend Bay",
+        "kind": "anchorage",
+        "polygon": [(40.56, -74.06), (40.61, -74.06), (40.61, -74.00), (40.56, -74.00)],
+    },
+    {
+        "name": "Port of Tokyo",
+        "kind": "port",
+        "polygon": [(35.58, 139.74), (35.66, 139.74), (35.66, 139.84), (35.58, 139.84)],
+    },
+    {
+        "name": "Tokyo Bay",
+        "kind": "anchorage",
+        "polygon": [(35.40, 139.72), (35.55, 139.72), (35.55, 139.90), (35.40, 139.90)],
+    },
+    {
+        "name": "Port of Sydney",
+        "kind": "port",
+        "polygon": [(-34.00, 151.17), (-33.94, 151.17), (-33.94, 151.24), (-34.00, 151.24)],
+    },
+    {
+        "name": "Sydney Offshore",
+        "kind": "anchorage",
+        "polygon": [(-34.10, 151.26), (-33.95, 151.26), (-33.95, 151.40), (-34.10, 151.40)],
+    },
+    {
+        "name": "Port of Singapore",
+        "kind": "port",
+        "polygon": [(1.23, 103.70), (1.29, 103.70), (1.29, 103.86), (1.23, 103.86)],
+    },
+    {
+        "name": "Singapore Eastern Anchorage",
+        "kind": "anchorage",
+        "polygon": [(1.22, 103.87), (1.29, 103.87), (1.31, 104.02), (1.24, 104.02)],
+    },
+]
+
+
+def _format_time(epoch: float) -> str:
+    return (
+        datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc)
+        .isoformat(timespec="seconds")
+        .replace("+00:00", "Z")
+    )
+
+
+class Geofence:
+    """Turns position updates into Departure/Arrival/At Anchor events.
+
+    Zone bounding boxes are rasterised onto a fine lat/lng grid once, so a
+    batch of positions is matched to candidate zones with one sorted lookup
+    and only those (position, zone) pairs get an exact point-in-polygon test.
+    Each vessel keeps a small state machine (at sea, in port, at anchor); a
+    new state must hold, at the right speed, for its dwell time before it is
+    confirmed and an event is emitted.
+    """
+
+    def __init__(self, zones: Sequence[Zone] = DEFAULT_ZONES, cell_deg: float = GRID_CELL_DEG):
+        self.zones = list(zones)
+        self.cell_deg = cell_deg
+        self._cols = int(np.ceil(360.0 / cell_deg))
+        self._is_port = np.array([zone["kind"] == "port" for zone in self.zones], dtype=bool)
+        self._edges = []
+        cells, owners = [], []
+        for index, zone in enumerate(self.zones):
+            vertices = np.array(zone["polygon"], dtype=np.float64)
+            self._edges.append((vertices, np.roll(vertices, -1, axis=0)))
+            (row_lo, row_hi), (col_lo, col_hi) = self._cell_rc(
+                np.array([vertices[:, 0].min(), vertices[:, 0].max()]),
+                np.array([vertices[:, 1].min(), vertices[:, 1].max()]),
+            )
+            rows, cols = np.mgrid[row_lo : row_hi + 1, col_lo : col_hi + 1]
+            zone_cells = (rows * self._cols + cols).ravel()
+            cells.append(zone_cells)
+            owners.append(np.full(len(zone_cells), index, dtype=np.int64))
+        cells = np.concatenate(cells) if cells else np.empty(0, dtype=np.int64)
+        owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        order = np.lexsort((owners, cells))
+        self._cells, self._owners = cells[order], owners[order]
+        self.ids = Dictionary()
+        self._state = np.empty(0, dtype=np.int8)
+        self._zone = np.empty(0, dtype=np.int64)
+        self._pending = np.empty(0, dtype=np.int8)
+        self._pending_zone = np.empty(0, dtype=np.int64)
+        self._since = np.empty(0, dtype=np.float64)
+        self._dwell = np.array([DWELL_S[AT_SEA], DWELL_S[IN_PORT], DWELL_S[AT_ANCHOR]])
+
+    def _cell_rc(self, lat: np.ndarray, lng: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        row = ((np.asarray(lat) + 90.0) // self.cell_deg).astype(np.int64)
+        col = ((np.asarray(lng) + 180.0) // self.cell_deg).astype(np.int64)
+        return row, np.clip(col, 0, self._cols - 1)
+
+    def locate(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Index of the zone containing each position, or -1 (ports win ties)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        zones = np.full(len(lat), -1, dtype=np.int64)
+        if not len(lat) or not len(self._cells):
+            return zones
+        row, col = self._cell_rc(lat, lng)
+        cells = row * self._cols + col
+        starts = np.searchsorted(self._cells, cells, side="left")
+        counts = np.searchsorted(self._cells, cells, side="right") - starts
+        points = np.repeat(np.arange(len(lat)), counts)
+        if not len(points):
+            return zones
+        offsets = np.arange(len(points)) - np.repeat(np.cumsum(counts) - counts, counts)
+        owners = self._owners[np.repeat(starts, counts) + offsets]
+        inside = np.zeros(len(points), dtype=bool)
+        for zone in np.unique(owners).tolist():
+            pairs = np.flatnonzero(owners == zone)
+            inside[pairs] = self._contains(zone, lat[points[pairs]], lng[points[pairs]])
+        points, owners = points[inside], owners[inside]
+        rank = np.where(self._is_port[owners], owners, owners + len(self.zones))
+        best = np.full(len(lat), 2 * len(self.zones), dtype=np.int64)
+        np.minimum.at(best, points, rank)
+        found = best < 2 * len(self.zones)
+        zones[found] = best[found] % len(self.zones)
+        return zones
+
+    def _contains(self, zone: int, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Even-odd ray casting of many points against one zone's polygon."""
+        start, end = self._edges[zone]
+        lat1, lng1 = start[:, 0], start[:, 1]
+        lat2, lng2 = end[:, 0], end[:, 1]
+        y, x = lat[:, None], lng[:, None]
+        straddles = (lat1 > y) != (lat2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = lng1 + (y - lat1) * (lng2 - lng1) / (lat2 - lat1)
+        return np.count_nonzero(straddles & (x < crossing), axis=1) % 2 == 1
+
+    def _codes(self, vessel_ids: Sequence[str]) -> np.ndarray:
+        encode = self.ids.encode
+        codes = np.fromiter((encode(v) for v in vessel_ids), dtype=np.int64, count=len(vessel_ids))
+        grow = len(self.ids) - len(self._state)
+        if grow > 0:
+            self._state = np.concatenate([self._state, np.full(grow, UNSET, dtype=np.int8)])
+            self._zone = np.concatenate([self._zone, np.full(grow, -1, dtype=np.int64)])
+            self._pending = np.concatenate([self._pending, np.full(grow, UNSET, dtype=np.int8)])
+            self._pending_zone = np.concatenate(
+                [self._pending_zone, np.full(grow, -1, dtype=np.int64)]
+            )
+            self._since = np.concatenate([self._since, np.zeros(grow)])
+        return codes
+
+    def _candidates(self, zones: np.ndarray, sog: np.ndarray) -> np.ndarray:
+        """The state each position suggests, or HOLD when it is ambiguous."""
+        unknown = np.isnan(sog)
+        in_zone = zones >= 0
+        is_port = in_zone & self._is_port[np.maximum(zones, 0)]
+        candidates = np.full(len(zones), HOLD, dtype=np.int8)
+        candidates[is_port & (unknown | (sog <= MOORED_KN))] = IN_PORT
+        candidates[in_zone & ~is_port & (unknown | (sog <= ANCHORED_KN))] = AT_ANCHOR
+        candidates[~in_zone & (unknown | (sog >= UNDERWAY_KN))] = AT_SEA
+        return candidates
+
+    def update(
+        self,
+        vessel_ids: Sequence[str],
+        names: Sequence[str],
+        timestamps: Sequence[float],
+        lat: Sequence[float],
+        lng: Sequence[float],
+        sog: Sequence[float | None],
+    ) -> list[Event]:
+        """Advance every vessel's state by a batch of positions.
+
+        Missing speeds are given as None or NaN and treated as matching any
+        threshold. Returns the events of the transitions confirmed by this
+        batch, stamped with the time the new state began.
+        """
+        if not len(vessel_ids):
+            return []
+        codes = self._codes(vessel_ids)
+        times = np.asarray(timestamps, dtype=np.float64)
+        zones = self.locate(lat, lng)
+        zones_or_sea = zones.copy()
+        speeds = np.array([np.nan if s is None else s for s in sog], dtype=np.float64)
+        candidates = self._candidates(zones, speeds)
+        zones_or_sea[candidates == AT_SEA] = -1
+        # Each round takes at most one update per vessel, oldest first, so
+        # the state machines advance in time order with whole-array steps.
+        order = np.lexsort((times, codes))
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        transitions = []
+        for step in range(int(rank.max()) + 1):
+            batch = order[rank == step]
+            transitions.extend(
+                self._step(batch, codes[batch], times[batch], candidates[batch], zones_or_sea[batch])
+            )
+        events = []
+        for i, since, previous, previous_zone, state, zone in sorted(
+            transitions, key=lambda transition: transition[1]
+        ):
+            events.extend(
+                self._events(
+                    vessel_ids[i], names[i], since, previous, previous_zone, state, zone
+                )
+            )
+        return events
+
+    def _step(
+        self,
+        batch: np.ndarray,
+        codes: np.ndarray,
+        times: np.ndarray,
+        candidates: np.ndarray,
+        zones: np.ndarray,
+    ) -> list[tuple]:
+        state, zone = self._state[codes], self._zone[codes]
+        fresh = (state == UNSET) & (candidates != HOLD)
+        self._state[codes[fresh]] = candidates[fresh]
+        self._zone[codes[fresh]] = zones[fresh]
+        moving = (state != UNSET) & (candidates != HOLD)
+        moving &= (candidates != state) | (zones != zone)
+        settled = (state != UNSET) & (candidates == state) & (zones == zone)
+        self._pending[codes[settled]] = UNSET
+        pending_match = (self._pending[codes] == candidates) & (
+            self._pending_zone[codes] == zones
+        )
+        started = moving & ~pending_match
+        self._pending[codes[started]] = candidates[started]
+        self._pending_zone[codes[started]] = zones[started]
+        self._since[codes[started]] = times[started]
+        since = self._since[codes]
+        confirmed = moving & (times - since >= self._dwell[np.maximum(candidates, 0)])
+        confirmed &= candidates >= 0
+        hits = np.flatnonzero(confirmed)
+        if not len(hits):
+            return []
+        changed = codes[hits]
+        self._state[changed] = candidates[hits]
+        self._zone[changed] = zones[hits]
+        self._pending[changed] = UNSET
+        return list(
+            zip(
+                batch[hits].tolist(),
+                since[hits].tolist(),
+                state[hits].tolist(),
+                zone[hits].tolist(),
+                candidates[hits].tolist(),
+                zones[hits].tolist(),
+            )
+        )
+
+    def _events(
+        self,
+        vessel_id: str,
+        name: str,
+        since: float,
+        previous: int,
+        previous_zone: int,
+        state: int,
+        zone: int,
+    ) -> list[Event]:
+        """Events for one confirmed transition; leaving a port is a Departure."""
+        found = []
+        if previous == IN_PORT:
+            found.append(("Departure", previous_zone))
+        if state == IN_PORT:
+            found.append(("Arrival", zone))
+        elif state == AT_ANCHOR:
+            found.append(("At Anchor", zone))
+        elif previous == AT_ANCHOR:
+            found.append(("In Transit", previous_zone))
+        timestamp = _format_time(since)
+        return [
+            {
+                "id": f"{vessel_id}:{int(since)}:{event_type}",
+                "vessel_id": vessel_id,
+                "timestamp": timestamp,
+                "event_type": event_type,
+                "location": self.zones[location]["name"],
+                "vessel_name": name,
+            }
+            for event_type, location in found
+        ]
+
+    def states(self) -> dict[str, int]:
+        """How many tracked vessels are in each confirmed state."""
+        counts = np.bincount(self._state[self._state >= 0], minlength=3)
+        return {
+            "at_sea": int(counts[AT_SEA]),
+            "in_port": int(counts[IN_PORT]),
+            "at_anchor": int(counts[AT_ANCHOR]),
+        }
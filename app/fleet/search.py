@@ -0,0 +1,164 @@
+import math
+import numpy as np
+from app.fleet.store import FleetStore
+from app.models import SearchMatch
+
+SEARCH_FIELDS = ("id", "name", "mmsi")
+NGRAM = 3
+# Share of the query's trigrams a name must contain to match.
+MIN_NGRAM_SHARE = 0.5
+# Candidate names ranked exactly, per match asked for.
+CANDIDATES_PER_MATCH = 4
+MAX_CODEPOINT = "\U0010ffff"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _grouped(column: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The distinct codes of a column, and its rows grouped by code with offsets."""
+    rows = np.argsort(column, kind="stable")
+    codes, starts = np.unique(column[rows], return_index=True)
+    offsets = np.append(starts, len(rows))
+    return codes, rows, offsets
+
+
+def _sortable(values: list[str]) -> np.ndarray:
+    """Strings as an array one character wider than the longest, for _prefix_range."""
+    array = np.array(values, dtype=str)
+    return array.astype(f"U{array.dtype.itemsize // 4 + 1}")
+
+
+def _prefix_range(values: np.ndarray, prefix: str) -> tuple[int, int]:
+    """The slice of sorted strings starting with ``prefix``.
+
+    The bounds are cast to the array's dtype first, so numpy does not widen
+    (copy) the whole array to compare with them.
+    """
+    if len(prefix) >= values.dtype.itemsize // 4:
+        return 0, 0
+    bounds = np.array([prefix, prefix + MAX_CODEPOINT], dtype=values.dtype)
+    start, stop = np.searchsorted(values, bounds).tolist()
+    return start, stop
+
+
+def _ngrams(names: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Every (trigram, name index) pair of the UTF-8 encoded names, deduplicated."""
+    encoded = np.char.encode(names, "utf-8")
+    width = encoded.dtype.itemsize
+    if width < NGRAM:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    data = np.frombuffer(encoded.tobytes(), dtype=np.uint8).reshape(len(names), width)
+    lengths = np.char.str_len(encoded)
+    data = data.astype(np.int64)
+    grams = (data[:, :-2] << 16) | (data[:, 1:-1] << 8) | data[:, 2:]
+    valid = np.arange(width - NGRAM + 1) < (lengths - NGRAM + 1)[:, None]
+    index = np.broadcast_to(np.arange(len(names))[:, None], grams.shape)
+    pairs = np.unique(grams[valid] * len(names) + index[valid])
+    return pairs // len(names), pairs % len(names)
+
+
+class SearchIndex:
+    """Typeahead search over vessel MMSIs (by prefix) and names (fuzzy).
+
+    MMSIs are a sorted array searched by binary search. Names are lowered
+    and indexed by their UTF-8 trigrams: a query's trigrams are counted over
+    the posting lists and names sharing at least MIN_NGRAM_SHARE of them
+    match, best first; queries shorter than a trigram match name prefixes.
+    Each distinct value maps to the rows holding it, so the index is sized
+    by the distinct names and MMSIs rather than by the fleet. It is built
+    for one state of the store and must be rebuilt when any of
+    SEARCH_FIELDS changes.
+    """
+
+    def __init__(self, store: FleetStore):
+        self.store = store
+        mmsi_codes, self._mmsi_rows, self._mmsi_offsets = _grouped(store.column("mmsi"))
+        decoded = store.dictionaries["mmsi"].values
+        mmsi = _sortable([decoded[code] for code in mmsi_codes.tolist()])
+        self._mmsi_order = np.argsort(mmsi, kind="stable")
+        self._mmsi = mmsi[self._mmsi_order]
+
+        name_codes, self._name_rows, self._name_offsets = _grouped(store.column("name"))
+        decoded = store.dictionaries["name"].values
+        names = _sortable([_normalize(decoded[code]) for code in name_codes.tolist()])
+        self._names = names
+        self._name_lengths = np.char.str_len(names)
+        self._prefix_order = np.argsort(names, kind="stable")
+        self._prefix_names = names[self._prefix_order]
+        grams, owners = _ngrams(names)
+        self._grams, starts = np.unique(grams, return_index=True)
+        self._gram_offsets = np.append(starts, len(grams))
+        self._gram_names = owners
+
+    def _rows(self, rows: np.ndarray, offsets: np.ndarray, groups, limit: int) -> list[int]:
+        found = []
+        for group in groups:
+            found.extend(rows[offsets[group] : offsets[group + 1]][: limit - len(found)].tolist())
+            if len(found) >= limit:
+                break
+        return found
+
+    def _mmsi_matches(self, prefix: str, limit: int) -> list[int]:
+        start, stop = _prefix_range(self._mmsi, prefix)
+        groups = self._mmsi_order[start : min(stop, start + limit)].tolist()
+        return self._rows(self._mmsi_rows, self._mmsi_offsets, groups, limit)
+
+    def _name_groups(self, query: str, limit: int) -> list[int]:
+        """Indexes of the names matching a normalized query, best first."""
+        if len(query.encode()) < NGRAM:
+            start, stop = _prefix_range(self._prefix_names, query)
+            return self._prefix_order[start : min(stop, start + limit)].tolist()
+        wanted, _ = _ngrams(np.array([query]))
+        slots = np.searchsorted(self._grams, wanted)
+        inside = slots < len(self._grams)
+        slots = slots[inside][self._grams[slots[inside]] == wanted[inside]]
+        if not len(slots):
+            return []
+        postings = np.concatenate(
+            [self._gram_names[self._gram_offsets[s] : self._gram_offsets[s + 1]] for s in slots.tolist()]
+        )
+        counts = np.bincount(postings, minlength=len(self._names))
+        required = max(math.ceil(len(wanted) * MIN_NGRAM_SHARE), 1)
+        candidates = np.flatnonzero(counts >= required)
+        counts = counts[candidates]
+        keep = limit * CANDIDATES_PER_MATCH
+        if len(candidates) > keep:
+            rank = counts * 4096 - np.minimum(self._name_lengths[candidates], 4095)
+            best = np.argpartition(-rank, keep)[:keep]
+            candidates, counts = candidates[best], counts[best]
+        ranked = sorted(
+            zip(candidates.tolist(), counts.tolist()),
+            key=lambda match: (
+                not self._names[match[0]].startswith(query),
+                -match[1],
+                self._name_lengths[match[0]],
+                self._names[match[0]],
+            ),
+        )
+        return [group for group, _ in ranked[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> list[SearchMatch]:
+        """The vessels best matching a query: MMSI prefix matches first, then names."""
+        query = _normalize(query)
+        if not query or limit <= 0:
+            return []
+        rows = self._mmsi_matches(query, limit) if query.isdigit() else []
+        if len(rows) < limit:
+            groups = self._name_groups(query, limit)
+            seen = set(rows)
+            for row in self._rows(self._name_rows, self._name_offsets, groups, limit):
+                if row not in seen and len(rows) < limit:
+                    rows.append(row)
+        if not rows:
+            return []
+        positions = np.asarray(rows)
+        return [
+            {"id": vessel_id, "name": name, "mmsi": mmsi}
+            for vessel_id, name, mmsi in zip(
+                self.store.values("id", positions),
+                self.store.values("name", positions),
+                self.store.values("mmsi", positions),
+            )
+        ]
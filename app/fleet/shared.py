@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from typing import Callable, TypeVar
+from app.fleet.cache import ResultCache
+from app.fleet.events import EventLog
+from app.fleet.search import SEARCH_FIELDS, SearchIndex
+from app.fleet.store import FleetStore
+from app.fleet.timeline import Timeline, TimelineSource
+from app.fleet.tracks import TrackStore
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_REBUILD_S = 30.0
+
+T = TypeVar("T")
+
+
+class SharedFleet:
+    """The fleet, its event log and tracks, held once per process for every session.
+
+    Sessions keep only their filters, viewport and paging and read the data
+    through here, so memory and state serialization no longer grow with the
+    fleet for each connected user. Writers (database sync, AIS ingest) apply
+    their changes on the event loop, or build a new store off-loop and swap
+    it in with ``publish``, then bump ``version``; sessions compare it with
+    the version they last rendered to know when to recompute. Results that
+    only depend on the data and a session's filters are shared between
+    sessions through ``cached`` until the next version.
+    """
+
+    def __init__(self, store: FleetStore | None = None, events: EventLog | None = None):
+        self.store = store if store is not None else FleetStore()
+        self.events = events if events is not None else EventLog()
+        self.tracks = TrackStore()
+        self.version = 0
+        self.results = ResultCache()
+        self._dataset = 0
+        self._timeline: Timeline | None = None
+        self._timeline_key: tuple | None = None
+        self._timeline_built_at = 0.0
+        self._timeline_source = TimelineSource()
+        self._timeline_task: asyncio.Task | None = None
+        self._search: SearchIndex | None = None
+        self._search_key: tuple | None = None
+
+    def publish(
+        self,
+        store: FleetStore | None = None,
+        events: EventLog | None = None,
+        tracks: TrackStore | None = None,
+        version: int | None = None,
+    ):
+        """Swap in new data (if given) and announce a new version.
+
+        ``version`` adopts the version of the process the data was copied
+        from (a snapshot); such copies continue the same feed, so unlike
+        other swaps they keep the timeline's rebuild throttle.
+        """
+        swapped = (store is not None and store is not self.store) or (
+            events is not None and events is not self.events
+        )
+        if swapped and version is None:
+            self._dataset += 1
+        if store is not None:
+            self.store = store
+        if events is not None:
+            self.events = events
+        if tracks is not None:
+            self.tracks = tracks
+        self.version = self.version + 1 if version is None else version
+        self.results.invalidate()
+
+    def cached(self, name: str, key: tuple, compute: Callable[[], T]) -> T:
+        """The result of ``compute`` for ``name`` and ``key`` on the current version."""
+        return self.results.get_or_compute((self.version, name, key), compute)
+
+    def restore_timeline(self, timeline: Timeline):
+        """Adopt a timeline saved with the current data, such as a checkpoint's."""
+        self._timeline = timeline
+        self._timeline_key = (self._dataset, self.version)
+        self._timeline_built_at = time.monotonic()
+
+    def time_range(self) -> tuple[float, float]:
+        """Times of the oldest and newest fix or event, or (0, 0) without any.
+
+        Cheap next to the timeline, so sessions can show its bounds before
+        (or without) building it.
+        """
+        return self.cached("time_range", (), self._time_range)
+
+    def _time_range(self) -> tuple[float, float]:
+        ranges = [r for r in (self.tracks.time_range(), self.events.time_range()) if r]
+        if not ranges:
+            return 0.0, 0.0
+        return float(min(r[0] for r in ranges)), float(max(r[1] for r in ranges))
+
+    def _timeline_stale(self) -> bool:
+        key = (self._dataset, self.version)
+        return self._timeline is None or (
+            key != self._timeline_key
+            and (
+                key[0] != self._timeline_key[0]
+                or time.monotonic() - self._timeline_built_at >= TIMELINE_REBUILD_S
+            )
+        )
+
+    def timeline(self) -> Timeline | None:
+        """The playback timeline last built, or None before the first build.
+
+        The timeline is rebuilt when the data changes, but at most every
+        TIMELINE_REBUILD_S while a feed keeps publishing, unless another
+        fleet was swapped in. A stale one is returned as is while the
+        rebuild runs in a worker thread; call this on the event loop.
+        """
+        if self._timeline_stale():
+            self._rebuild_timeline()
+        return self._timeline
+
+    async def wait_timeline(self) -> Timeline | None:
+        """The playback timeline, waiting for the first build if needed."""
+        if self._timeline is None:
+            await asyncio.shield(self._rebuild_timeline())
+            return self._timeline
+        return self.timeline()
+
+    def current_timeline(self) -> Timeline | None:
+        """The timeline if it was built from the data as it is now."""
+        if self._timeline_key != (self._dataset, self.version):
+            return None
+        return self._timeline
+
+    def _rebuild_timeline(self) -> asyncio.Task:
+        if self._timeline_task is None or self._timeline_task.done():
+            key = (self._dataset, self.version)
+            self._timeline_source.take(
+                self.store.dictionaries["id"], self.tracks, self.events
+            )
+            self._timeline_task = asyncio.get_running_loop().create_task(
+                self._build_timeline(key)
+            )
+        return self._timeline_task
+
+    async def _build_timeline(self, key: tuple):
+        try:
+            timeline = await asyncio.to_thread(self._timeline_source.build)
+        except Exception as e:
+            logger.exception(f"Failed to build the playback timeline: {e}")
+            return
+        self._timeline = timeline
+        self._timeline_key = key
+        self._timeline_built_at = time.monotonic()
+
+    def search_index(self) -> SearchIndex:
+        """The vessel search index, rebuilt when names or MMSIs change."""
+        key = (id(self.store), self.store.version(SEARCH_FIELDS))
+        if self._search is None or key != self._search_key:
+            self._search = SearchIndex(self.store)
+            self._search_key = key
+        return self._search
+
+
+SHARED_FLEET = SharedFleet()
@@ -0,0 +1,756 @@
+"""Versioned fleet snapshots shared between backend worker processes.
+
+One writer process owns the fleet (database sync, AIS ingest) and publishes
+it as numbered segment files in a directory (best on tmpfs, /dev/shm). The
+other workers map the newest segment read-only and serve sessions straight
+from it, so the columns, dictionaries, tracks and events are held once per
+host instead of once per worker.
+
+A segment is a JSON header followed by 64-byte aligned arrays: the store's
+columns, each dictionary as a UTF-8 string table with a hash index, tracks
+as one fixes array with per-vessel offsets, events as JSON strings with
+their sorted keys, and the rows of each indexed field sorted by code, from
+which the bitmap index is built as it is queried. The control file holds a
+seqlock (even when stable) with the current generation; readers retry until
+they see the same even sequence before and after reading it.
+
+The same segment format backs the warm-start checkpoints in
+``app.fleet.checkpoint``.
+"""
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import uuid
+import zlib
+from collections.abc import Mapping, MutableMapping, MutableSequence, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+from app.fleet.bitmap import InvertedIndex
+from app.fleet.dictionary import Dictionary
+from app.fleet.events import EventLog
+from app.fleet.shared import SharedFleet
+from app.fleet.store import CATEGORICAL_FIELDS, INDEXED_FIELDS, VESSEL_FIELDS, FleetStore
+from app.fleet.tracks import TrackStore
+from app.models import Event
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+MAGIC = b"FLEETSNP"
+ALIGNMENT = 64
+# Control block: magic, seqlock sequence, generation, fleet version, published at.
+CONTROL = struct.Struct("<8sQQQd")
+SEGMENT_HEADER = struct.Struct("<8sII")
+KEEP_GENERATIONS = 3
+SEQLOCK_RETRIES = 1000
+
+
+def _segment_path(directory: Path, generation: int) -> Path:
+    return directory / f"fleet-{generation:012d}.snap"
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class StringColumn(Sequence):
+    """Strings stored as UTF-8 bytes with an offsets array, decoded on access.
+
+    Strings appended later are kept in a list after the stored ones.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+        self._extra: list[str] = []
+        self.stored = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self.stored + len(self._extra)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            extra = self._extra[max(start - self.stored, 0) : max(stop - self.stored, 0)]
+            return list(self._decode(start, min(stop, self.stored))) + extra
+        if index < 0:
+            index += len(self)
+        if index >= self.stored:
+            return self._extra[index - self.stored]
+        if index < 0:
+            raise IndexError(index)
+        start, end = self._offsets[index : index + 2].tolist()
+        return self._data[start:end].tobytes().decode()
+
+    def __iter__(self):
+        yield from self._decode(0, self.stored)
+        yield from self._extra
+
+    def _decode(self, first: int, last: int):
+        if first >= last:
+            return
+        offsets = self._offsets[first : last + 1].tolist()
+        base = offsets[0]
+        data = self._data[base : offsets[-1]].tobytes()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start - base : end - base].decode()
+
+    def append(self, value: str):
+        self._extra.append(value)
+
+    def stored_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """The offsets and bytes of the stored strings, excluding appended ones."""
+        return self._offsets, self._data[: int(self._offsets[-1])]
+
+
+class MappedDictionary(Dictionary):
+    """A Dictionary over a string table and its hash index.
+
+    ``hashes`` holds the CRC-32 of every value in ascending order and
+    ``codes`` the matching codes, so a lookup is one binary search. Values
+    encoded later get the next codes and are looked up in a plain dict.
+    """
+
+    def __init__(self, values: StringColumn, hashes: np.ndarray, codes: np.ndarray):
+        self.values = values
+        self._hashes = hashes
+        self._codes = codes
+        self._added: dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self.lookup(value)
+        if code is None:
+            code = self._added[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int | None:
+        code = self._added.get(value)
+        if code is not None:
+            return code
+        key = np.uint32(zlib.crc32(value.encode()))
+        index = int(np.searchsorted(self._hashes, key))
+        while index < len(self._hashes) and self._hashes[index] == key:
+            code = int(self._codes[index])
+            if self.values[code] == value:
+                return code
+            index += 1
+        return None
+
+
+class _RowsById(MutableMapping):
+    """Vessel id to row, through the id dictionary and a row-per-code array.
+
+    Rows assigned or removed later are tracked apart from the array.
+    """
+
+    def __init__(self, ids: MappedDictionary, rows: np.ndarray):
+        self._ids = ids
+        self._rows = rows
+        self._changed: dict[str, int] = {}
+        self._removed: set[str] = set()
+
+    def __getitem__(self, vessel_id: str) -> int:
+        row = self._changed.get(vessel_id)
+        if row is not None:
+            return row
+        code = None if vessel_id in self._removed else self._ids.lookup(vessel_id)
+        row = -1 if code is None or code >= len(self._rows) else int(self._rows[code])
+        if row < 0:
+            raise KeyError(vessel_id)
+        return row
+
+    def __setitem__(self, vessel_id: str, row: int):
+        self._changed[vessel_id] = row
+
+    def __delitem__(self, vessel_id: str):
+        self[vessel_id]
+        self._changed.pop(vessel_id, None)
+        self._removed.add(vessel_id)
+
+    def __iter__(self):
+        for code, row in enumerate(self._rows.tolist()):
+            if row >= 0:
+                vessel_id = self._ids.values[code]
+                if vessel_id not in self._removed and vessel_id not in self._changed:
+                    yield vessel_id
+        yield from self._changed
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _Keys(MutableSequence):
+    """(epoch, seq) event keys over an (n, 2) array, then a list of later keys.
+
+    Keys appended in order go to the list; any other change first copies the
+    array into it.
+    """
+
+    def __init__(self, keys: np.ndarray):
+        self._keys = keys
+        self._tail: list[tuple[int, int]] = []
+        self.modified = False
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if not self._tail:
+                return [tuple(key) for key in self._keys[index].tolist()]
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index >= len(self._keys):
+            return self._tail[index - len(self._keys)]
+        epoch, seq = self._keys[index].tolist()
+        return epoch, seq
+
+    def _materialize(self):
+        self.modified = True
+        if len(self._keys):
+            self._tail = [tuple(key) for key in self._keys.tolist()] + self._tail
+            self._keys = self._keys[:0]
+
+    def __setitem__(self, index, value):
+        self._materialize()
+        self._tail[index] = value
+
+    def __delitem__(self, index):
+        self._materialize()
+        del self._tail[index]
+
+    def insert(self, index: int, value: tuple[int, int]):
+        if index < len(self._keys):
+            self._materialize()
+        self.modified = True
+        self._tail.insert(index - len(self._keys), value)
+
+    def append(self, value: tuple[int, int]):
+        self.modified = True
+        self._tail.append(value)
+
+    def extend(self, values):
+        self.modified = True
+        self._tail.extend(values)
+
+    def __iter__(self):
+        yield from (tuple(key) for key in self._keys.tolist())
+        yield from self._tail
+
+    def array(self) -> np.ndarray:
+        if not self._tail:
+            return self._keys
+        return np.concatenate([self._keys, np.asarray(self._tail, dtype=np.int64)])
+
+
+class _VesselKeys(MutableMapping):
+    """Each vessel's event keys, grouped in one array by vessel."""
+
+    def __init__(self, ids: MappedDictionary, offsets: np.ndarray, keys: np.ndarray):
+        self._ids = ids
+        self._offsets = offsets
+        self._keys = keys
+        self._loaded: dict[str, MutableSequence] = {}
+
+    def __getitem__(self, vessel_id: str) -> MutableSequence:
+        keys = self._loaded.get(vessel_id)
+        if keys is None:
+            code = self._ids.lookup(vessel_id)
+            if code is None or code >= len(self._offsets) - 1:
+                raise KeyError(vessel_id)
+            start, end = self._offsets[code : code + 2].tolist()
+            keys = self._loaded[vessel_id] = _Keys(self._keys[start:end])
+        return keys
+
+    def __setitem__(self, vessel_id: str, keys: MutableSequence):
+        self._ids.encode(vessel_id)
+        self._loaded[vessel_id] = keys
+
+    def __delitem__(self, vessel_id: str):
+        raise TypeError("Event keys cannot be removed")
+
+    def __iter__(self):
+        return iter(self._ids.values)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """Offsets and keys of every vessel in id code order, copying unchanged runs."""
+        stored = len(self._offsets) - 1
+        changed = {
+            self._ids.lookup(vessel_id): _key_array(keys)
+            for vessel_id, keys in self._loaded.items()
+            if not isinstance(keys, _Keys) or keys.modified
+        }
+        lengths = np.zeros(len(self._ids), dtype=np.int64)
+        lengths[:stored] = np.diff(self._offsets)
+        parts, copied = [], 0
+        for code in sorted(changed):
+            parts.append(self._keys[self._offsets[copied] : self._offsets[min(code, stored)]])
+            parts.append(changed[code])
+            lengths[code] = len(changed[code])
+            copied = min(code + 1, stored)
+        parts.append(self._keys[self._offsets[copied] :])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return offsets, np.concatenate(parts)
+
+
+class _EventColumn(Sequence):
+    """Events stored as JSON strings and decoded on access, then appended ones."""
+
+    def __init__(self, strings: StringColumn):
+        self.strings = strings
+        self._tail: list[Event] = []
+
+    def __len__(self) -> int:
+        return len(self.strings) + len(self._tail)
+
+    def __getitem__(self, index) -> Event:
+        if isinstance(index, slice):
+            if not self._tail:
+                return [json.loads(text) for text in self.strings[index]]
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= len(self.strings):
+            return self._tail[index - len(self.strings)]
+        return json.loads(self.strings[index])
+
+    def append(self, event: Event):
+        self._tail.append(event)
+
+    def extend(self, events):
+        self._tail.extend(events)
+
+
+class _StringTable:
+    """Encodes an append-only list of strings for segments, incrementally.
+
+    Strings already stored in a mapped StringColumn are copied as bytes.
+    """
+
+    def __init__(self):
+        self._source: object = None
+        self._stored: StringColumn | None = None
+        self._stored_hashes: list[int] | None = None
+        self._count = 0
+        self._chunks: list[bytes] = []
+        self._lengths: list[int] = []
+        self._hashes: list[int] = []
+        self._arrays: tuple[tuple, dict[str, np.ndarray]] | None = None
+
+    def update(self, source: object, values: Sequence, encode=str.encode):
+        if source is not self._source or len(values) < self._count:
+            self.__init__()
+            self._source = source
+            stored = getattr(values, "strings", values)
+            if isinstance(stored, StringColumn) and stored.stored:
+                self._stored, self._count = stored, stored.stored
+        for value in values[self._count :]:
+            chunk = encode(value)
+            self._chunks.append(chunk)
+            self._lengths.append(len(chunk))
+            self._hashes.append(zlib.crc32(chunk))
+            self._count += 1
+
+    def _stored_parts(self) -> tuple[np.ndarray, np.ndarray, list[int]]:
+        if self._stored is None:
+            return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.uint8), []
+        offsets, data = self._stored.stored_arrays()
+        return offsets, data, self._stored_hashes or []
+
+    def arrays(self, name: str, hashed: bool = True) -> dict[str, np.ndarray]:
+        """The table's arrays, reused until strings are added."""
+        key = (name, hashed, self._count)
+        if self._arrays is None or self._arrays[0] != key:
+            self._arrays = (key, self._build_arrays(name, hashed))
+        return self._arrays[1]
+
+    def _build_arrays(self, name: str, hashed: bool) -> dict[str, np.ndarray]:
+        stored_offsets, stored_data, stored_hashes = self._stored_parts()
+        offsets = np.empty(len(stored_offsets) + len(self._chunks), dtype=np.int64)
+        offsets[: len(stored_offsets)] = stored_offsets
+        np.cumsum(self._lengths, out=offsets[len(stored_offsets) :])
+        offsets[len(stored_offsets) :] += stored_offsets[-1]
+        arrays = {
+            f"{name}/offsets": offsets,
+            f"{name}/data": np.concatenate(
+                [stored_data, np.frombuffer(b"".join(self._chunks), dtype=np.uint8)]
+            ),
+        }
+        if hashed:
+            if self._stored is not None and self._stored_hashes is None:
+                self._stored_hashes = [
+                    zlib.crc32(value.encode()) for value in self._stored[: self._stored.stored]
+                ]
+                stored_hashes = self._stored_hashes
+            hashes = np.asarray(stored_hashes + self._hashes, dtype=np.uint32)
+            order = np.argsort(hashes, kind="stable")
+            arrays[f"{name}/hashes"] = hashes[order]
+            arrays[f"{name}/codes"] = order.astype(np.int64)
+        return arrays
+
+
+def _encode_event(event: Event) -> bytes:
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def _key_array(keys: Sequence[tuple[int, int]]) -> np.ndarray:
+    if isinstance(keys, _Keys):
+        return keys.array()
+    return np.asarray(keys, dtype=np.int64).reshape(-1, 2)
+
+
+class FleetEncoder:
+    """Turns a fleet into segment arrays, re-encoding only what changed.
+
+    The column copies, string tables, event arrays and sorted index rows of
+    the previous call are reused while their source is unchanged, and tracks
+    come packed by ``TrackStore.packed``, so calls must come from where the
+    fleet is written (the event loop).
+    """
+
+    def __init__(self):
+        self._token = uuid.uuid4().hex
+        self._strings: dict[str, _StringTable] = {}
+        self._store: FleetStore | None = None
+        self._store_serial = 0
+        self._events: tuple[EventLog, int, dict[str, np.ndarray]] | None = None
+        self._index: dict[str, tuple[int, dict[str, np.ndarray]]] = {}
+        self._columns: dict[str, tuple[int, np.ndarray]] = {}
+        self._id_rows: tuple[tuple, np.ndarray] | None = None
+
+    def _table(self, name: str) -> _StringTable:
+        return self._strings.setdefault(name, _StringTable())
+
+    def _event_arrays(self, log: EventLog) -> dict[str, np.ndarray]:
+        """The event log's arrays, re-encoded only when events were added."""
+        if self._events is not None and self._events[:2] == (log, len(log)):
+            return self._events[2]
+        events, order, by_vessel = log.parts()
+        table = self._table("events/json")
+        table.update(log, events, _encode_event)
+        arrays = dict(table.arrays("events/json", hashed=False))
+        arrays["events/order"] = _key_array(order)
+        vessel_ids = list(by_vessel)
+        table = self._table("events/vessels")
+        table.update(by_vessel, vessel_ids)
+        arrays.update(table.arrays("events/vessels"))
+        if isinstance(by_vessel, _VesselKeys):
+            offsets, keys = by_vessel.arrays()
+        else:
+            offsets = np.zeros(len(vessel_ids) + 1, dtype=np.int64)
+            np.cumsum([len(by_vessel[vessel_id]) for vessel_id in vessel_ids], out=offsets[1:])
+            keys = _key_array([key for vessel_id in vessel_ids for key in by_vessel[vessel_id]])
+        arrays["events/vessel_offsets"] = offsets
+        arrays["events/vessel_keys"] = keys
+        self._events = (log, len(log), arrays)
+        return arrays
+
+    def _index_arrays(self, store: FleetStore) -> dict[str, np.ndarray]:
+        """Rows grouped by code for each indexed field, re-sorted when it changed."""
+        arrays = {}
+        for field in INDEXED_FIELDS:
+            (version,) = store.version((field,))
+            cached = self._index.get(field)
+            if cached is None or cached[0] != version:
+                column = store.column(field)
+                rows = np.argsort(column, kind="stable")
+                offsets = np.searchsorted(
+                    column[rows], np.arange(len(store.dictionaries[field]) + 1)
+                )
+                cached = self._index[field] = (
+                    version,
+                    {f"index/{field}/rows": rows, f"index/{field}/offsets": offsets},
+                )
+            arrays.update(cached[1])
+        return arrays
+
+    def encode(
+        self, store: FleetStore, log: EventLog, tracks: TrackStore
+    ) -> tuple[dict, dict[str, np.ndarray]]:
+        """The header fields and arrays of a segment holding the fleet as it is now."""
+        if store is not self._store:
+            self._store = store
+            self._store_serial += 1
+            self._index.clear()
+            self._columns.clear()
+            self._id_rows = None
+        arrays: dict[str, np.ndarray] = {}
+        fields = list(VESSEL_FIELDS)
+        for field, version in zip(fields, store.version(fields)):
+            cached = self._columns.get(field)
+            if cached is None or cached[0] != version:
+                cached = self._columns[field] = (version, np.array(store.column(field)))
+            arrays[f"column/{field}"] = cached[1]
+        for field in CATEGORICAL_FIELDS:
+            dictionary = store.dictionaries[field]
+            table = self._table(f"dictionary/{field}")
+            table.update(dictionary, dictionary.values)
+            arrays.update(table.arrays(f"dictionary/{field}"))
+        id_key = (*store.version(("id",)), len(store.dictionaries["id"]))
+        if self._id_rows is None or self._id_rows[0] != id_key:
+            id_rows = np.full(len(store.dictionaries["id"]), -1, dtype=np.int64)
+            id_rows[arrays["column/id"]] = np.arange(len(store))
+            self._id_rows = (id_key, id_rows)
+        arrays["id_rows"] = self._id_rows[1]
+        arrays.update(self._index_arrays(store))
+
+        track_ids, offsets, points = tracks.packed()
+        table = self._table("tracks/ids")
+        table.update(tracks, track_ids)
+        arrays.update(table.arrays("tracks/ids", hashed=False))
+        arrays["tracks/offsets"] = offsets
+        arrays["tracks/points"] = points
+
+        arrays.update(self._event_arrays(log))
+        header = {
+            "format": FORMAT_VERSION,
+            "store_key": f"{self._token}:{self._store_serial}",
+            "fields": fields,
+            "versions": dict(zip(fields, store.version(fields))),
+        }
+        return header, arrays
+
+
+def write_segment(path: Path, header: dict, arrays: Mapping[str, np.ndarray]):
+    """Write a header and arrays to a new file, replacing ``path`` atomically."""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset = _align(offset + array.nbytes)
+    encoded = json.dumps({**header, "arrays": layout}).encode()
+    start = _align(SEGMENT_HEADER.size + len(encoded))
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(start + layout[name][2])
+            f.write(np.ascontiguousarray(array).reshape(-1).view(np.uint8))
+        f.truncate(start + offset)
+    os.replace(temporary, path)
+
+
+def read_segment(path: Path, writable: bool = False) -> tuple[dict, dict[str, np.ndarray]]:
+    """Map a segment and return its header and arrays as views of the mapping.
+
+    With ``writable`` the mapping is copy-on-write: the arrays can be
+    modified in memory without touching the file.
+    """
+    with open(path, "rb") as f:
+        access = mmap.ACCESS_COPY if writable else mmap.ACCESS_READ
+        mapped = mmap.mmap(f.fileno(), 0, access=access)
+    if len(mapped) < SEGMENT_HEADER.size:
+        raise ValueError(f"Truncated fleet segment {path.name}")
+    magic, format_version, length = SEGMENT_HEADER.unpack_from(mapped)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported fleet segment {path.name}")
+    header = json.loads(mapped[SEGMENT_HEADER.size : SEGMENT_HEADER.size + length])
+    start = _align(SEGMENT_HEADER.size + length)
+    arrays = {
+        name: np.frombuffer(
+            mapped, dtype=dtype, count=int(np.prod(shape)), offset=start + offset
+        ).reshape(shape)
+        for name, (dtype, shape, offset) in header["arrays"].items()
+    }
+    return header, arrays
+
+
+def build_fleet(
+    header: dict, arrays: Mapping[str, np.ndarray], previous: FleetStore | None = None
+) -> tuple[FleetStore, EventLog, TrackStore]:
+    """The store, event log and tracks over a segment's arrays, without copying them.
+
+    Indexes are carried over from ``previous`` if it was built from the same
+    store, else bitmaps are built from the sorted index rows as queried.
+    """
+
+    def strings(name: str) -> StringColumn:
+        return StringColumn(arrays[f"{name}/offsets"], arrays[f"{name}/data"])
+
+    def dictionary(name: str) -> MappedDictionary:
+        return MappedDictionary(strings(name), arrays[f"{name}/hashes"], arrays[f"{name}/codes"])
+
+    dictionaries = {field: dictionary(f"dictionary/{field}") for field in CATEGORICAL_FIELDS}
+    store = FleetStore.from_columns(
+        {field: arrays[f"column/{field}"] for field in header["fields"]},
+        dictionaries,
+        _RowsById(dictionaries["id"], arrays["id_rows"]),
+        header["versions"],
+        previous,
+        InvertedIndex.from_sorted(
+            {
+                field: (arrays[f"index/{field}/rows"], arrays[f"index/{field}/offsets"])
+                for field in INDEXED_FIELDS
+            }
+        ),
+    )
+    events = EventLog.from_parts(
+        _EventColumn(strings("events/json")),
+        _Keys(arrays["events/order"]),
+        _VesselKeys(
+            dictionary("events/vessels"),
+            arrays["events/vessel_offsets"],
+            arrays["events/vessel_keys"],
+        ),
+    )
+    tracks = TrackStore.from_arrays(
+        strings("tracks/ids"), arrays["tracks/offsets"], arrays["tracks/points"]
+    )
+    return store, events, tracks
+
+
+@dataclass
+class Snapshot:
+    """A fleet mapped from a segment, with the metadata it was written with."""
+
+    generation: int
+    version: int
+    published_at: float
+    store_key: str
+    store: FleetStore
+    events: EventLog
+    tracks: TrackStore
+
+
+class SnapshotWriter:
+    """Publishes the shared fleet as numbered segments, keeping the last few.
+
+    ``capture`` copies what a segment needs and must run where the fleet is
+    written (the event loop); ``write`` does the file I/O and may run in a
+    thread.
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        control = self.directory / "control"
+        with open(control, "a+b") as f:
+            if os.fstat(f.fileno()).st_size < CONTROL.size:
+                f.truncate(CONTROL.size)
+        self._file = open(control, "r+b")
+        self._control = mmap.mmap(self._file.fileno(), CONTROL.size)
+        magic, _, generation, _, _ = CONTROL.unpack_from(self._control)
+        self.generation = generation if magic == MAGIC else 0
+        self._encoder = FleetEncoder()
+
+    def capture(self, fleet: SharedFleet) -> tuple[dict, dict[str, np.ndarray]]:
+        """The header fields and arrays of a segment for the fleet as it is now."""
+        header, arrays = self._encoder.encode(fleet.store, fleet.events, fleet.tracks)
+        header["version"] = fleet.version
+        return header, arrays
+
+    def write(self, header: dict, arrays: dict[str, np.ndarray]) -> int:
+        """Write a captured segment, make it current and drop old ones."""
+        generation = self.generation + 1
+        write_segment(
+            _segment_path(self.directory, generation),
+            {**header, "generation": generation, "published_at": time.time()},
+            arrays,
+        )
+        self._publish(generation, header["version"])
+        self.generation = generation
+        for old in self.directory.glob("fleet-*.snap"):
+            if int(old.stem.split("-")[1]) <= generation - KEEP_GENERATIONS:
+                old.unlink(missing_ok=True)
+        return generation
+
+    def _publish(self, generation: int, version: int):
+        """Swap the current generation under the seqlock."""
+        _, seq, _, _, _ = CONTROL.unpack_from(self._control)
+        seq += seq % 2
+        struct.pack_into("<Q", self._control, 8, seq + 1)
+        CONTROL.pack_into(self._control, 0, MAGIC, seq + 1, generation, version, time.time())
+        struct.pack_into("<Q", self._control, 8, seq + 2)
+
+    def close(self):
+        self._control.close()
+        self._file.close()
+
+
+class SnapshotReader:
+    """Follows a writer's control file and maps its segments read-only."""
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self._control: mmap.mmap | None = None
+
+    def current(self) -> tuple[int, int, float] | None:
+        """The published (generation, fleet version, time), or None before the first."""
+        if self._control is None:
+            try:
+                with open(self.directory / "control", "rb") as f:
+                    self._control = mmap.mmap(f.fileno(), CONTROL.size, access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                return None
+        for _ in range(SEQLOCK_RETRIES):
+            (seq,) = struct.unpack_from("<Q", self._control, 8)
+            if seq % 2:
+                continue
+            magic, _, generation, version, published_at = CONTROL.unpack_from(self._control)
+            if struct.unpack_from("<Q", self._control, 8)[0] != seq:
+                continue
+            if magic != MAGIC or not generation:
+                return None
+            return generation, version, published_at
+        return None
+
+    def load(self, generation: int, previous: Snapshot | None = None) -> Snapshot:
+        """Map a segment and build the store, event log and tracks over it.
+
+        Indexes are carried over from ``previous`` if it came from the same
+        writer store. Raises FileNotFoundError if the segment was dropped.
+        """
+        header, arrays = read_segment(_segment_path(self.directory, generation))
+        same_store = previous is not None and previous.store_key == header["store_key"]
+        store, events, tracks = build_fleet(
+            header, arrays, previous.store if same_store else None
+        )
+        return Snapshot(
+            generation,
+            header["version"],
+            header["published_at"],
+            header["store_key"],
+            store,
+            events,
+            tracks,
+        )
+
+
+_writer_lock = None
+
+
+def acquire_writer(directory: Path | str) -> bool:
+    """Take the directory's writer lock for this process, if no other holds it.
+
+    The lock is held until the process exits, so exactly one worker writes.
+    """
+    global _writer_lock
+    if _writer_lock is not None:
+        return True
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    handle = open(directory / "writer.lock", "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return False
+    _writer_lock = handle
+    logger.info(f"This worker (pid {os.getpid()}) writes fleet snapshots to {directory}")
+    return True
@@ -0,0 +1,107 @@
+from typing import TypedDict
+import numpy as np
+
+WORLD_BOUNDS = {"south": -90.0, "west": -180.0, "north": 90.0, "east": 180.0}
+
+
+class Bounds(TypedDict):
+    """A lat/lng bounding box, as reported by the map viewport."""
+
+    south: float
+    west: float
+    north: float
+    east: float
+
+
+def pad_bounds(bounds: Bounds, fraction: float) -> Bounds:
+    """Grow a bounding box by a fraction of its span on every side."""
+    lat_pad = (bounds["north"] - bounds["south"]) * fraction
+    lng_pad = (bounds["east"] - bounds["west"]) * fraction
+    return {
+        "south": max(bounds["south"] - lat_pad, -90.0),
+        "west": bounds["west"] - lng_pad,
+        "north": min(bounds["north"] + lat_pad, 90.0),
+        "east": bounds["east"] + lng_pad,
+    }
+
+
+def _lng_ranges(west: float, east: float) -> list[tuple[float, float]]:
+    """Split a longitude span into [-180, 180] ranges across the antimeridian."""
+    if east - west >= 360.0:
+        return [(-180.0, 180.0)]
+    if not -180.0 <= west <= 180.0:
+        west = (west + 180.0) % 360.0 - 180.0
+    if not -180.0 <= east <= 180.0:
+        east = (east + 180.0) % 360.0 - 180.0
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def intersects(
+    bounds: Bounds,
+    south: np.ndarray,
+    west: np.ndarray,
+    north: np.ndarray,
+    east: np.ndarray,
+) -> np.ndarray:
+    """Mask of the boxes (given as coordinate arrays) that overlap bounds."""
+    overlap = np.zeros(len(south), dtype=bool)
+    for lng_lo, lng_hi in _lng_ranges(bounds["west"], bounds["east"]):
+        overlap |= (west <= lng_hi) & (east >= lng_lo)
+    return overlap & (south <= bounds["north"]) & (north >= bounds["south"])
+
+
+class GridIndex:
+    """A uniform lat/lng grid over vessel positions.
+
+    Rows are bucketed by grid cell and kept sorted by cell id, so a bounding
+    box query is one binary search per grid row it spans plus an exact check
+    of the candidates, rather than a scan of the whole fleet.
+    """
+
+    def __init__(self, cell_deg: float = 2.0):
+        self.cell_deg = cell_deg
+        self._cols = int(np.ceil(360.0 / cell_deg))
+        self._rows = int(np.ceil(180.0 / cell_deg))
+        self._lat = np.empty(0, dtype=np.float64)
+        self._lng = np.empty(0, dtype=np.float64)
+        self._order = np.empty(0, dtype=np.int64)
+        self._cells = np.empty(0, dtype=np.int64)
+
+    def _cell_rc(
+        self, lat: np.ndarray, lng: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        row = ((lat + 90.0) // self.cell_deg).astype(np.int64)
+        col = ((lng + 180.0) // self.cell_deg).astype(np.int64)
+        return np.clip(row, 0, self._rows - 1), np.clip(col, 0, self._cols - 1)
+
+    def rebuild(self, lat: np.ndarray, lng: np.ndarray):
+        """Re-bucket every position; call after positions were added or moved."""
+        self._lat = np.array(lat, dtype=np.float64)
+        self._lng = np.array(lng, dtype=np.float64)
+        row, col = self._cell_rc(self._lat, self._lng)
+        cells = row * self._cols + col
+        self._order = np.argsort(cells, kind="stable")
+        self._cells = cells[self._order]
+
+    def query(self, bounds: Bounds) -> np.ndarray:
+        """Sorted rows whose position falls inside the bounding box."""
+        south, north = bounds["south"], bounds["north"]
+        if not len(self._order) or south > north:
+            return np.empty(0, dtype=np.int64)
+        parts = []
+        for west, east in _lng_ranges(bounds["west"], bounds["east"]):
+            (row_lo, row_hi), (col_lo, col_hi) = self._cell_rc(
+                np.array([south, north]), np.array([west, east])
+            )
+            grid_rows = np.arange(row_lo, row_hi + 1) * self._cols
+            starts = np.searchsorted(self._cells, grid_rows + col_lo, side="left")
+            ends = np.searchsorted(self._cells, grid_rows + col_hi, side="right")
+            candidates = np.concatenate(
+                [self._order[start:end] for start, end in zip(starts, ends)]
+            )
+            lat, lng = self._lat[candidates], self._lng[candidates]
+            inside = (lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)
+            parts.append(candidates[inside])
+        return np.unique(np.concatenate(parts))
@@ -0,0 +1,579 @@
+import math
+from typing import Any, Iterable, Mapping, Sequence
+import numpy as np
+from app.fleet.bitmap import InvertedIndex
+from app.fleet.clustering import ClusterIndex
+from app.fleet.cube import AggregateCube
+from app.fleet.dictionary import Dictionary
+from app.fleet.emissions import EMISSION_FIELDS, EmissionsEngine
+from app.fleet.facets import FacetEngine
+from app.fleet.geo import EARTH_RADIUS_NM, HALF_CIRCUMFERENCE_NM, cap_bounds, haversine_nm
+from app.fleet.spatial import Bounds, GridIndex
+from app.models import EmissionsReport, Vessel, VesselCluster
+
+CATEGORICAL_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "segment",
+    "mmsi",
+    "sizeband",
+    "status",
+    "origin_port",
+    "destination_port",
+)
+COORDINATE_FIELDS = ("lat", "lng")
+METRIC_FIELDS = (
+    "voyage_duration_days",
+    "distance_travelled_nm",
+    "fuel_consumption_mt",
+)
+FILTER_FIELDS = (
+    "segment",
+    "type",
+    "mmsi",
+    "sizeband",
+    "origin_port",
+    "destination_port",
+)
+INDEXED_FIELDS = FILTER_FIELDS + ("status",)
+# MMSI is unique per vessel, so grouping on it would only copy the fleet.
+CUBE_FIELDS = tuple(field for field in FILTER_FIELDS if field != "mmsi")
+AGGREGATED_FIELDS = CUBE_FIELDS + METRIC_FIELDS
+VESSEL_FIELDS = tuple(Vessel.__annotations__)
+# Past this share of moved vessels the cluster index is rebuilt, not patched.
+MAX_MOVED_SHARE = 0.25
+
+
+class FleetStore:
+    """Columnar storage for the fleet: one NumPy array per Vessel field.
+
+    Categorical fields are dictionary-encoded into int32 codes, coordinates are
+    float64 and voyage metrics are int64. Rows are addressed by position; the
+    vessel id maps to its row through an id index, and the filter fields plus
+    status are covered by a bitmap inverted index and facet counts kept in
+    step with writes, as is an aggregate cube of voyage metric totals over the
+    filter fields. Positions are bucketed in a grid index, rebuilt lazily
+    on the first spatial query after a position changes, and in a marker
+    cluster index that re-slots only the vessels that moved.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self.dictionaries: dict[str, Dictionary] = {
+            field: Dictionary() for field in CATEGORICAL_FIELDS
+        }
+        self._columns: dict[str, np.ndarray] = {}
+        for field in CATEGORICAL_FIELDS:
+            self._columns[field] = np.zeros(self._capacity, dtype=np.int32)
+        for field in COORDINATE_FIELDS:
+            self._columns[field] = np.zeros(self._capacity, dtype=np.float64)
+        for field in METRIC_FIELDS:
+            self._columns[field] = np.zeros(self._capacity, dtype=np.int64)
+        self._row_by_id: dict[str, int] = {}
+        self.index = InvertedIndex(INDEXED_FIELDS)
+        self.facets = FacetEngine(self.dictionaries, FILTER_FIELDS)
+        self.cube = AggregateCube(CUBE_FIELDS, METRIC_FIELDS)
+        self.grid = GridIndex()
+        self._grid_stale = True
+        self.cluster_index = ClusterIndex()
+        self._clusters_stale = True
+        self._moved_rows: set[int] = set()
+        self._sort_orders: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._first_row_cache: dict[str, tuple[int, np.ndarray]] = {}
+        self._versions = dict.fromkeys(self._columns, 0)
+        self.emissions_engine = EmissionsEngine()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Vessel]) -> "FleetStore":
+        records = list(records)
+        store = cls(capacity=len(records))
+        store.append(records)
+        return store
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Mapping[str, np.ndarray],
+        dictionaries: Mapping[str, Dictionary],
+        row_by_id: Mapping[str, int],
+        versions: Mapping[str, int],
+        previous: "FleetStore | None" = None,
+        index: InvertedIndex | None = None,
+    ) -> "FleetStore":
+        """A store over existing columns, such as a mapped snapshot, without copying them.
+
+        ``versions`` are the field change counters of the store the columns
+        came from. The indexes of ``previous``, an earlier copy of that same
+        store, are carried over when none of the fields they cover changed,
+        and vessels that only moved are re-slotted in its cluster index.
+        Otherwise ``index``, if given, is used as the inverted index. Writing
+        to read-only columns raises.
+        """
+        store = cls(capacity=1)
+        size = len(columns["id"])
+        store._size = store._capacity = size
+        store.dictionaries = dict(dictionaries)
+        store._columns = dict(columns)
+        store._row_by_id = row_by_id
+        store._versions = dict(versions)
+        rows = np.arange(size)
+
+        def unchanged(fields: Iterable[str]) -> bool:
+            return (
+                previous is not None
+                and len(previous) == size
+                and previous.version(fields) == store.version(fields)
+            )
+
+        if unchanged(INDEXED_FIELDS):
+            store.index = previous.index
+        elif index is not None:
+            store.index = index
+        else:
+            for field in INDEXED_FIELDS:
+                store.index.extend(field, store._columns[field], rows)
+        if unchanged(FILTER_FIELDS):
+            store.facets = previous.facets
+            store.facets.rebind(store.dictionaries)
+        else:
+            store.facets = FacetEngine(store.dictionaries, FILTER_FIELDS)
+            for field in FILTER_FIELDS:
+                store.facets.extend(field, store._columns[field])
+        if unchanged(AGGREGATED_FIELDS):
+            store.cube = previous.cube
+        else:
+            store._aggregate(rows, 1)
+        if previous is None:
+            return store
+        store.emissions_engine = previous.emissions_engine
+        store._sort_orders = {
+            field: order
+            for field, order in dict(previous._sort_orders).items()
+            if unchanged((field,))
+        }
+        if unchanged(COORDINATE_FIELDS):
+            store.grid, store._grid_stale = previous.grid, previous._grid_stale
+        if len(previous) == size and not previous._clusters_stale:
+            moved = np.flatnonzero(
+                (previous._columns["lat"][:size] != store._columns["lat"])
+                | (previous._columns["lng"][:size] != store._columns["lng"])
+            )
+            if len(moved) <= size * MAX_MOVED_SHARE:
+                store.cluster_index = previous.cluster_index
+                store._clusters_stale = False
+                store._moved_rows = set(previous._moved_rows) | set(moved.tolist())
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, vessel_id: str) -> bool:
+        return vessel_id in self._row_by_id
+
+    def row_of(self, vessel_id: str) -> int:
+        """Return the row position of a vessel, raising KeyError if unknown."""
+        return self._row_by_id[vessel_id]
+
+    def _reserve(self, size: int):
+        if size <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < size:
+            capacity *= 2
+        for field, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            self._columns[field] = grown
+        self._capacity = capacity
+
+    def append(self, records: Iterable[Vessel]) -> np.ndarray:
+        """Bulk append vessels and return the rows they were stored at."""
+        records = list(records)
+        count = len(records)
+        start = self._size
+        ids = [record["id"] for record in records]
+        duplicates = [i for i in ids if i in self._row_by_id]
+        if duplicates or len(set(ids)) != count:
+            raise ValueError(f"Duplicate vessel ids in append: {duplicates or ids}")
+        self._reserve(start + count)
+        end = start + count
+        for field in CATEGORICAL_FIELDS:
+            encode = self.dictionaries[field].encode
+            self._columns[field][start:end] = np.fromiter(
+                (encode(record[field]) for record in records),
+                dtype=np.int32,
+                count=count,
+            )
+        for field in COORDINATE_FIELDS + METRIC_FIELDS:
+            self._columns[field][start:end] = np.fromiter(
+                (record[field] for record in records),
+                dtype=self._columns[field].dtype,
+                count=count,
+            )
+        rows = np.arange(start, end)
+        for field in INDEXED_FIELDS:
+            self.index.extend(field, self._columns[field][start:end], rows)
+        for field in FILTER_FIELDS:
+            self.facets.extend(field, self._columns[field][start:end])
+        self._aggregate(rows, 1)
+        for offset, vessel_id in enumerate(ids):
+            self._row_by_id[vessel_id] = start + offset
+        self._size = end
+        self._grid_stale = True
+        self._clusters_stale = True
+        self._sort_orders.clear()
+        self._touch(self._columns)
+        return rows
+
+    def update(self, vessel_id: str, changes: Mapping[str, Any]) -> int:
+        """Apply field changes to a single vessel and return its row."""
+        row = self._row_by_id[vessel_id]
+        if "id" in changes and changes["id"] != vessel_id:
+            raise ValueError("Vessel ids cannot be changed in place.")
+        for field, value in changes.items():
+            self._assign(row, field, value)
+        return row
+
+    def _assign(self, row: int, field: str, value: Any, aggregate: bool = True):
+        if field not in self._columns:
+            raise KeyError(f"Unknown vessel field: {field}")
+        if field in self.dictionaries:
+            value = self.dictionaries[field].encode(value)
+        column = self._columns[field]
+        old = column[row]
+        if old == value:
+            return
+        aggregated = aggregate and field in AGGREGATED_FIELDS
+        if aggregated:
+            self._aggregate_row(row, -1)
+        if field in self.index:
+            self.index.move(field, row, int(old), value)
+            if field in self.facets:
+                self.facets.move(field, int(old), value)
+        column[row] = value
+        if aggregated:
+            self._aggregate_row(row, 1)
+        self._touch((field,))
+        self._sort_orders.pop(field, None)
+        if field in COORDINATE_FIELDS:
+            self._grid_stale = True
+            self._moved_rows.add(row)
+
+    def rows_for(self, key_field: str, keys: Sequence[str]) -> np.ndarray:
+        """Row of the vessel holding each key (id or an indexed field), or -1."""
+        if key_field == "id":
+            return np.fromiter(
+                (self._row_by_id.get(key, -1) for key in keys),
+                dtype=np.int64,
+                count=len(keys),
+            )
+        lookup = self.dictionaries[key_field].lookup
+        codes = np.fromiter(
+            (-1 if (code := lookup(key)) is None else code for key in keys),
+            dtype=np.int64,
+            count=len(keys),
+        )
+        first_rows = self._first_rows(key_field)
+        found = (codes >= 0) & (codes < len(first_rows))
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        rows[found] = first_rows[codes[found]]
+        return rows
+
+    def _first_rows(self, field: str) -> np.ndarray:
+        """The first row holding each code of a field (or -1), kept until it changes."""
+        version = self._versions[field]
+        cached = self._first_row_cache.get(field)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        column = self.column(field)
+        first_rows = np.full(len(self.dictionaries[field]), -1, dtype=np.int64)
+        # Assigned last row first, so the first row of each code wins.
+        first_rows[column[::-1]] = np.arange(len(column) - 1, -1, -1)
+        self._first_row_cache[field] = (version, first_rows)
+        return first_rows
+
+    def update_batch(
+        self, key_field: str, keys: Sequence[str], changes: Mapping[str, Sequence]
+    ) -> np.ndarray:
+        """Apply column changes to many vessels matched on a key field.
+
+        ``changes`` maps each field to one value per key. Numeric columns are
+        assigned in one vectorized step; a None categorical value leaves that
+        vessel's field unchanged. Returns the rows updated.
+        """
+        return self.update_rows(self.rows_for(key_field, keys), changes)
+
+    def update_rows(self, rows: np.ndarray, changes: Mapping[str, Sequence]) -> np.ndarray:
+        """``update_batch`` for rows already resolved with ``rows_for`` (-1 is skipped)."""
+        if "id" in changes:
+            raise ValueError("Vessel ids cannot be changed in place.")
+        matched = np.flatnonzero(rows >= 0)
+        targets = rows[matched]
+        aggregated = any(field in AGGREGATED_FIELDS for field in changes)
+        if aggregated:
+            self._aggregate(targets, -1)
+        for field, values in changes.items():
+            if field in self.dictionaries:
+                for i in matched.tolist():
+                    if values[i] is not None:
+                        self._assign(int(rows[i]), field, values[i], aggregate=False)
+                continue
+            if field not in self._columns:
+                raise KeyError(f"Unknown vessel field: {field}")
+            self._columns[field][targets] = np.asarray(values)[matched]
+            self._touch((field,))
+            self._sort_orders.pop(field, None)
+            if field in COORDINATE_FIELDS:
+                self._grid_stale = True
+                self._moved_rows.update(targets.tolist())
+        if aggregated:
+            self._aggregate(targets, 1)
+        return targets
+
+    def remove(self, vessel_id: str):
+        """Remove a vessel, moving the last row into its slot."""
+        row = self._row_by_id.pop(vessel_id)
+        last = self._size - 1
+        self._aggregate_row(row, -1)
+        for field in INDEXED_FIELDS:
+            column = self._columns[field]
+            self.index.discard(field, row, int(column[row]))
+            if row != last:
+                self.index.discard(field, last, int(column[last]))
+                self.index.add(field, row, int(column[last]))
+        for field in FILTER_FIELDS:
+            self.facets.discard(field, int(self._columns[field][row]))
+        if row != last:
+            for column in self._columns.values():
+                column[row] = column[last]
+            moved_id = self.dictionaries["id"].decode(int(self._columns["id"][row]))
+            self._row_by_id[moved_id] = row
+        self._size = last
+        self._grid_stale = True
+        self._clusters_stale = True
+        self._sort_orders.clear()
+        self._touch(self._columns)
+
+    def _touch(self, fields: Iterable[str]):
+        for field in fields:
+            self._versions[field] += 1
+
+    def version(self, fields: Iterable[str]) -> tuple[int, ...]:
+        """Change counters of the given fields; any write to one bumps it."""
+        return tuple(self._versions[field] for field in fields)
+
+    def _aggregate(self, rows: np.ndarray, sign: int):
+        self.cube.add(
+            np.column_stack([self._columns[field][rows] for field in CUBE_FIELDS]),
+            np.column_stack([self._columns[field][rows] for field in METRIC_FIELDS]),
+            sign,
+        )
+
+    def _aggregate_row(self, row: int, sign: int):
+        self.cube.add_row(
+            [int(self._columns[field][row]) for field in CUBE_FIELDS],
+            [int(self._columns[field][row]) for field in METRIC_FIELDS],
+            sign,
+        )
+
+    def column(self, field: str) -> np.ndarray:
+        """Return a read-only view of the stored values (or codes) of a field."""
+        view = self._columns[field][: self._size]
+        view.flags.writeable = False
+        return view
+
+    def select(self, filters: Mapping[str, str]) -> np.ndarray:
+        """Sorted rows of vessels equal to every non-empty filter value."""
+        codes = {}
+        for field, value in filters.items():
+            if not value:
+                continue
+            code = self.dictionaries[field].lookup(value)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            codes[field] = code
+        if not codes:
+            return np.arange(self._size)
+        return self.index.query(codes).to_array()
+
+    def _positions(self, rows: np.ndarray | None) -> np.ndarray:
+        if rows is None:
+            return np.arange(self._size)
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            return np.flatnonzero(rows)
+        return rows
+
+    def _sort_order(self, field: str) -> tuple[np.ndarray, np.ndarray]:
+        """Rows in a field's sort order and each row's rank in it.
+
+        Cached per field until that field, or the set of rows, changes.
+        """
+        cached = self._sort_orders.get(field)
+        if cached is None:
+            keys = self._columns[field][: self._size]
+            if field in self.dictionaries:
+                values = self.dictionaries[field].values
+                code_rank = np.empty(len(values), dtype=np.int64)
+                by_value = sorted(range(len(values)), key=values.__getitem__)
+                code_rank[by_value] = np.arange(len(values))
+                keys = code_rank[keys]
+            order = np.argsort(keys, kind="stable")
+            rank = np.empty(self._size, dtype=np.int64)
+            rank[order] = np.arange(self._size)
+            cached = self._sort_orders[field] = (order, rank)
+        return cached
+
+    def sorted_rows(
+        self, rows: np.ndarray, field: str, descending: bool = False
+    ) -> np.ndarray:
+        """Order rows by a field using its maintained sort order.
+
+        Large selections are ordered by filtering the cached order (no
+        comparison sort); small ones sort only their own ranks.
+        """
+        order, rank = self._sort_order(field)
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) * 16 < self._size:
+            ordered = rows[np.argsort(rank[rows], kind="stable")]
+        else:
+            selected = np.zeros(self._size, dtype=bool)
+            selected[rows] = True
+            ordered = order[selected[order]]
+        return ordered[::-1] if descending else ordered
+
+    def within(self, bounds: Bounds) -> np.ndarray:
+        """Sorted rows of vessels positioned inside a bounding box."""
+        if self._grid_stale:
+            self.grid.rebuild(self.column("lat"), self.column("lng"))
+            self._grid_stale = False
+        return self.grid.query(bounds)
+
+    def near(
+        self, lat: float, lng: float, radius_nm: float, rows: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Rows within a great-circle radius of a point, nearest first.
+
+        Candidates come from the grid index over the cap's bounding box and
+        are then checked exactly. Returns the rows and their distances (nm),
+        optionally restricted to ``rows``.
+        """
+        candidates = self.within(cap_bounds(lat, lng, radius_nm))
+        if rows is not None:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        distances = haversine_nm(
+            lat, lng, self._columns["lat"][candidates], self._columns["lng"][candidates]
+        )
+        inside = distances <= radius_nm
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        rows: np.ndarray | None = None,
+        exclude: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The ``k`` rows nearest a point, by repeatedly doubling a radius query.
+
+        The first radius is the cap expected to hold ``k`` vessels if the fleet
+        were spread evenly over the globe.
+        """
+        pool = self._size if rows is None else len(rows)
+        if not pool or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        radius = 2 * EARTH_RADIUS_NM * math.sqrt(min((k + 1) / pool, 1.0))
+        while True:
+            found, distances = self.near(lat, lng, radius, rows)
+            if exclude is not None:
+                keep = found != exclude
+                found, distances = found[keep], distances[keep]
+            if len(found) >= k or radius >= HALF_CIRCUMFERENCE_NM:
+                return found[:k], distances[:k]
+            radius = min(radius * 2, HALF_CIRCUMFERENCE_NM)
+
+    def clusters(
+        self, zoom: int, rows: np.ndarray, bounds: Bounds
+    ) -> tuple[list[VesselCluster], np.ndarray]:
+        """Marker clusters of the given rows at a zoom level, plus lone rows."""
+        lat, lng = self.column("lat"), self.column("lng")
+        if self._clusters_stale:
+            self.cluster_index.rebuild(lat, lng)
+            self._clusters_stale = False
+        elif self._moved_rows:
+            moved = np.fromiter(self._moved_rows, dtype=np.int64)
+            self.cluster_index.move(moved, lat[moved], lng[moved])
+        self._moved_rows.clear()
+        return self.cluster_index.query(zoom, rows, bounds)
+
+    def cross_counts(self, field: str, filters: Mapping[str, str]) -> dict[str, int]:
+        """Vessels per value of a field if it were picked, given the other filters."""
+        others = {name: value for name, value in filters.items() if name != field}
+        if not any(others.values()):
+            return self.facets.cross_counts(field, None)
+        rows = self.select(others)
+        return self.facets.cross_counts(field, self._columns[field][rows])
+
+    def values(self, field: str, rows: np.ndarray | None = None) -> list:
+        """Decoded values of a field for the given rows (a mask or positions)."""
+        data = self._columns[field][: self._size][self._positions(rows)]
+        if field in self.dictionaries:
+            decoded = self.dictionaries[field].values
+            return [decoded[code] for code in data.tolist()]
+        return data.tolist()
+
+    def totals(self, rows: np.ndarray | None = None) -> dict[str, int]:
+        """Sum each voyage metric over the given rows."""
+        positions = self._positions(rows)
+        return {
+            field: int(self._columns[field][: self._size][positions].sum())
+            for field in METRIC_FIELDS
+        }
+
+    def aggregate(self, filters: Mapping[str, str]) -> dict[str, int]:
+        """Vessel count and metric totals for the vessels matching the filters.
+
+        Answered from the cube; a filter on a field outside it (MMSI) selects
+        the matching rows and sums those instead.
+        """
+        codes = {}
+        for field, value in filters.items():
+            if not value:
+                continue
+            if field not in CUBE_FIELDS:
+                rows = self.select(filters)
+                return {"count": len(rows), **self.totals(rows)}
+            code = self.dictionaries[field].lookup(value)
+            if code is None:
+                return {"count": 0, **dict.fromkeys(METRIC_FIELDS, 0)}
+            codes[field] = code
+        count, *sums = self.cube.query(codes)
+        return {"count": count, **dict(zip(METRIC_FIELDS, sums))}
+
+    def emissions(self, filters: Mapping[str, str]) -> EmissionsReport:
+        """Emission totals and groupings of the vessels matching the filters.
+
+        Memoized per filter signature until a field the report reads is
+        written, so position updates never invalidate it.
+        """
+        active = tuple(sorted((field, value) for field, value in filters.items() if value))
+        fields = EMISSION_FIELDS + tuple(field for field, _ in active)
+        key = (active, self.version(fields))
+        cached = self.emissions_engine.get(key)
+        if cached is not None:
+            return cached
+        columns = {field: self._columns[field][: self._size] for field in EMISSION_FIELDS}
+        return self.emissions_engine.report(
+            key, self.select(filters), columns, self.dictionaries
+        )
+
+    def records(self, rows: np.ndarray | None = None) -> list[Vessel]:
+        """Materialize the given rows back into Vessel dicts for the UI."""
+        positions = self._positions(rows)
+        columns = [self.values(field, positions) for field in VESSEL_FIELDS]
+        return [dict(zip(VESSEL_FIELDS, row)) for row in zip(*columns)]
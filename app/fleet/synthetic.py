@@ -0,0 +1,217 @@
+import datetime
+import numpy as np
+from app.fleet.geo import haversine_nm
+from app.models import Event, Vessel
+
+# Ports with a rough relative share of calls.
+PORTS = (
+    ("Port of Shanghai", 31.23, 121.49, 10.0),
+    ("Port of Singapore", 1.26, 103.83, 9.0),
+    ("Port of Ningbo", 29.87, 121.55, 7.0),
+    ("Port of Shenzhen", 22.50, 113.88, 6.5),
+    ("Port of Busan", 35.10, 129.04, 5.0),
+    ("Port of Rotterdam", 51.95, 4.10, 5.0),
+    ("Port of Dubai", 25.01, 55.06, 4.0),
+    ("Port of Hong Kong", 22.29, 114.16, 4.0),
+    ("Port of Antwerp", 51.26, 4.40, 3.5),
+    ("Port of Hamburg", 53.54, 9.97, 3.0),
+    ("Port of Los Angeles", 33.73, -118.26, 3.0),
+    ("Port of Tokyo", 35.62, 139.79, 2.5),
+    ("Port of New York", 40.66, -74.08, 2.5),
+    ("Port of Santos", -23.96, -46.30, 2.0),
+    ("Port of Le Havre", 49.47, 0.15, 1.5),
+    ("Port of London", 51.45, 0.35, 1.5),
+    ("Port of Osaka", 34.64, 135.43, 1.5),
+    ("Port of Sydney", -33.97, 151.21, 1.2),
+    ("Port of Durban", -29.87, 31.03, 1.2),
+    ("Port of Mumbai", 18.95, 72.85, 1.2),
+    ("Port of Algeciras", 36.13, -5.44, 1.2),
+    ("Port of Piraeus", 37.94, 23.62, 1.0),
+    ("Port of Houston", 29.73, -95.27, 1.0),
+    ("Port of Vancouver", 49.29, -123.11, 0.8),
+    ("Port of Colombo", 6.95, 79.84, 0.8),
+)
+# (type, segment, share, knots, tonnes of fuel a day by sizeband)
+VESSEL_TYPES = (
+    ("Container", "Deep Sea", 0.25, 18.0, {"Small": 40, "Medium": 90, "Large": 180}),
+    ("Bulk Carrier", "Deep Sea", 0.25, 13.0, {"Small": 20, "Medium": 30, "Large": 45}),
+    ("Tanker", "Deep Sea", 0.20, 14.0, {"Small": 25, "Medium": 40, "Large": 70}),
+    ("Cargo", "Short Sea", 0.15, 12.0, {"Small": 10, "Medium": 18, "Large": 28}),
+    ("Tanker", "Coastal", 0.05, 11.0, {"Small": 8, "Medium": 14, "Large": 20}),
+    ("Ferry", "Coastal", 0.10, 20.0, {"Small": 12, "Medium": 25, "Large": 45}),
+)
+SIZEBANDS = ("Small", "Medium", "Large")
+SIZEBAND_SHARES = (0.35, 0.45, 0.20)
+# Typical route length (nm) per segment; destinations fall off beyond it.
+ROUTE_SCALE_NM = {"Deep Sea": 6000.0, "Short Sea": 1200.0, "Coastal": 300.0}
+MIDS = (
+    (636, 0.15), (538, 0.12), (353, 0.10), (477, 0.08), (256, 0.06),
+    (412, 0.08), (563, 0.06), (215, 0.05), (311, 0.04), (240, 0.04),
+    (431, 0.04), (440, 0.04), (244, 0.04), (235, 0.03), (366, 0.07),
+)
+NAME_PREFIXES = (
+    "Atlantic", "Pacific", "Nordic", "Ocean", "Sea", "Star", "Golden", "Blue",
+    "Silver", "Northern", "Southern", "Eastern", "Western", "Royal", "Grand",
+    "Coral", "Polar", "Cape", "Harbour", "Island",
+)
+NAME_SUFFIXES = (
+    "Pioneer", "Spirit", "Voyager", "Trader", "Express", "Explorer", "Pride",
+    "Fortune", "Horizon", "Carrier", "Navigator", "Glory", "Endeavour",
+    "Breeze", "Wave", "Crown", "Falcon", "Dawn", "Liberty", "Harmony",
+)
+SYNTHETIC_EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+FLEET_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def _route_weights(segment: str) -> np.ndarray:
+    """Destination probabilities per origin port for one segment."""
+    lat = np.array([port[1] for port in PORTS])
+    lng = np.array([port[2] for port in PORTS])
+    weight = np.array([port[3] for port in PORTS])
+    distance = haversine_nm(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+    scale = ROUTE_SCALE_NM[segment]
+    affinity = weight[None, :] * np.exp(-np.abs(distance - scale) / scale)
+    np.fill_diagonal(affinity, 0.0)
+    return affinity / affinity.sum(axis=1, keepdims=True)
+
+
+def _pick(rng: np.random.Generator, probabilities: np.ndarray) -> np.ndarray:
+    """One sample per row of a (n, k) matrix of row-wise probabilities."""
+    cumulative = np.cumsum(probabilities, axis=1)
+    draws = rng.random((len(probabilities), 1)) * cumulative[:, -1:]
+    return np.minimum((cumulative < draws).sum(axis=1), probabilities.shape[1] - 1)
+
+
+def _interpolate(
+    lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray, fraction: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Points a fraction of the way along each great circle."""
+    phi1, lam1, phi2, lam2 = (np.radians(a) for a in (lat1, lng1, lat2, lng2))
+    start = np.stack([np.cos(phi1) * np.cos(lam1), np.cos(phi1) * np.sin(lam1), np.sin(phi1)])
+    end = np.stack([np.cos(phi2) * np.cos(lam2), np.cos(phi2) * np.sin(lam2), np.sin(phi2)])
+    omega = np.arccos(np.clip((start * end).sum(axis=0), -1.0, 1.0))
+    sin_omega = np.where(omega > 1e-9, np.sin(omega), 1.0)
+    a = np.where(omega > 1e-9, np.sin((1 - fraction) * omega) / sin_omega, 1 - fraction)
+    b = np.where(omega > 1e-9, np.sin(fraction * omega) / sin_omega, fraction)
+    x, y, z = a * start + b * end
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def generate_vessels(count: int, seed: int = 0) -> list[Vessel]:
+    """A deterministic synthetic fleet of ``count`` vessels part-way along their routes.
+
+    Origins follow port call shares; destinations favour the busy ports at
+    a distance typical of the vessel's segment. Duration, distance and fuel
+    follow from the route length, the vessel's speed and its sizeband.
+    """
+    rng = np.random.default_rng(seed)
+    kind = rng.choice(len(VESSEL_TYPES), count, p=[t[2] for t in VESSEL_TYPES])
+    sizeband = rng.choice(len(SIZEBANDS), count, p=SIZEBAND_SHARES)
+    port_weight = np.array([port[3] for port in PORTS])
+    origin = rng.choice(len(PORTS), count, p=port_weight / port_weight.sum())
+    destination = np.empty(count, dtype=np.int64)
+    segments = [t[1] for t in VESSEL_TYPES]
+    for segment in dict.fromkeys(segments):
+        rows = np.flatnonzero(np.isin(kind, [i for i, s in enumerate(segments) if s == segment]))
+        destination[rows] = _pick(rng, _route_weights(segment)[origin[rows]])
+
+    port_lat = np.array([port[1] for port in PORTS])
+    port_lng = np.array([port[2] for port in PORTS])
+    route_nm = haversine_nm(
+        port_lat[origin], port_lng[origin], port_lat[destination], port_lng[destination]
+    ) * rng.uniform(1.05, 1.25, count)
+    progress = rng.beta(0.8, 0.8, count)
+    lat, lng = _interpolate(
+        port_lat[origin], port_lng[origin], port_lat[destination], port_lng[destination], progress
+    )
+    jitter = rng.normal(0.0, 0.3, (2, count)) * np.sin(np.pi * progress)
+    lat = np.clip(lat + jitter[0], -85.0, 85.0)
+    lng = (lng + jitter[1] + 180.0) % 360.0 - 180.0
+
+    knots = np.array([t[3] for t in VESSEL_TYPES])[kind] * rng.uniform(0.85, 1.1, count)
+    days = np.maximum(np.rint(route_nm / (knots * 24)), 1).astype(np.int64)
+    burn = np.array([[t[4][band] for band in SIZEBANDS] for t in VESSEL_TYPES])[kind, sizeband]
+    fuel = np.rint(burn * days * rng.uniform(0.9, 1.1, count)).astype(np.int64)
+    status = np.where(progress > 0.98, 1, np.where(progress > 0.95, 2, 0))
+    status_names = ("In Transit", "At Port", "At Anchor")
+
+    mid_codes = np.array([mid for mid, _ in MIDS])
+    mid_shares = np.array([share for _, share in MIDS])
+    mid = rng.choice(len(MIDS), count, p=mid_shares / mid_shares.sum())
+    order = np.argsort(mid, kind="stable")
+    serial = np.empty(count, dtype=np.int64)
+    starts = np.searchsorted(mid[order], np.arange(len(MIDS)))
+    serial[order] = np.arange(count) - starts[mid[order]]
+    mmsi = mid_codes[mid] * 1_000_000 + (serial * 7919 + 100_000) % 1_000_000
+    prefix = rng.integers(0, len(NAME_PREFIXES), count)
+    suffix = rng.integers(0, len(NAME_SUFFIXES), count)
+
+    vessels: list[Vessel] = []
+    for i, (k, b, o, d, s, p, q) in enumerate(
+        zip(
+            kind.tolist(),
+            sizeband.tolist(),
+            origin.tolist(),
+            destination.tolist(),
+            status.tolist(),
+            prefix.tolist(),
+            suffix.tolist(),
+        )
+    ):
+        vessels.append(
+            {
+                "id": f"vessel_{i + 1}",
+                "name": f"{NAME_PREFIXES[p]} {NAME_SUFFIXES[q]}",
+                "type": VESSEL_TYPES[k][0],
+                "segment": VESSEL_TYPES[k][1],
+                "mmsi": str(mmsi[i]),
+                "sizeband": SIZEBANDS[b],
+                "lat": round(float(lat[i]), 5),
+                "lng": round(float(lng[i]), 5),
+                "status": status_names[s],
+                "origin_port": PORTS[o][0],
+                "destination_port": PORTS[d][0],
+                "voyage_duration_days": int(days[i]),
+                "distance_travelled_nm": int(route_nm[i] * progress[i]),
+                "fuel_consumption_mt": int(fuel[i]),
+            }
+        )
+    return vessels
+
+
+def generate_events(vessels: list[Vessel], seed: int = 0) -> list[Event]:
+    """The current voyage's events for each vessel, ending at SYNTHETIC_EPOCH.
+
+    Every vessel departed its origin; those past mid-voyage logged an
+    In Transit report, and those at or anchored off the destination an
+    Arrival or At Anchor event.
+    """
+    rng = np.random.default_rng(seed + 1)
+    epoch = SYNTHETIC_EPOCH.timestamp()
+    count = len(vessels)
+    days = np.array([vessel["voyage_duration_days"] for vessel in vessels], dtype=np.float64)
+    elapsed = rng.uniform(0.0, 1.0, count) * days * 86400
+    events: list[Event] = []
+    for i, vessel in enumerate(vessels):
+        departed = epoch - elapsed[i]
+        timeline = [("Departure", departed, vessel["origin_port"])]
+        if vessel["status"] == "At Port":
+            timeline.append(("Arrival", epoch - elapsed[i] * 0.01, vessel["destination_port"]))
+        elif vessel["status"] == "At Anchor":
+            timeline.append(("At Anchor", epoch - elapsed[i] * 0.01, vessel["destination_port"]))
+        elif elapsed[i] > days[i] * 43200:
+            timeline.append(("In Transit", departed + elapsed[i] / 2, "At sea"))
+        for event_type, at, location in timeline:
+            events.append(
+                {
+                    "id": f"event_{len(events) + 1}",
+                    "vessel_id": vessel["id"],
+                    "timestamp": datetime.datetime.fromtimestamp(at, datetime.timezone.utc)
+                    .isoformat(timespec="seconds")
+                    .replace("+00:00", "Z"),
+                    "event_type": event_type,
+                    "location": location,
+                    "vessel_name": vessel["name"],
+                }
+            )
+    return events
@@ -0,0 +1,245 @@
+from typing import Iterable, Mapping, Sequence
+import numpy as np
+from app.fleet.dictionary import Dictionary
+from app.fleet.events import EventLog, parse_timestamp
+from app.fleet.tracks import TrackStore
+from app.models import Event
+
+STATUS_BY_EVENT = {
+    "Departure": "In Transit",
+    "In Transit": "In Transit",
+    "Arrival": "At Port",
+    "At Anchor": "At Anchor",
+}
+STATUSES = sorted(set(STATUS_BY_EVENT.values()))
+_STATUS_CODES = {status: i for i, status in enumerate(STATUSES)}
+
+ARRAY_FIELDS = (
+    "keys",
+    "times",
+    "lat",
+    "lng",
+    "offsets",
+    "event_keys",
+    "event_status",
+    "event_offsets",
+)
+
+
+def _keyed(slots: np.ndarray, times: np.ndarray, start: float, span: float):
+    """Sortable keys placing each vessel's times in its own span."""
+    return slots * span + (times - start)
+
+
+def _codes(ids: Dictionary, vessel_ids: Iterable[str], size: int) -> np.ndarray:
+    """Id codes of vessels, -1 for those unknown or coded at or past ``size``."""
+    codes = [ids.lookup(vessel_id) for vessel_id in vessel_ids]
+    return np.asarray(
+        [-1 if code is None or code >= size else code for code in codes], dtype=np.int64
+    )
+
+
+def _status_code(event: Event) -> int:
+    """Index into STATUSES of the status an event implies, or -1."""
+    return _STATUS_CODES.get(STATUS_BY_EVENT.get(event["event_type"]), -1)
+
+
+class Timeline:
+    """Where every vessel was, and in what status, at any past time.
+
+    Fixes from all tracks are flattened into one array sorted by (vessel,
+    time), vessels being slotted by their id code in the fleet's id
+    dictionary. Querying many vessels at a time ``t`` is then one vectorized
+    binary search over ``slot * span + t`` keys and a linear interpolation
+    between the fixes either side. Status comes the same way from the event
+    log: the status implied by each vessel's latest event at or before ``t``.
+    """
+
+    def __init__(
+        self, ids: Dictionary, tracks: TrackStore, events: Iterable[tuple[int, Event]]
+    ):
+        vessel_ids, offsets, points = tracks.packed()
+        events = list(events)
+        self._index(
+            len(ids),
+            _codes(ids, vessel_ids, len(ids)),
+            offsets,
+            points,
+            _codes(ids, [event["vessel_id"] for _, event in events], len(ids)),
+            np.asarray([epoch for epoch, _ in events], dtype=np.float64),
+            np.asarray([_status_code(event) for _, event in events], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_fixes(
+        cls,
+        size: int,
+        vessel_codes: np.ndarray,
+        offsets: np.ndarray,
+        points: np.ndarray,
+        event_codes: np.ndarray,
+        event_times: np.ndarray,
+        event_status: np.ndarray,
+    ) -> "Timeline":
+        """A timeline over packed fixes and events, vessels given by id code.
+
+        Vessel ``vessel_codes[i]`` owns ``points[offsets[i]:offsets[i + 1]]``,
+        as ``TrackStore.packed`` returns them; events are parallel arrays
+        with their status as an index into STATUSES. Codes or statuses of -1
+        are skipped.
+        """
+        timeline = cls.__new__(cls)
+        timeline._index(
+            size, vessel_codes, offsets, points, event_codes, event_times, event_status
+        )
+        return timeline
+
+    def _index(
+        self,
+        size: int,
+        vessel_codes: np.ndarray,
+        offsets: np.ndarray,
+        points: np.ndarray,
+        event_codes: np.ndarray,
+        event_times: np.ndarray,
+        event_status: np.ndarray,
+    ):
+        fix_slots = np.repeat(vessel_codes, np.diff(offsets))
+        fixes = points[fix_slots >= 0]
+        fix_slots = fix_slots[fix_slots >= 0]
+        fix_times = fixes[:, 0]
+        kept = (event_codes >= 0) & (event_status >= 0)
+        event_slots, event_times = event_codes[kept], event_times[kept]
+        self.statuses = list(STATUSES)
+        every_time = np.concatenate([fix_times, event_times])
+        self.start = float(every_time.min()) if len(every_time) else 0.0
+        self.end = float(every_time.max()) if len(every_time) else 0.0
+        self._span = self.end - self.start + 1.0
+        self._size = size
+
+        keys = _keyed(fix_slots, fix_times, self.start, self._span)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._times = fix_times[order]
+        self._lat = fixes[order, 1]
+        self._lng = fixes[order, 2]
+        self._offsets = np.searchsorted(fix_slots[order], np.arange(size + 1))
+
+        keys = _keyed(event_slots, event_times, self.start, self._span)
+        order = np.argsort(keys, kind="stable")
+        self._event_keys = keys[order]
+        self._event_status = event_status[kept][order]
+        self._event_offsets = np.searchsorted(event_slots[order], np.arange(size + 1))
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: Mapping[str, np.ndarray]) -> "Timeline":
+        """A timeline restored from the output of ``to_arrays``."""
+        timeline = cls.__new__(cls)
+        timeline.statuses = list(meta["statuses"])
+        timeline.start, timeline.end = meta["start"], meta["end"]
+        timeline._span = timeline.end - timeline.start + 1.0
+        timeline._size = meta["size"]
+        for name in ARRAY_FIELDS:
+            setattr(timeline, f"_{name}", arrays[name])
+        return timeline
+
+    def to_arrays(self) -> tuple[dict, dict[str, np.ndarray]]:
+        """The scalars and arrays the timeline is made of, for checkpoints."""
+        meta = {"statuses": self.statuses, "start": self.start, "end": self.end, "size": self._size}
+        return meta, {name: getattr(self, f"_{name}") for name in ARRAY_FIELDS}
+
+    def tracked(self, codes: np.ndarray) -> np.ndarray:
+        """Mask of the vessels (by id code) that have any fix at all."""
+        codes = np.asarray(codes, dtype=np.int64)
+        known = codes < self._size
+        codes = np.where(known, codes, 0)
+        return known & (self._offsets[codes + 1] > self._offsets[codes])
+
+    def positions(
+        self, t: float, codes: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolated lat and lng at ``t`` for vessels given by id code.
+
+        The third array is a mask of the vessels with a fix at or before
+        ``t``; a vessel past its last fix is held there.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        if not len(self._keys):
+            empty = np.zeros(len(codes))
+            return empty, empty.copy(), np.zeros(len(codes), dtype=bool)
+        known = codes < self._size
+        codes = np.where(known, codes, 0)
+        first, stop = self._offsets[codes], self._offsets[codes + 1]
+        query = _keyed(codes, np.full(len(codes), float(t)), self.start, self._span)
+        after = np.searchsorted(self._keys, query, side="right")
+        # Past a vessel's last fix the search runs into the next vessel's.
+        before = np.minimum(after, stop) - 1
+        seen = known & (before >= first)
+        moving = seen & (after < stop)
+        before = np.where(seen, before, 0)
+        after = np.where(moving, after, before)
+
+        t0, t1 = self._times[before], self._times[after]
+        gap = np.where(moving, t1 - t0, 1.0)
+        fraction = np.where(moving & (gap > 0), (t - t0) / np.where(gap > 0, gap, 1.0), 0.0)
+        lat0, lng0 = self._lat[before], self._lng[before]
+        lat = lat0 + fraction * (self._lat[after] - lat0)
+        # Interpolate longitude the short way round the antimeridian.
+        delta = (self._lng[after] - lng0 + 540.0) % 360.0 - 180.0
+        lng = (lng0 + fraction * delta + 540.0) % 360.0 - 180.0
+        return lat, lng, seen
+
+    def status(self, t: float, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Index into ``statuses`` at ``t`` per vessel, and a mask of the known ones."""
+        codes = np.asarray(codes, dtype=np.int64)
+        known = codes < self._size
+        codes = np.where(known, codes, 0)
+        query = _keyed(codes, np.full(len(codes), float(t)), self.start, self._span)
+        latest = np.minimum(
+            np.searchsorted(self._event_keys, query, side="right"),
+            self._event_offsets[codes + 1],
+        ) - 1
+        seen = known & (latest >= self._event_offsets[codes])
+        if not len(self._event_status):
+            return np.zeros(len(codes), dtype=np.int64), seen
+        return self._event_status[np.where(seen, latest, 0)], seen
+
+
+class TimelineSource:
+    """What a Timeline is built from, taken on the event loop to build it in a thread.
+
+    ``take`` runs where the fleet is written and keeps only what ``build``
+    reads: the tracks packed by ``TrackStore.packed``, and the log's events
+    by count, which is enough as the log only grows. ``build`` may then run
+    in a thread, and parses just the events added since the previous build.
+    """
+
+    def __init__(self):
+        self._taken: tuple | None = None
+        self._events: Sequence[Event] | None = None
+        self._vessel_ids: list[str] = []
+        self._times: list[int] = []
+        self._status: list[int] = []
+
+    def take(self, ids: Dictionary, tracks: TrackStore, log: EventLog):
+        events, _, _ = log.parts()
+        self._taken = (ids, len(ids), tracks.packed(), events, len(events))
+
+    def build(self) -> Timeline:
+        """A timeline of what was taken last."""
+        ids, size, (vessel_ids, offsets, points), events, count = self._taken
+        if events is not self._events or count < len(self._times):
+            self._events, self._vessel_ids, self._times, self._status = events, [], [], []
+        for event in events[len(self._times) : count]:
+            self._vessel_ids.append(event["vessel_id"])
+            self._times.append(parse_timestamp(event["timestamp"]))
+            self._status.append(_status_code(event))
+        return Timeline.from_fixes(
+            size,
+            _codes(ids, vessel_ids, size),
+            offsets,
+            points,
+            _codes(ids, self._vessel_ids, size),
+            np.asarray(self._times, dtype=np.float64),
+            np.asarray(self._status, dtype=np.int64),
+        )
@@ -0,0 +1,290 @@
+import math
+from typing import Iterable, Iterator, Sequence
+import numpy as np
+from app.fleet.clustering import MAX_MERCATOR_LAT
+
+RETENTION_S = 7 * 24 * 3600
+MAX_POINTS = 4096
+INITIAL_CAPACITY = 16
+TOLERANCE_PX = 1.0
+MAX_DRAWN_POINTS = 256
+
+
+def _world_pixels(lat: np.ndarray, lng: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Web-mercator pixel coordinates at zoom 0 (a 256px world)."""
+    sin_lat = np.sin(np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)))
+    x = (lng + 180.0) / 360.0 * 256.0
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * 256.0
+    return x, y
+
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the points kept by Douglas–Peucker at the given tolerance."""
+    count = len(x)
+    if count < 3:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        length = math.hypot(dx, dy)
+        if length:
+            distances = np.abs(px * dy - py * dx) / length
+        else:
+            distances = np.hypot(px, py)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+class TrackBuffer:
+    """Ring buffer of one vessel's recent (time, lat, lng) fixes.
+
+    Storage starts small and doubles up to ``max_points``, after which the
+    oldest fix is overwritten. Fixes older than the retention window, counted
+    back from the newest fix, are dropped as new ones arrive.
+    """
+
+    __slots__ = ("_data", "_start", "_size", "version", "_simplified")
+
+    def __init__(self):
+        self._data = np.empty((INITIAL_CAPACITY, 3), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+        self.version = 0
+        self._simplified: dict[int, tuple[int, list[dict[str, float]]]] = {}
+
+    @classmethod
+    def wrap(cls, points: np.ndarray) -> "TrackBuffer":
+        """A full buffer over existing (n, 3) fixes, without copying them."""
+        track = cls.__new__(cls)
+        track._data = points
+        track._start = 0
+        track._size = len(points)
+        track.version = 0
+        track._simplified = {}
+        return track
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, max_points: int):
+        capacity = min(2 * len(self._data), max_points)
+        self._data = np.concatenate([self.points(), np.empty((capacity - self._size, 3))])
+        self._start = 0
+
+    def append(self, t: float, lat: float, lng: float, retention_s: float, max_points: int):
+        capacity = len(self._data)
+        # Wrapped fixes are shared, so they are copied before being overwritten.
+        if self._size == capacity and (capacity < max_points or not self._data.flags.owndata):
+            self._grow(max_points)
+            capacity = len(self._data)
+        if self._size and t < self._data[(self._start + self._size - 1) % capacity, 0]:
+            return
+        if self._size == capacity:
+            self._start = (self._start + 1) % capacity
+            self._size -= 1
+        self._data[(self._start + self._size) % capacity] = (t, lat, lng)
+        self._size += 1
+        cutoff = t - retention_s
+        while self._data[self._start, 0] < cutoff:
+            self._start = (self._start + 1) % capacity
+            self._size -= 1
+        self.version += 1
+
+    def points(self) -> np.ndarray:
+        """The fixes as a (n, 3) array of time, lat, lng, oldest first."""
+        end = self._start + self._size
+        if end <= len(self._data):
+            return self._data[self._start : end].copy()
+        return np.concatenate([self._data[self._start :], self._data[: end - len(self._data)]])
+
+
+class TrackStore:
+    """Recent position history of every vessel, for drawing tracks.
+
+    Tracks are simplified with Douglas–Peucker at a one-pixel tolerance for
+    the zoom level, loosened further until at most ``max_drawn`` points are
+    left, and cached per zoom until the vessel reports a new fix.
+    """
+
+    def __init__(
+        self,
+        retention_s: float = RETENTION_S,
+        max_points: int = MAX_POINTS,
+        max_drawn: int = MAX_DRAWN_POINTS,
+    ):
+        self.retention_s = retention_s
+        self.max_points = max_points
+        self.max_drawn = max_drawn
+        self._tracks: dict[str, TrackBuffer] = {}
+        self._changed: set[str] = set()
+        self._packed: tuple[Sequence[str], np.ndarray, np.ndarray] | None = None
+        self._rows: dict[str, int] | None = None
+        self._oldest: dict[str, float] = {}
+        self._newest = -math.inf
+
+    @classmethod
+    def from_arrays(
+        cls, vessel_ids: Sequence[str], offsets: np.ndarray, points: np.ndarray
+    ) -> "TrackStore":
+        """Tracks over one (n, 3) array of fixes grouped by vessel, without copying.
+
+        Vessel ``i`` owns ``points[offsets[i]:offsets[i + 1]]``. A track
+        appended to copies its fixes first, so the arrays are never written.
+        """
+        store = cls()
+        for i, vessel_id in enumerate(vessel_ids):
+            store._tracks[vessel_id] = TrackBuffer.wrap(points[offsets[i] : offsets[i + 1]])
+        store._packed = (vessel_ids, offsets, points)
+        filled = np.flatnonzero(np.diff(offsets) > 0)
+        if len(filled):
+            store._oldest = dict(
+                zip([vessel_ids[i] for i in filled.tolist()], points[offsets[filled], 0].tolist())
+            )
+            store._newest = float(points[offsets[filled + 1] - 1, 0].max())
+        return store
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, vessel_id: str) -> bool:
+        return vessel_id in self._tracks
+
+    def append(self, vessel_id: str, t: float, lat: float, lng: float):
+        """Record a fix; fixes older than the vessel's latest are ignored."""
+        track = self._tracks.get(vessel_id)
+        if track is None:
+            track = self._tracks[vessel_id] = TrackBuffer()
+        track.append(t, lat, lng, self.retention_s, self.max_points)
+        self._changed.add(vessel_id)
+        self._oldest[vessel_id] = float(track._data[track._start, 0])
+        self._newest = max(self._newest, t)
+
+    def extend(
+        self,
+        vessel_ids: Sequence[str],
+        t: Iterable[float],
+        lat: Iterable[float],
+        lng: Iterable[float],
+    ):
+        for vessel_id, fix_t, fix_lat, fix_lng in zip(vessel_ids, t, lat, lng):
+            self.append(vessel_id, fix_t, fix_lat, fix_lng)
+
+    def items(self) -> Iterator[tuple[str, np.ndarray]]:
+        """Every vessel id with its (n, 3) fixes, oldest first."""
+        for vessel_id, track in self._tracks.items():
+            yield vessel_id, track.points()
+
+    def packed(self) -> tuple[Sequence[str], np.ndarray, np.ndarray]:
+        """Every track in one (n, 3) array of fixes grouped by vessel.
+
+        Vessel ``i`` of the ids owns ``points[offsets[i]:offsets[i + 1]]``,
+        in the order vessels were first seen, as ``from_arrays`` takes them.
+        Only the tracks appended to since the previous call are copied from
+        their buffers; the other vessels' fixes are copied over in runs.
+        The arrays returned are never written to afterwards, so they may be
+        read from another thread.
+        """
+        if self._packed is None:
+            vessel_ids = list(self._tracks)
+            parts = [track.points() for track in self._tracks.values()]
+            offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+            np.cumsum([len(part) for part in parts], out=offsets[1:])
+            points = np.concatenate(parts) if parts else np.empty((0, 3))
+            self._packed, self._rows = (vessel_ids, offsets, points), None
+            self._changed.clear()
+            return self._packed
+        if not self._changed:
+            return self._packed
+        vessel_ids, offsets, points = self._packed
+        if self._rows is None:
+            self._rows = {vessel_id: i for i, vessel_id in enumerate(vessel_ids)}
+        added = [vessel_id for vessel_id in self._changed if vessel_id not in self._rows]
+        if added:
+            vessel_ids = list(vessel_ids) + added
+            for vessel_id in added:
+                self._rows[vessel_id] = len(self._rows)
+        stored = len(offsets) - 1
+        changed = {
+            self._rows[vessel_id]: self._tracks[vessel_id].points() for vessel_id in self._changed
+        }
+        lengths = np.zeros(len(vessel_ids), dtype=np.int64)
+        lengths[:stored] = np.diff(offsets)
+        parts, copied = [], 0
+        for row in sorted(changed):
+            parts.append(points[offsets[copied] : offsets[min(row, stored)]])
+            parts.append(changed[row])
+            lengths[row] = len(changed[row])
+            copied = min(row + 1, stored)
+        parts.append(points[offsets[copied] :])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        self._packed = (vessel_ids, offsets, np.concatenate(parts))
+        self._changed.clear()
+        return self._packed
+
+    def time_range(self) -> tuple[float, float] | None:
+        """Times of the oldest and newest fix retained, or None without any."""
+        if not self._oldest:
+            return None
+        return min(self._oldest.values()), self._newest
+
+    def last_legs(self, vessel_ids: Sequence[str]) -> np.ndarray:
+        """Each vessel's two latest fixes as (n, 4) lat, lng, lat, lng rows.
+
+        Rows of vessels with fewer than two retained fixes are NaN.
+        """
+        legs = np.full((len(vessel_ids), 4), np.nan)
+        for i, vessel_id in enumerate(vessel_ids):
+            track = self._tracks.get(vessel_id)
+            if track is None or track._size < 2:
+                continue
+            last = (track._start + track._size - 1) % len(track._data)
+            legs[i, :2] = track._data[last - 1, 1:]
+            legs[i, 2:] = track._data[last, 1:]
+        return legs
+
+    def history(self, vessel_id: str, since: float | None = None) -> np.ndarray:
+        """A vessel's fixes as (n, 3) time, lat, lng rows, oldest first."""
+        track = self._tracks.get(vessel_id)
+        if track is None:
+            return np.empty((0, 3))
+        points = track.points()
+        if since is not None:
+            points = points[np.searchsorted(points[:, 0], since) :]
+        return points
+
+    def simplified(self, vessel_id: str, zoom: int) -> list[dict[str, float]]:
+        """The vessel's track as at most ``max_drawn`` lat/lng points for a zoom."""
+        track = self._tracks.get(vessel_id)
+        if track is None:
+            return []
+        cached = track._simplified.get(zoom)
+        if cached is not None and cached[0] == track.version:
+            return cached[1]
+        points = track.points()
+        lat = points[:, 1]
+        # Unwrap longitudes so tracks crossing the antimeridian stay continuous.
+        lng = np.degrees(np.unwrap(np.radians(points[:, 2])))
+        x, y = _world_pixels(lat, lng)
+        tolerance = TOLERANCE_PX / (1 << max(zoom, 0))
+        kept = douglas_peucker(x, y, tolerance)
+        while len(kept) > self.max_drawn:
+            tolerance *= 2
+            kept = douglas_peucker(x, y, tolerance)
+        line = [
+            {"lat": fix_lat, "lng": fix_lng}
+            for fix_lat, fix_lng in zip(lat[kept].tolist(), lng[kept].tolist())
+        ]
+        track._simplified[zoom] = (track.version, line)
+        return line
@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import logging
+import time
+from app.fleet.store import FleetStore
+from app.ingest.pipeline import IngestPipeline, fleet_applier
+from app.ingest.sources import parse_source
+
+logger = logging.getLogger(__name__)
+
+
+async def main(specs: list[str], report_every: float):
+    pipeline = IngestPipeline(fleet_applier(FleetStore()))
+    started = time.monotonic()
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_every)
+            logger.info(f"AIS ingest: {pipeline.counters()}")
+
+    reporter = asyncio.create_task(report())
+    try:
+        await pipeline.run(parse_source(spec) for spec in specs)
+    finally:
+        reporter.cancel()
+    elapsed = time.monotonic() - started
+    counters = pipeline.counters()
+    rate = counters["received"] / elapsed if elapsed else 0
+    logger.info(f"AIS ingest finished in {elapsed:.2f}s ({rate:,.0f} lines/s): {counters}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AIS ingestion pipeline.")
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        help="file:PATH[@SPEED], udp:HOST:PORT, tcp:HOST:PORT or stdin",
+    )
+    parser.add_argument("--report-every", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.sources, args.report_every))
@@ -0,0 +1,192 @@
+from functools import reduce
+from operator import xor
+from typing import TypedDict
+
+_SIXBIT = {
+    chr(code): format(code - 48 if code - 48 < 40 else code - 56, "06b")
+    for code in range(48, 120)
+    if code < 88 or code > 95
+}
+_ARMOR = str.maketrans(_SIXBIT)
+_TEXT = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_ !\"#$%&'()*+,-./0123456789:;<=>?"
+
+NAV_STATUS_LABELS = {
+    0: "In Transit",
+    1: "At Anchor",
+    5: "At Port",
+    8: "In Transit",
+}
+MAX_PENDING_FRAGMENTS = 1024
+
+
+class AISDecodeError(ValueError):
+    """Raised for sentences that are malformed or fail their checksum."""
+
+
+class AISMessage(TypedDict, total=False):
+    """Fields decoded from an AIVDM/AIVDO sentence, by message type."""
+
+    msg_type: int
+    mmsi: str
+    nav_status: int
+    sog: float
+    cog: float
+    heading: int
+    lat: float
+    lng: float
+    imo: str
+    callsign: str
+    shipname: str
+    ship_type: int
+    destination: str
+    draught: float
+    part: int
+    timestamp: float
+
+
+class _Bits:
+    """Bit field reader over a de-armored AIS payload held as one integer."""
+
+    __slots__ = ("value", "length")
+
+    def __init__(self, payload: str, fill: int):
+        binary = payload.translate(_ARMOR)
+        if len(binary) != 6 * len(payload):
+            raise AISDecodeError(f"Invalid payload character in {payload!r}")
+        self.length = len(binary) - fill
+        self.value = int(binary, 2) >> fill if binary else 0
+
+    def unsigned(self, start: int, width: int) -> int:
+        if start + width > self.length:
+            raise AISDecodeError("Payload too short for message type")
+        return (self.value >> (self.length - start - width)) & ((1 << width) - 1)
+
+    def signed(self, start: int, width: int) -> int:
+        value = self.unsigned(start, width)
+        return value - (1 << width) if value >> (width - 1) else value
+
+    def text(self, start: int, width: int) -> str:
+        width = min(width, (self.length - start) // 6 * 6)
+        value = self.unsigned(start, width) if width > 0 else 0
+        chars = [
+            _TEXT[(value >> shift) & 0x3F] for shift in range(width - 6, -1, -6)
+        ]
+        return "".join(chars).split("@", 1)[0].rstrip()
+
+
+def _position(bits: _Bits, message: AISMessage, offset: int):
+    """Decode the sog/lon/lat/cog/heading block shared by types 1-3 and 18."""
+    sog = bits.unsigned(offset, 10)
+    lng = bits.signed(offset + 11, 28)
+    lat = bits.signed(offset + 39, 27)
+    cog = bits.unsigned(offset + 66, 12)
+    heading = bits.unsigned(offset + 78, 9)
+    if sog != 1023:
+        message["sog"] = sog / 10
+    if lng != 0x6791AC0 and lat != 0x3412140:
+        message["lng"] = lng / 600000
+        message["lat"] = lat / 600000
+    if cog != 3600:
+        message["cog"] = cog / 10
+    if heading != 511:
+        message["heading"] = heading
+
+
+def decode_payload(payload: str, fill: int = 0) -> AISMessage | None:
+    """Decode a complete (reassembled) payload; None for unsupported types."""
+    bits = _Bits(payload, fill)
+    msg_type = bits.unsigned(0, 6)
+    message: AISMessage = {"msg_type": msg_type, "mmsi": str(bits.unsigned(8, 30))}
+    if msg_type in (1, 2, 3):
+        message["nav_status"] = bits.unsigned(38, 4)
+        _position(bits, message, 50)
+    elif msg_type == 18:
+        _position(bits, message, 46)
+    elif msg_type == 5:
+        message["imo"] = str(bits.unsigned(40, 30))
+        message["callsign"] = bits.text(70, 42)
+        message["shipname"] = bits.text(112, 120)
+        message["ship_type"] = bits.unsigned(232, 8)
+        message["draught"] = bits.unsigned(294, 8) / 10
+        message["destination"] = bits.text(302, 120)
+    elif msg_type == 24:
+        part = bits.unsigned(38, 2)
+        message["part"] = part
+        if part == 0:
+            message["shipname"] = bits.text(40, 120)
+        else:
+            message["ship_type"] = bits.unsigned(40, 8)
+            message["callsign"] = bits.text(90, 42)
+    else:
+        return None
+    return message
+
+
+def _checksum_ok(sentence: str) -> bool:
+    body, _, checksum = sentence[1:].partition("*")
+    try:
+        return reduce(xor, body.encode(), 0) == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+class AISDecoder:
+    """Stateful AIVDM/AIVDO sentence decoder with multi-fragment reassembly.
+
+    Sentences may carry an NMEA 4.0 tag block; its ``c:`` source time becomes
+    the message timestamp. Fragments are buffered per (sequence id, channel)
+    until the last one arrives.
+    """
+
+    def __init__(self, verify_checksum: bool = True):
+        self.verify_checksum = verify_checksum
+        self._fragments: dict[tuple[str, str], list[str]] = {}
+
+    def decode(self, line: str) -> AISMessage | None:
+        """Decode one line; None if it is an incomplete fragment or unsupported.
+
+        Raises:
+            AISDecodeError: If the sentence is malformed or fails its checksum.
+        """
+        timestamp = None
+        line = line.strip()
+        if line.startswith("\\"):
+            tag, _, line = line[1:].partition("\\")
+            for field in tag.split("*", 1)[0].split(","):
+                if field.startswith("c:"):
+                    try:
+                        timestamp = float(field[2:])
+                    except ValueError as e:
+                        raise AISDecodeError(f"Bad tag block time: {tag!r}") from e
+        if not line.startswith(("!AIVDM", "!AIVDO")):
+            raise AISDecodeError(f"Not an AIVDM/AIVDO sentence: {line[:20]!r}")
+        if self.verify_checksum and not _checksum_ok(line):
+            raise AISDecodeError(f"Bad checksum: {line!r}")
+        parts = line.split(",")
+        if len(parts) != 7:
+            raise AISDecodeError(f"Wrong field count: {line!r}")
+        try:
+            count, number = int(parts[1]), int(parts[2])
+            fill = int(parts[6].split("*", 1)[0] or 0)
+        except ValueError as e:
+            raise AISDecodeError(f"Bad sentence header: {line!r}") from e
+        payload = parts[5]
+        if count > 1:
+            key = (parts[3], parts[4])
+            if number == 1:
+                if len(self._fragments) >= MAX_PENDING_FRAGMENTS:
+                    self._fragments.pop(next(iter(self._fragments)))
+                self._fragments[key] = [payload]
+                return None
+            pending = self._fragments.get(key)
+            if pending is None or len(pending) != number - 1:
+                self._fragments.pop(key, None)
+                raise AISDecodeError(f"Out of order fragment: {line!r}")
+            pending.append(payload)
+            if number < count:
+                return None
+            payload = "".join(self._fragments.pop(key))
+        message = decode_payload(payload, fill)
+        if message is not None and timestamp is not None:
+            message["timestamp"] = timestamp
+        return message
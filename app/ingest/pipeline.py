@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+import numpy as np
+from app.fleet.events import EventLog
+from app.fleet.geofence import Geofence
+from app.fleet.store import FleetStore
+from app.fleet.tracks import TrackStore
+from app.ingest.ais import NAV_STATUS_LABELS, AISDecodeError, AISDecoder, AISMessage
+from app.ingest.sources import Source
+
+logger = logging.getLogger(__name__)
+
+# Messages applied per step on the event loop, which yields between steps.
+APPLY_CHUNK_MESSAGES = 2000
+
+
+@dataclass
+class IngestStats:
+    """Running counters of an ingestion pipeline."""
+
+    received: int = 0
+    decoded: int = 0
+    rejected: int = 0
+    ignored: int = 0
+    dropped: int = 0
+    applied: int = 0
+    batches: int = 0
+
+
+class IngestPipeline:
+    """Decodes AIS lines from pluggable sources and applies them in batches.
+
+    Sources feed a bounded queue of line batches. Reliable sources wait for
+    room (backpressure), lossy ones have their batch dropped and counted. A
+    single consumer drains whatever is queued, decodes it in a worker thread
+    and hands the messages to ``apply`` in chunks of ``apply_chunk``, yielding
+    to the event loop in between; ``apply`` returns how many it applied.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[list[AISMessage]], int],
+        queue_size: int = 256,
+        max_batch_lines: int = 20000,
+        apply_chunk: int = APPLY_CHUNK_MESSAGES,
+    ):
+        self.apply = apply
+        self.queue: asyncio.Queue[list[str]] = asyncio.Queue(maxsize=queue_size)
+        self.max_batch_lines = max_batch_lines
+        self.apply_chunk = apply_chunk
+        self.decoder = AISDecoder()
+        self.stats = IngestStats()
+        self.sources: list[Source] = []
+
+    async def _produce(self, source: Source):
+        async for batch in source.batches():
+            self.stats.received += len(batch)
+            if not source.lossy:
+                await self.queue.put(batch)
+                continue
+            try:
+                self.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self.stats.dropped += len(batch)
+
+    def _decode(self, lines: list[str]) -> list[AISMessage]:
+        # Runs in a worker thread: only the consumer touches the decoder and
+        # the decode counters, one batch at a time.
+        messages = []
+        decode = self.decoder.decode
+        for line in lines:
+            if not line or line.isspace():
+                continue
+            try:
+                message = decode(line)
+            except AISDecodeError:
+                self.stats.rejected += 1
+                continue
+            if message is None:
+                self.stats.ignored += 1
+            else:
+                messages.append(message)
+        self.stats.decoded += len(messages)
+        return messages
+
+    def _apply(self, messages: list[AISMessage]) -> int:
+        applied = self.apply(messages) if messages else 0
+        self.stats.applied += applied
+        return applied
+
+    def process(self, lines: list[str]) -> int:
+        """Decode and apply one batch of lines synchronously."""
+        applied = self._apply(self._decode(lines))
+        self.stats.batches += 1
+        return applied
+
+    async def _consume(self):
+        while True:
+            lines = list(await self.queue.get())
+            taken = 1
+            while len(lines) < self.max_batch_lines and not self.queue.empty():
+                lines.extend(self.queue.get_nowait())
+                taken += 1
+            try:
+                messages = await asyncio.to_thread(self._decode, lines)
+                for start in range(0, len(messages), self.apply_chunk):
+                    self._apply(messages[start : start + self.apply_chunk])
+                    await asyncio.sleep(0)
+                self.stats.batches += 1
+            except Exception as e:
+                logger.exception(f"Failed to apply AIS batch: {e}")
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+
+    async def run(self, sources: Iterable[Source]):
+        """Ingest from every source until they are all exhausted."""
+        self.sources = list(sources)
+        consumer = asyncio.create_task(self._consume())
+        try:
+            await asyncio.gather(*(self._produce(source) for source in self.sources))
+            await self.queue.join()
+        finally:
+            consumer.cancel()
+
+    def counters(self) -> dict[str, int]:
+        """Current counters, including source-side drops and queue depth."""
+        counters = asdict(self.stats)
+        counters["dropped"] += sum(source.dropped for source in self.sources)
+        counters["queue_depth"] = self.queue.qsize()
+        return counters
+
+
+def fleet_applier(
+    store: FleetStore,
+    tracks: TrackStore | None = None,
+    geofence: Geofence | None = None,
+    events: EventLog | None = None,
+) -> Callable[[list[AISMessage]], int]:
+    """An ``apply`` callback writing the latest position per MMSI into a store.
+
+    With ``tracks``, every position of a known vessel is also appended to its
+    track, stamped with the tag block time or else the time of arrival. With
+    ``geofence`` and ``events``, those positions also drive port and anchorage
+    detection and the resulting events are added to the log.
+    """
+
+    def apply(messages: list[AISMessage]) -> int:
+        latest: dict[str, AISMessage] = {}
+        fixes = []
+        for message in messages:
+            if "lat" in message:
+                latest[message["mmsi"]] = message
+                fixes.append(message)
+        if not latest:
+            return 0
+        rows = store.rows_for("mmsi", list(latest))
+        if tracks is not None or geofence is not None:
+            row_by_mmsi = dict(zip(latest, rows.tolist()))
+            fix_rows = np.array([row_by_mmsi[fix["mmsi"]] for fix in fixes], dtype=np.int64)
+            _record_fixes(store, fixes, fix_rows, tracks, geofence, events)
+        positions = latest.values()
+        updated = store.update_rows(
+            rows,
+            {
+                "lat": [message["lat"] for message in positions],
+                "lng": [message["lng"] for message in positions],
+                "status": [
+                    NAV_STATUS_LABELS.get(message.get("nav_status"))
+                    for message in positions
+                ],
+            },
+        )
+        return len(updated)
+
+    return apply
+
+
+def _record_fixes(
+    store: FleetStore,
+    fixes: list[AISMessage],
+    rows: np.ndarray,
+    tracks: TrackStore | None,
+    geofence: Geofence | None,
+    events: EventLog | None,
+):
+    known = np.flatnonzero(rows >= 0)
+    if not len(known):
+        return
+    now = time.time()
+    matched = [fixes[i] for i in known.tolist()]
+    ids = store.values("id", rows[known])
+    timestamps = [fix.get("timestamp", now) for fix in matched]
+    lat = [fix["lat"] for fix in matched]
+    lng = [fix["lng"] for fix in matched]
+    if tracks is not None:
+        tracks.extend(ids, timestamps, lat, lng)
+    if geofence is not None:
+        found = geofence.update(
+            ids,
+            store.values("name", rows[known]),
+            timestamps,
+            lat,
+            lng,
+            [fix.get("sog") for fix in matched],
+        )
+        if found and events is not None:
+            events.extend(found)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def _tag_time(line: str) -> float | None:
+    """The ``c:`` source time from a line's NMEA tag block, if it has one."""
+    if not line.startswith("\\"):
+        return None
+    for field in line[1:].split("\\", 1)[0].split("*", 1)[0].split(","):
+        if field.startswith("c:"):
+            try:
+                return float(field[2:])
+            except ValueError:
+                return None
+    return None
+
+
+class Source(ABC):
+    """A stream of raw NMEA lines, yielded in batches.
+
+    Lossy sources (datagrams) cannot be slowed down, so the pipeline drops
+    their batches when the queue is full; the others are awaited instead.
+    """
+
+    lossy = False
+    dropped = 0
+
+    @abstractmethod
+    def batches(self) -> AsyncIterator[list[str]]:
+        """Yield lists of lines until the source is exhausted."""
+
+
+class _StreamSource(Source):
+    async def _read_lines(
+        self, reader: asyncio.StreamReader
+    ) -> AsyncIterator[list[str]]:
+        remainder = b""
+        while chunk := await reader.read(READ_CHUNK_BYTES):
+            *complete, remainder = (remainder + chunk).split(b"\n")
+            if complete:
+                yield [line.decode("ascii", "replace") for line in complete]
+        if remainder.strip():
+            yield [remainder.decode("ascii", "replace")]
+
+
+class FileReplaySource(Source):
+    """Replays a recorded NMEA file, paced by tag block times at N× speed.
+
+    Lines without a tag block time are emitted as fast as the queue accepts
+    them; ``speed=0`` disables pacing altogether.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, batch_size: int = 500):
+        self.path = path
+        self.speed = speed
+        self.batch_size = batch_size
+
+    async def batches(self) -> AsyncIterator[list[str]]:
+        first_source_time = None
+        started = time.monotonic()
+        batch: list[str] = []
+        with open(self.path, encoding="ascii", errors="replace") as f:
+            for line in f:
+                source_time = _tag_time(line) if self.speed else None
+                if source_time is not None:
+                    if first_source_time is None:
+                        first_source_time = source_time
+                    due = started + (source_time - first_source_time) / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        if batch:
+                            yield batch
+                            batch = []
+                        await asyncio.sleep(delay)
+                batch.append(line)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+                    await asyncio.sleep(0)
+        if batch:
+            yield batch
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, source: "UDPSource", queue: asyncio.Queue):
+        self.source = source
+        self.queue = queue
+
+    def datagram_received(self, data: bytes, addr):
+        lines = data.decode("ascii", "replace").splitlines()
+        try:
+            self.queue.put_nowait(lines)
+        except asyncio.QueueFull:
+            self.source.dropped += len(lines)
+
+
+class UDPSource(Source):
+    """Listens for NMEA datagrams, one or more lines per datagram."""
+
+    lossy = True
+
+    def __init__(self, host: str, port: int, buffer: int = 1024):
+        self.host = host
+        self.port = port
+        self.buffer = buffer
+
+    async def batches(self) -> AsyncIterator[list[str]]:
+        queue: asyncio.Queue[list[str]] = asyncio.Queue(maxsize=self.buffer)
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self, queue), local_addr=(self.host, self.port)
+        )
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            transport.close()
+
+
+class TCPSource(_StreamSource):
+    """Reads NMEA lines from a TCP feed, reconnecting when it drops."""
+
+    def __init__(self, host: str, port: int, reconnect_delay: float = 5.0):
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+
+    async def batches(self) -> AsyncIterator[list[str]]:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                logger.warning(f"AIS feed {self.host}:{self.port} unavailable: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            try:
+                async for batch in self._read_lines(reader):
+                    yield batch
+            finally:
+                writer.close()
+            logger.warning(f"AIS feed {self.host}:{self.port} closed, reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+
+
+class StdinSource(_StreamSource):
+    """Reads NMEA lines piped to the process on stdin."""
+
+    async def batches(self) -> AsyncIterator[list[str]]:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+        )
+        async for batch in self._read_lines(reader):
+            yield batch
+
+
+def parse_source(spec: str) -> Source:
+    """Build a source from a spec.
+
+    Specs look like ``file:feed.nmea@10`` (replay at 10x), ``udp:0.0.0.0:10110``,
+    ``tcp:host:port`` or ``stdin``.
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "stdin":
+        return StdinSource()
+    if kind == "file":
+        path, _, speed = target.partition("@")
+        return FileReplaySource(path, float(speed or 1.0))
+    if kind in ("udp", "tcp"):
+        host, _, port = target.rpartition(":")
+        source = UDPSource if kind == "udp" else TCPSource
+        return source(host or "0.0.0.0", int(port))
+    raise ValueError(f"Unknown AIS source: {spec}")
@@ -0,0 +1,334 @@
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+import reflex as rx
+from reflex.middleware import Middleware
+from reflex.utils import format
+from reflex.vars.base import ComputedVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS", "").lower() in ("1", "true", "yes", "on")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+BYTES_BUCKETS = tuple(float(1024 * 4**i) for i in range(9))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(value)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class HistogramChild:
+    """One labelled series of a histogram; ``observe`` is the hot path."""
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram:
+    """A Prometheus histogram with fixed buckets and optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._children: dict[tuple[str, ...], HistogramChild] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value: float, *label_values: str):
+        self.labels(*label_values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.label_names, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A gauge read from a callback at scrape time.
+
+    The callback returns a number, or with ``label_names`` a mapping of label
+    value tuples to numbers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], float | dict[tuple[str, ...], float]],
+        label_names: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label_names = label_names
+
+    def render(self) -> list[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.warning(f"Failed to read gauge {self.name}: {e}")
+            return []
+        values = value if self.label_names else {(): value}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, number in sorted(values.items()):
+            labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}{labels} {_format_value(number)}")
+        return lines
+
+
+class Registry:
+    """The metrics exposed on the metrics endpoint, by name."""
+
+    def __init__(self):
+        self._metrics: dict[str, Histogram | Gauge] = {}
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(name, help, label_names, buckets)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], float | dict[tuple[str, ...], float]],
+        label_names: tuple[str, ...] = (),
+    ) -> Gauge:
+        """Register (or replace) a callback gauge."""
+        metric = self._metrics[name] = Gauge(name, help, read, label_names)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+COMPUTED_VAR_SECONDS = REGISTRY.histogram(
+    "maritime_computed_var_seconds",
+    "Time spent computing a state's computed var.",
+    ("state", "var"),
+)
+EVENT_HANDLER_SECONDS = REGISTRY.histogram(
+    "maritime_event_handler_seconds",
+    "Time spent running a state's event handler.",
+    ("state", "handler"),
+)
+STATE_DELTA_BYTES = REGISTRY.histogram(
+    "maritime_state_delta_bytes",
+    "Serialized size of the state delta sent after an event.",
+    ("handler",),
+    BYTES_BUCKETS,
+)
+DB_SESSION_SECONDS = REGISTRY.histogram(
+    "maritime_db_session_seconds", "Lifetime of a database session."
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "maritime_db_query_seconds", "Database statement execution time.", ("statement",)
+)
+
+
+def _timed_var(fget: Callable, child: HistogramChild) -> Callable:
+    @functools.wraps(fget)
+    def timed(state):
+        started = time.perf_counter()
+        try:
+            return fget(state)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    return timed
+
+
+def _timed_handler(fn: Callable, child: HistogramChild) -> Callable:
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                async for update in fn(*args, **kwargs):
+                    yield update
+            finally:
+                child.observe(time.perf_counter() - started)
+
+    elif inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+    elif inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                yield from fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+    else:
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+    timed._metrics_timed = True
+    return timed
+
+
+def instrument_state(state_cls: type[rx.State]):
+    """Time every computed var and event handler of a state and its substates.
+
+    Each computed var's dependencies are resolved from the original getter
+    and pinned before it is wrapped, so dependency tracking is unchanged.
+    """
+    name = state_cls.get_name()
+    for var_name, var in state_cls.computed_vars.items():
+        if getattr(var._fget, "_metrics_timed", False):
+            continue
+        deps = var._deps(objclass=state_cls)
+        timed = _timed_var(var._fget, COMPUTED_VAR_SECONDS.labels(name, var_name))
+        timed._metrics_timed = True
+        # The class attribute is a copy of the registered var; patch both.
+        for target in (var, state_cls.__dict__.get(var_name)):
+            if isinstance(target, ComputedVar):
+                object.__setattr__(target, "_static_deps", deps)
+                object.__setattr__(target, "_auto_deps", False)
+                object.__setattr__(target, "_fget", timed)
+    for handler_name, handler in state_cls.event_handlers.items():
+        if getattr(handler.fn, "_metrics_timed", False):
+            continue
+        child = EVENT_HANDLER_SECONDS.labels(name, handler_name)
+        object.__setattr__(handler, "fn", _timed_handler(handler.fn, child))
+    for substate in state_cls.class_subclasses:
+        instrument_state(substate)
+
+
+def instrument_engine(engine: Engine):
+    """Record the execution time of every statement run on an engine.
+
+    The start time is kept on the execution context rather than the pooled
+    connection, so statements that raise (and never reach
+    ``after_cursor_execute``) leave nothing behind.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        started = context._query_started
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, verb)
+
+
+class MetricsMiddleware(Middleware):
+    """Records the serialized size of each state delta sent to a client."""
+
+    async def preprocess(self, app, state, event):
+        return None
+
+    async def postprocess(self, app, state, event, update):
+        if update.delta:
+            handler = event.name.rpartition(".")[2]
+            STATE_DELTA_BYTES.observe(len(format.json_dumps(update.delta)), handler)
+        return update
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def metrics_api() -> Starlette:
+    """An API app serving the registry; the Reflex backend is mounted under it."""
+    return Starlette(routes=[Route(METRICS_PATH, metrics_endpoint)])
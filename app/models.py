@@ -0,0 +1,130 @@
+from typing import TypedDict, Literal
+
+
+class Vessel(TypedDict):
+    """Data model for a single vessel."""
+
+    id: str
+    name: str
+    type: str
+    segment: str
+    mmsi: str
+    sizeband: str
+    lat: float
+    lng: float
+    status: str
+    origin_port: str
+    destination_port: str
+    voyage_duration_days: int
+    distance_travelled_nm: int
+    fuel_consumption_mt: int
+
+
+class Event(TypedDict):
+    """Data model for a vessel event."""
+
+    id: str
+    vessel_id: str
+    timestamp: str
+    event_type: Literal["Departure", "Arrival", "In Transit", "At Anchor"]
+    location: str
+    vessel_name: str
+
+
+class TrackPoint(TypedDict):
+    """One point of a drawn track."""
+
+    lat: float
+    lng: float
+
+
+class VesselTrack(TypedDict):
+    """A vessel's simplified recent track."""
+
+    id: str
+    points: list[TrackPoint]
+
+
+class TimelineVessel(TypedDict):
+    """A vessel's interpolated position and status at the timeline time."""
+
+    id: str
+    name: str
+    lat: float
+    lng: float
+    status: str
+
+
+class NearbyVessel(TypedDict):
+    """A vessel and its great-circle distance from a reference vessel."""
+
+    id: str
+    name: str
+    distance_nm: float
+
+
+class VesselCluster(TypedDict):
+    """A group of nearby vessels drawn as one map marker."""
+
+    id: str
+    lat: float
+    lng: float
+    count: int
+    south: float
+    west: float
+    north: float
+    east: float
+
+
+class EmissionsGroup(TypedDict):
+    """Fuel burnt and emissions (tonnes) of one port or route."""
+
+    label: str
+    fuel_mt: float
+    co2_t: float
+    sox_t: float
+    nox_t: float
+
+
+class MachineryEmissions(TypedDict):
+    """CO2 (tonnes) of one vessel type, split by machinery."""
+
+    label: str
+    propulsion: float
+    auxiliary: float
+    boiler: float
+
+
+class EmissionsReport(TypedDict):
+    """Emission totals and chart groupings for a selection of vessels."""
+
+    fuel_mt: float
+    co2_t: float
+    sox_t: float
+    nox_t: float
+    by_machinery: list[MachineryEmissions]
+    by_port: list[EmissionsGroup]
+    by_route: list[EmissionsGroup]
+
+
+class PackedVessels(TypedDict):
+    """Vessels drawn on the map canvas as base64-encoded little-endian arrays.
+
+    ``positions`` holds Float32 lat/lng pairs, ``headings`` Uint16 hundredths
+    of a degree (0xFFFF when unknown) and ``categories`` Uint8 indexes into
+    ``labels``, the vessel types.
+    """
+
+    count: int
+    positions: str
+    headings: str
+    categories: str
+    labels: list[str]
+
+
+class SearchMatch(TypedDict):
+    """A vessel found by the typeahead search."""
+
+    id: str
+    name: str
+    mmsi: str
@@ -0,0 +1,153 @@
+import datetime
+from typing import AsyncIterator, Iterator, Sequence
+from sqlalchemy import tuple_
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db_models import EventRecord, VesselRecord
+from app.models import Event, Vessel
+
+BATCH_SIZE = 5000
+IN_CLAUSE_LIMIT = 1000
+VESSEL_FIELDS = tuple(Vessel.__annotations__)
+
+
+def to_vessel(record: VesselRecord) -> Vessel:
+    return {field: getattr(record, field) for field in VESSEL_FIELDS}
+
+
+def to_event(record: EventRecord) -> Event:
+    return {
+        "id": record.id,
+        "vessel_id": record.vessel_id,
+        "timestamp": record.timestamp.isoformat(),
+        "event_type": record.event_type,
+        "location": record.location,
+        "vessel_name": record.vessel_name,
+    }
+
+
+def _chunks(keys: Sequence[str], size: int = IN_CLAUSE_LIMIT) -> Iterator[Sequence[str]]:
+    for start in range(0, len(keys), size):
+        yield keys[start : start + size]
+
+
+def vessels_page(
+    after: tuple[datetime.datetime, str] | None = None, limit: int = BATCH_SIZE
+):
+    """Vessels ordered by (updated_at, id), strictly after a keyset position."""
+    query = select(VesselRecord).order_by(
+        col(VesselRecord.updated_at), col(VesselRecord.id)
+    )
+    if after is not None:
+        query = query.where(
+            tuple_(col(VesselRecord.updated_at), col(VesselRecord.id)) > tuple_(*after)
+        )
+    return query.limit(limit)
+
+
+def events_page(after_seq: int = 0, limit: int = BATCH_SIZE):
+    """Events in insertion order with a sequence number above ``after_seq``."""
+    return (
+        select(EventRecord)
+        .where(col(EventRecord.seq) > after_seq)
+        .order_by(col(EventRecord.seq))
+        .limit(limit)
+    )
+
+
+def vessels_by_id(ids: Sequence[str]):
+    return select(VesselRecord).where(col(VesselRecord.id).in_(ids))
+
+
+def events_for_vessels(vessel_ids: Sequence[str]):
+    return (
+        select(EventRecord)
+        .where(col(EventRecord.vessel_id).in_(vessel_ids))
+        .order_by(col(EventRecord.seq))
+    )
+
+
+class FleetRepository:
+    """Batched reads of vessels and events over a sync session.
+
+    Full scans page by keyset rather than OFFSET, so every batch is an index
+    range scan; lookups by id are split into bounded IN lists.
+    """
+
+    def __init__(self, session: Session, batch_size: int = BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+
+    def iter_vessels(
+        self, after: tuple[datetime.datetime, str] | None = None
+    ) -> Iterator[list[VesselRecord]]:
+        while True:
+            batch = list(self.session.exec(vessels_page(after, self.batch_size)))
+            if not batch:
+                return
+            yield batch
+            after = (batch[-1].updated_at, batch[-1].id)
+
+    def iter_events(self, after_seq: int = 0) -> Iterator[list[EventRecord]]:
+        while True:
+            batch = list(self.session.exec(events_page(after_seq, self.batch_size)))
+            if not batch:
+                return
+            yield batch
+            after_seq = batch[-1].seq
+
+    def get_vessels(self, ids: Sequence[str]) -> list[Vessel]:
+        return [
+            to_vessel(record)
+            for chunk in _chunks(ids)
+            for record in self.session.exec(vessels_by_id(chunk))
+        ]
+
+    def get_events(self, vessel_ids: Sequence[str]) -> list[Event]:
+        return [
+            to_event(record)
+            for chunk in _chunks(vessel_ids)
+            for record in self.session.exec(events_for_vessels(chunk))
+        ]
+
+
+class AsyncFleetRepository:
+    """The async counterpart of ``FleetRepository`` for background handlers."""
+
+    def __init__(self, session: AsyncSession, batch_size: int = BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+
+    async def iter_vessels(
+        self, after: tuple[datetime.datetime, str] | None = None
+    ) -> AsyncIterator[list[VesselRecord]]:
+        while True:
+            result = await self.session.exec(vessels_page(after, self.batch_size))
+            batch = list(result)
+            if not batch:
+                return
+            yield batch
+            after = (batch[-1].updated_at, batch[-1].id)
+
+    async def iter_events(self, after_seq: int = 0) -> AsyncIterator[list[EventRecord]]:
+        while True:
+            result = await self.session.exec(events_page(after_seq, self.batch_size))
+            batch = list(result)
+            if not batch:
+                return
+            yield batch
+            after_seq = batch[-1].seq
+
+    async def get_vessels(self, ids: Sequence[str]) -> list[Vessel]:
+        vessels = []
+        for chunk in _chunks(ids):
+            result = await self.session.exec(vessels_by_id(chunk))
+            vessels.extend(to_vessel(record) for record in result)
+        return vessels
+
+    async def get_events(self, vessel_ids: Sequence[str]) -> list[Event]:
+        events = []
+        for chunk in _chunks(vessel_ids):
+            result = await self.session.exec(events_for_vessels(chunk))
+            events.extend(to_event(record) for record in result)
+        return events
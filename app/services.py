@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import time
+import numpy as np
+from app.fleet.checkpoint import Checkpoint, CheckpointWriter, load_checkpoint
+from app.fleet.events import EventLog
+from app.fleet.geo import track_distances_nm
+from app.fleet.geofence import Geofence
+from app.fleet.shared import SHARED_FLEET
+from app.fleet.snapshot import SnapshotReader, SnapshotWriter, acquire_writer
+from app.fleet.store import FleetStore
+from app.ingest.ais import AISMessage
+from app.ingest.pipeline import IngestPipeline, fleet_applier
+from app.ingest.sources import parse_source
+from app.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_REFRESH_S = 60.0
+SNAPSHOT_DIR = os.getenv("FLEET_SNAPSHOT_DIR", "")
+SNAPSHOT_INTERVAL_S = float(os.getenv("FLEET_SNAPSHOT_INTERVAL", "0.5"))
+SNAPSHOT_POLL_S = 0.25
+CHECKPOINT_DIR = os.getenv("FLEET_CHECKPOINT_DIR", "")
+CHECKPOINT_INTERVAL_S = float(os.getenv("FLEET_CHECKPOINT_INTERVAL", "300"))
+
+_warm_start: asyncio.Future | None = None
+_sync = None
+
+
+def owns_fleet() -> bool:
+    """Whether this worker loads and ingests the fleet itself.
+
+    Without FLEET_SNAPSHOT_DIR every worker does; with it, only the worker
+    holding the snapshot writer lock, and the others follow its snapshots.
+    """
+    return not SNAPSHOT_DIR or acquire_writer(SNAPSHOT_DIR)
+
+
+def warm_start() -> asyncio.Future:
+    """Restore SHARED_FLEET from the newest checkpoint, once per process.
+
+    Every task that writes the fleet awaits this first; the result is the
+    checkpoint restored, or None.
+    """
+    global _warm_start
+    if _warm_start is None:
+        _warm_start = asyncio.ensure_future(_restore_checkpoint())
+    return _warm_start
+
+
+async def _restore_checkpoint() -> Checkpoint | None:
+    if not CHECKPOINT_DIR or not owns_fleet():
+        return None
+    started = time.monotonic()
+    try:
+        checkpoint = await asyncio.to_thread(load_checkpoint, CHECKPOINT_DIR)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to restore a fleet checkpoint: {e}")
+        return None
+    if checkpoint is None:
+        return None
+    SHARED_FLEET.publish(checkpoint.store, checkpoint.events, checkpoint.tracks)
+    if checkpoint.timeline is not None:
+        SHARED_FLEET.restore_timeline(checkpoint.timeline)
+    logger.info(
+        f"Restored {len(checkpoint.store)} vessels and {len(checkpoint.events)} events "
+        f"from {checkpoint.file} in {time.monotonic() - started:.2f}s"
+    )
+    return checkpoint
+
+
+async def sync_fleet_from_database():
+    """Keep SHARED_FLEET in step with the database when FLEET_SYNC is set.
+
+    After a warm start only the changes since the checkpoint's watermarks
+    are read; otherwise everything is loaded into a new store.
+    """
+    global _sync
+    if os.getenv("FLEET_SYNC", "").lower() not in ("1", "true", "yes", "on"):
+        return
+    if not owns_fleet():
+        return
+    from app.sync import FleetSync
+
+    checkpoint = await warm_start()
+    if checkpoint is not None and checkpoint.watermarks.get("sync"):
+        sync = FleetSync(SHARED_FLEET.store, SHARED_FLEET.events)
+        sync.resume(checkpoint.watermarks["sync"])
+    else:
+        sync = FleetSync(FleetStore(), EventLog())
+    _sync = sync
+    REGISTRY.gauge(
+        "maritime_fleet_sync_lag_seconds",
+        "Age of the last completed database sync.",
+        lambda: sync.metrics()["lag_s"],
+    )
+    logger.info("Syncing the shared fleet from the database")
+    await sync.run(
+        float(os.getenv("FLEET_SYNC_INTERVAL", "2")),
+        on_change=lambda: SHARED_FLEET.publish(sync.store, sync.events),
+    )
+
+
+async def ingest_ais_positions():
+    """Apply AIS positions from the AIS_SOURCES specs to SHARED_FLEET."""
+    specs = os.getenv("AIS_SOURCES", "").split()
+    if not specs or not owns_fleet():
+        return
+    await warm_start()
+
+    geofence = Geofence()
+
+    def apply(messages: list[AISMessage]) -> int:
+        applied = fleet_applier(
+            SHARED_FLEET.store, SHARED_FLEET.tracks, geofence, SHARED_FLEET.events
+        )(messages)
+        if applied:
+            SHARED_FLEET.publish()
+        return applied
+
+    pipeline = IngestPipeline(apply)
+    REGISTRY.gauge(
+        "maritime_ingest_queue_depth",
+        "AIS line batches waiting to be decoded.",
+        pipeline.queue.qsize,
+    )
+    REGISTRY.gauge(
+        "maritime_ingest_lines",
+        "AIS ingest counters since start.",
+        lambda: {(name,): value for name, value in pipeline.counters().items()},
+        ("counter",),
+    )
+    logger.info(f"Ingesting AIS positions from {specs}")
+    refresher = asyncio.create_task(refresh_track_distances())
+    try:
+        await pipeline.run(parse_source(spec) for spec in specs)
+    finally:
+        refresher.cancel()
+
+
+async def refresh_track_distances(interval: float = DISTANCE_REFRESH_S):
+    """Periodically derive distance_travelled_nm from the retained tracks."""
+    while True:
+        await asyncio.sleep(interval)
+        ids, distances = track_distances_nm(SHARED_FLEET.tracks)
+        if ids:
+            SHARED_FLEET.store.update_batch(
+                "id", ids, {"distance_travelled_nm": np.rint(distances).astype(np.int64)}
+            )
+            SHARED_FLEET.publish()
+
+
+async def share_fleet_snapshots():
+    """Publish SHARED_FLEET to the other workers, or follow the one that does."""
+    if not SNAPSHOT_DIR:
+        return
+    if owns_fleet():
+        await warm_start()
+        await publish_snapshots(SnapshotWriter(SNAPSHOT_DIR))
+    else:
+        await follow_snapshots(SnapshotReader(SNAPSHOT_DIR))
+
+
+async def publish_snapshots(writer: SnapshotWriter, interval: float = SNAPSHOT_INTERVAL_S):
+    """Write a snapshot whenever the fleet version changed, at most every interval."""
+    written = None
+    REGISTRY.gauge(
+        "maritime_fleet_snapshot_generation",
+        "Generation of the newest fleet snapshot written or mapped.",
+        lambda: writer.generation,
+    )
+    while True:
+        if SHARED_FLEET.version != written:
+            written = SHARED_FLEET.version
+            header, arrays = writer.capture(SHARED_FLEET)
+            try:
+                await asyncio.to_thread(writer.write, header, arrays)
+            except OSError as e:
+                logger.exception(f"Failed to write fleet snapshot: {e}")
+        await asyncio.sleep(interval)
+
+
+async def follow_snapshots(reader: SnapshotReader, interval: float = SNAPSHOT_POLL_S):
+    """Swap in each new snapshot the writer publishes."""
+    snapshot = None
+    REGISTRY.gauge(
+        "maritime_fleet_snapshot_generation",
+        "Generation of the newest fleet snapshot written or mapped.",
+        lambda: snapshot.generation if snapshot else 0,
+    )
+    logger.info(f"Following fleet snapshots in {reader.directory}")
+    while True:
+        current = reader.current()
+        if current is not None and (snapshot is None or current[0] != snapshot.generation):
+            try:
+                snapshot = await asyncio.to_thread(reader.load, current[0], snapshot)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to map fleet snapshot {current[0]}: {e}")
+            else:
+                SHARED_FLEET.publish(
+                    snapshot.store, snapshot.events, snapshot.tracks, snapshot.version
+                )
+        await asyncio.sleep(interval)
+
+
+async def checkpoint_fleet(interval: float = CHECKPOINT_INTERVAL_S):
+    """Checkpoint SHARED_FLEET to FLEET_CHECKPOINT_DIR every interval while it changes."""
+    if not CHECKPOINT_DIR or not owns_fleet():
+        return
+    checkpoint = await warm_start()
+    writer = CheckpointWriter(CHECKPOINT_DIR)
+    written = SHARED_FLEET.version if checkpoint is not None else None
+    logger.info(f"Checkpointing the fleet to {writer.directory} every {interval:g}s")
+    while True:
+        await asyncio.sleep(interval)
+        if SHARED_FLEET.version == written or not len(SHARED_FLEET.store):
+            continue
+        written = SHARED_FLEET.version
+        watermarks = {}
+        if _sync is not None and _sync.store is SHARED_FLEET.store:
+            watermarks["sync"] = _sync.watermarks()
+        header, arrays = writer.capture(SHARED_FLEET, watermarks)
+        try:
+            path = await asyncio.to_thread(writer.write, header, arrays)
+        except OSError as e:
+            logger.exception(f"Failed to write fleet checkpoint: {e}")
+        else:
+            logger.info(f"Wrote fleet checkpoint {path.name}")
@@ -1,276 +1,802 @@
+import asyncio
+import datetime
+from typing import Callable, Hashable, TypeVar
 import reflex as rx
 import reflex_enterprise as rxe
-from typing import TypedDict, Literal
-from reflex_enterprise.components.map.types import LatLng, latlng
-import datetime
-
+import numpy as np
+from reflex_enterprise.components.map.types import LatLng, latlng, latlng_bounds
+from app.fleet.events import EventLog
+from app.fleet.geo import headings_deg
+from app.fleet.packing import pack_vessels
+from app.fleet.shared import SHARED_FLEET
+from app.fleet.spatial import WORLD_BOUNDS, Bounds, intersects, pad_bounds
+from app.fleet.store import FleetStore
+from app.fleet.timeline import Timeline
+from app.fleet.tracks import TrackStore
+from app.models import (
+    EmissionsGroup,
+    EmissionsReport,
+    Event,
+    MachineryEmissions,
+    NearbyVessel,
+    PackedVessels,
+    SearchMatch,
+    TimelineVessel,
+    Vessel,
+    VesselCluster,
+    VesselTrack,
+)
 
-class Vessel(TypedDict):
-    """Data model for a single vessel."""
+VIEWPORT_PADDING = 0.25
+EVENTS_PAGE_SIZE = 50
+VESSEL_PAGE_SIZE = 25
+VESSEL_SORT_KEYS = ("name", "type", "segment", "mmsi", "sizeband", "status")
+PLAYBACK_FPS = 4
+PLAYBACK_SPEEDS = (600, 3600, 6 * 3600, 24 * 3600)
+MAX_TIMELINE_MARKERS = 1000
+NEARBY_COUNT = 10
+SEARCH_LIMIT = 10
+# Float32 rounding of a drawn position, in degrees.
+PACKED_POSITION_TOLERANCE = 1e-4
 
-    id: str
-    name: str
-    type: str
-    segment: str
-    mmsi: str
-    sizeband: str
-    lat: float
-    lng: float
-    status: str
-    origin_port: str
-    destination_port: str
-    voyage_duration_days: int
-    distance_travelled_nm: int
-    fuel_consumption_mt: int
+T = TypeVar("T")
 
+SAMPLE_VESSELS: list[Vessel] = [
+    {
+        "id": "vessel_1",
+        "name": "Container Ship Alpha",
+        "type": "Container",
+        "segment": "Deep Sea",
+        "mmsi": "123456789",
+        "sizeband": "Large",
+        "lat": 51.5074,
+        "lng": -0.1278,
+        "status": "In Transit",
+        "origin_port": "Port of London",
+        "destination_port": "Port of New York",
+        "voyage_duration_days": 10,
+        "distance_travelled_nm": 3440,
+        "fuel_consumption_mt": 500,
+    },
+    {
+        "id": "vessel_2",
+        "name": "Tanker Beta",
+        "type": "Tanker",
+        "segment": "Coastal",
+        "mmsi": "987654321",
+        "sizeband": "Medium",
+        "lat": 48.8566,
+        "lng": 2.3522,
+        "status": "At Port",
+        "origin_port": "Port of Le Havre",
+        "destination_port": "Port of Rotterdam",
+        "voyage_duration_days": 1,
+        "distance_travelled_nm": 160,
+        "fuel_consumption_mt": 20,
+    },
+    {
+        "id": "vessel_3",
+        "name": "Bulk Carrier Gamma",
+        "type": "Bulk Carrier",
+        "segment": "Deep Sea",
+        "mmsi": "555666777",
+        "sizeband": "Large",
+        "lat": 40.7128,
+        "lng": -74.006,
+        "status": "In Transit",
+        "origin_port": "Port of New York",
+        "destination_port": "Port of Shanghai",
+        "voyage_duration_days": 25,
+        "distance_travelled_nm": 10500,
+        "fuel_consumption_mt": 1200,
+    },
+    {
+        "id": "vessel_4",
+        "name": "Ferry Delta",
+        "type": "Ferry",
+        "segment": "Coastal",
+        "mmsi": "111222333",
+        "sizeband": "Small",
+        "lat": 35.6762,
+        "lng": 139.6503,
+        "status": "At Port",
+        "origin_port": "Port of Tokyo",
+        "destination_port": "Port of Osaka",
+        "voyage_duration_days": 1,
+        "distance_travelled_nm": 300,
+        "fuel_consumption_mt": 50,
+    },
+    {
+        "id": "vessel_5",
+        "name": "Cargo Ship Echo",
+        "type": "Cargo",
+        "segment": "Deep Sea",
+        "mmsi": "444555666",
+        "sizeband": "Medium",
+        "lat": -33.8688,
+        "lng": 151.2093,
+        "status": "In Transit",
+        "origin_port": "Port of Sydney",
+        "destination_port": "Port of Singapore",
+        "voyage_duration_days": 15,
+        "distance_travelled_nm": 3900,
+        "fuel_consumption_mt": 800,
+    },
+]
 
-class Event(TypedDict):
-    """Data model for a vessel event."""
+SAMPLE_EVENTS: list[Event] = [
+    {
+        "id": "event_1",
+        "vessel_id": "vessel_1",
+        "timestamp": "2023-10-26T10:00:00Z",
+        "event_type": "Departure",
+        "location": "Port of London",
+        "vessel_name": "Container Ship Alpha",
+    },
+    {
+        "id": "event_2",
+        "vessel_id": "vessel_2",
+        "timestamp": "2023-10-27T12:00:00Z",
+        "event_type": "Arrival",
+        "location": "Port of Rotterdam",
+        "vessel_name": "Tanker Beta",
+    },
+    {
+        "id": "event_3",
+        "vessel_id": "vessel_3",
+        "timestamp": "2023-10-28T14:30:00Z",
+        "event_type": "In Transit",
+        "location": "Mid-Atlantic",
+        "vessel_name": "Bulk Carrier Gamma",
+    },
+    {
+        "id": "event_4",
+        "vessel_id": "vessel_4",
+        "timestamp": "2023-10-29T08:00:00Z",
+        "event_type": "At Anchor",
+        "location": "Tokyo Bay",
+        "vessel_name": "Ferry Delta",
+    },
+    {
+        "id": "event_5",
+        "vessel_id": "vessel_5",
+        "timestamp": "2023-10-30T18:00:00Z",
+        "event_type": "Departure",
+        "location": "Port of Sydney",
+        "vessel_name": "Cargo Ship Echo",
+    },
+    {
+        "id": "event_6",
+        "vessel_id": "vessel_1",
+        "timestamp": "2023-11-05T22:00:00Z",
+        "event_type": "Arrival",
+        "location": "Port of New York",
+        "vessel_name": "Container Ship Alpha",
+    },
+]
 
-    id: str
-    vessel_id: str
-    timestamp: str
-    event_type: Literal["Departure", "Arrival", "In Transit", "At Anchor"]
-    location: str
-    vessel_name: str
+SHARED_FLEET.publish(
+    FleetStore.from_records(SAMPLE_VESSELS), EventLog.from_events(SAMPLE_EVENTS)
+)
 
 
 class MaritimeState(rx.State):
-    """The state for the maritime tracking application."""
-
-    events: list[Event] = [
-        {
-            "id": "event_1",
-            "vessel_id": "vessel_1",
-            "timestamp": "2023-10-26T10:00:00Z",
-            "event_type": "Departure",
-            "location": "Port of London",
-            "vessel_name": "Container Ship Alpha",
-        },
-        {
-            "id": "event_2",
-            "vessel_id": "vessel_2",
-            "timestamp": "2023-10-27T12:00:00Z",
-            "event_type": "Arrival",
-            "location": "Port of Rotterdam",
-            "vessel_name": "Tanker Beta",
-        },
-        {
-            "id": "event_3",
-            "vessel_id": "vessel_3",
-            "timestamp": "2023-10-28T14:30:00Z",
-            "event_type": "In Transit",
-            "location": "Mid-Atlantic",
-            "vessel_name": "Bulk Carrier Gamma",
-        },
-        {
-            "id": "event_4",
-            "vessel_id": "vessel_4",
-            "timestamp": "2023-10-29T08:00:00Z",
-            "event_type": "At Anchor",
-            "location": "Tokyo Bay",
-            "vessel_name": "Ferry Delta",
-        },
-        {
-            "id": "event_5",
-            "vessel_id": "vessel_5",
-            "timestamp": "2023-10-30T18:00:00Z",
-            "event_type": "Departure",
-            "location": "Port of Sydney",
-            "vessel_name": "Cargo Ship Echo",
-        },
-        {
-            "id": "event_6",
-            "vessel_id": "vessel_1",
-            "timestamp": "2023-11-05T22:00:00Z",
-            "event_type": "Arrival",
-            "location": "Port of New York",
-            "vessel_name": "Container Ship Alpha",
-        },
-    ]
-    center: LatLng = latlng(lat=30.0, lng=0.0)
-    zoom: float = 2.5
+    """The state for the maritime tracking application.
+
+    Holds only this session's fleet version and filter selections, which
+    every view depends on; the fleet and events are read from the
+    process-wide SHARED_FLEET. The map view, the filter summaries and the
+    tables live in substates, so an event in one of them only loads,
+    recomputes and re-sends that substate's output.
+    """
+
+    fleet_version: int = 0
     selected_segment: str = ""
     selected_type: str = ""
     selected_mmsi: str = ""
     selected_sizeband: str = ""
     selected_origin_port: str = ""
     selected_destination_port: str = ""
-    vessels: list[Vessel] = [
-        {
-            "id": "vessel_1",
-            "name": "Container Ship Alpha",
-            "type": "Container",
-            "segment": "Deep Sea",
-            "mmsi": "123456789",
-            "sizeband": "Large",
-            "lat": 51.5074,
-            "lng": -0.1278,
-            "status": "In Transit",
-            "origin_port": "Port of London",
-            "destination_port": "Port of New York",
-            "voyage_duration_days": 10,
-            "distance_travelled_nm": 3440,
-            "fuel_consumption_mt": 500,
-        },
-        {
-            "id": "vessel_2",
-            "name": "Tanker Beta",
-            "type": "Tanker",
-            "segment": "Coastal",
-            "mmsi": "987654321",
-            "sizeband": "Medium",
-            "lat": 48.8566,
-            "lng": 2.3522,
-            "status": "At Port",
-            "origin_port": "Port of Le Havre",
-            "destination_port": "Port of Rotterdam",
-            "voyage_duration_days": 1,
-            "distance_travelled_nm": 160,
-            "fuel_consumption_mt": 20,
-        },
-        {
-            "id": "vessel_3",
-            "name": "Bulk Carrier Gamma",
-            "type": "Bulk Carrier",
-            "segment": "Deep Sea",
-            "mmsi": "555666777",
-            "sizeband": "Large",
-            "lat": 40.7128,
-            "lng": -74.006,
-            "status": "In Transit",
-            "origin_port": "Port of New York",
-            "destination_port": "Port of Shanghai",
-            "voyage_duration_days": 25,
-            "distance_travelled_nm": 10500,
-            "fuel_consumption_mt": 1200,
-        },
-        {
-            "id": "vessel_4",
-            "name": "Ferry Delta",
-            "type": "Ferry",
-            "segment": "Coastal",
-            "mmsi": "111222333",
-            "sizeband": "Small",
-            "lat": 35.6762,
-            "lng": 139.6503,
-            "status": "At Port",
-            "origin_port": "Port of Tokyo",
-            "destination_port": "Port of Osaka",
-            "voyage_duration_days": 1,
-            "distance_travelled_nm": 300,
-            "fuel_consumption_mt": 50,
-        },
-        {
-            "id": "vessel_5",
-            "name": "Cargo Ship Echo",
-            "type": "Cargo",
-            "segment": "Deep Sea",
-            "mmsi": "444555666",
-            "sizeband": "Medium",
-            "lat": -33.8688,
-            "lng": 151.2093,
-            "status": "In Transit",
-            "origin_port": "Port of Sydney",
-            "destination_port": "Port of Singapore",
-            "voyage_duration_days": 15,
-            "distance_travelled_nm": 3900,
-            "fuel_consumption_mt": 800,
-        },
-    ]
 
     @rx.event
-    def handle_zoom(self, event: dict):
-        self.zoom = round(event["target"]["zoom"], 4)
+    def refresh_fleet(self):
+        """Move to the latest shared fleet version, recomputing dependent vars."""
+        if self.fleet_version != SHARED_FLEET.version:
+            self.fleet_version = SHARED_FLEET.version
 
     @rx.event
-    def reset_filters(self):
+    async def reset_filters(self):
         self.selected_segment = ""
         self.selected_type = ""
         self.selected_mmsi = ""
         self.selected_sizeband = ""
         self.selected_origin_port = ""
         self.selected_destination_port = ""
+        await self._filters_changed()
+        filters = await self.get_state(FilterState)
+        filters.search_query = ""
 
-    @rx.var
-    def filtered_vessels(self) -> list[Vessel]:
-        """Get the vessels that match the current filters."""
-        return [
-            vessel
-            for vessel in self.vessels
-            if (not self.selected_segment or vessel["segment"] == self.selected_segment)
-            and (not self.selected_type or vessel["type"] == self.selected_type)
-            and (not self.selected_mmsi or vessel["mmsi"] == self.selected_mmsi)
-            and (
-                not self.selected_sizeband
-                or vessel["sizeband"] == self.selected_sizeband
-            )
-            and (
-                not self.selected_origin_port
-                or vessel["origin_port"] == self.selected_origin_port
+    # Filters are set through these rather than generated setters, so a
+    # changed selection never keeps paging through the previous one.
+    @rx.event
+    async def set_selected_segment(self, value: str):
+        self.selected_segment = value
+        await self._filters_changed()
+
+    @rx.event
+    async def set_selected_type(self, value: str):
+        self.selected_type = value
+        await self._filters_changed()
+
+    @rx.event
+    async def set_selected_mmsi(self, value: str):
+        self.selected_mmsi = value
+        await self._filters_changed()
+
+    @rx.event
+    async def set_selected_sizeband(self, value: str):
+        self.selected_sizeband = value
+        await self._filters_changed()
+
+    @rx.event
+    async def set_selected_origin_port(self, value: str):
+        self.selected_origin_port = value
+        await self._filters_changed()
+
+    @rx.event
+    async def set_selected_destination_port(self, value: str):
+        self.selected_destination_port = value
+        await self._filters_changed()
+
+    async def _filters_changed(self):
+        """Go back to the first vessel page and the latest events of the new selection."""
+        data = await self.get_state(DataState)
+        data.events_cursor = ""
+        data.vessel_offset = 0
+
+    def _store(self) -> FleetStore:
+        # Computed vars reach the shared data through here; reading
+        # fleet_version makes them recompute when a new version is seen.
+        _ = self.fleet_version
+        return SHARED_FLEET.store
+
+    def _event_log(self) -> EventLog:
+        _ = self.fleet_version
+        return SHARED_FLEET.events
+
+    def _track_store(self) -> TrackStore:
+        _ = self.fleet_version
+        return SHARED_FLEET.tracks
+
+    def _timeline(self) -> Timeline | None:
+        _ = self.fleet_version
+        return SHARED_FLEET.timeline()
+
+    def _time_range(self) -> tuple[float, float]:
+        _ = self.fleet_version
+        return SHARED_FLEET.time_range()
+
+    def _cached(self, name: str, compute: Callable[[], T], *args: Hashable) -> T:
+        """A result shared by every session with the same filters and ``args``."""
+        _ = self.fleet_version
+        return SHARED_FLEET.cached(name, (*self._filters().values(), *args), compute)
+
+    def _filters(self) -> dict[str, str]:
+        return {
+            "segment": self.selected_segment,
+            "type": self.selected_type,
+            "mmsi": self.selected_mmsi,
+            "sizeband": self.selected_sizeband,
+            "origin_port": self.selected_origin_port,
+            "destination_port": self.selected_destination_port,
+        }
+
+    def _selection(self) -> np.ndarray:
+        """Rows of the fleet store matching the current filters."""
+        return self._cached("selection", lambda: self._store().select(self._filters()))
+
+
+# Computed vars declare their dependencies instead of relying on bytecode
+# tracking through the helpers above.
+FLEET_DEPS = [MaritimeState.fleet_version]
+FILTER_DEPS = FLEET_DEPS + [
+    MaritimeState.selected_segment,
+    MaritimeState.selected_type,
+    MaritimeState.selected_mmsi,
+    MaritimeState.selected_sizeband,
+    MaritimeState.selected_origin_port,
+    MaritimeState.selected_destination_port,
+]
+
+
+class MapViewState(MaritimeState):
+    """The map viewport, track display and timeline playback."""
+
+    center: LatLng = latlng(lat=30.0, lng=0.0)
+    zoom: float = 2.5
+    cluster_zoom: int = 2
+    map_bounds: Bounds = WORLD_BOUNDS
+    show_tracks: bool = False
+    timeline_time: float = 0.0
+    timeline_playing: bool = False
+    timeline_speed: int = 3600
+    popup_vessel_id: str = ""
+
+    @rx.event
+    def handle_zoom(self, event: dict):
+        self.zoom = round(event["target"]["zoom"], 4)
+        self.cluster_zoom = int(self.zoom)
+
+    @rx.event
+    def handle_move_end(self, event: dict) -> rx.event.EventSpec:
+        map_api = rxe.map.api("maritime_map")
+        return map_api.get_bounds(callback=MapViewState.set_map_bounds)
+
+    @rx.event
+    def set_map_bounds(self, bounds: dict):
+        south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+        self.map_bounds = {
+            "south": south_west["lat"],
+            "west": south_west["lng"],
+            "north": north_east["lat"],
+            "east": north_east["lng"],
+        }
+
+    @rx.event
+    def toggle_tracks(self):
+        self.show_tracks = not self.show_tracks
+
+    @rx.event
+    async def scrub_timeline(self, value: float):
+        await SHARED_FLEET.wait_timeline()
+        self.timeline_time = float(value)
+        self.timeline_playing = False
+
+    @rx.event
+    def go_live(self):
+        self.timeline_time = 0.0
+        self.timeline_playing = False
+
+    @rx.event
+    def set_timeline_speed(self, value: str):
+        if int(value) in PLAYBACK_SPEEDS:
+            self.timeline_speed = int(value)
+
+    @rx.event
+    async def toggle_playback(self):
+        if self.timeline_playing:
+            self.timeline_playing = False
+            return
+        await SHARED_FLEET.wait_timeline()
+        start, end = self._time_range()
+        if not self.timeline_time or self.timeline_time >= end:
+            self.timeline_time = start
+        self.timeline_playing = True
+        return MapViewState.play_timeline
+
+    @rx.event(background=True)
+    async def play_timeline(self):
+        """Advance the timeline by timeline_speed per second, PLAYBACK_FPS times a second."""
+        while True:
+            async with self:
+                if not self.timeline_playing:
+                    return
+                _, end = self._time_range()
+                self.timeline_time = min(
+                    self.timeline_time + self.timeline_speed / PLAYBACK_FPS, end
+                )
+                if self.timeline_time >= end:
+                    self.timeline_playing = False
+                    return
+            await asyncio.sleep(1 / PLAYBACK_FPS)
+
+    @rx.event
+    def fly_to_vessel(self, vessel: Vessel) -> rx.event.EventSpec:
+        map_api = rxe.map.api("maritime_map")
+        return map_api.fly_to(latlng(lat=vessel["lat"], lng=vessel["lng"]), 10.0)
+
+    @rx.event
+    def fly_to_cluster(self, cluster: VesselCluster) -> rx.event.EventSpec:
+        map_api = rxe.map.api("maritime_map")
+        return map_api.fly_to_bounds(
+            latlng_bounds(
+                cluster["south"], cluster["west"], cluster["north"], cluster["east"]
             )
-            and (
-                not self.selected_destination_port
-                or vessel["destination_port"] == self.selected_destination_port
+        )
+
+    @rx.event
+    def open_vessel_popup(self, index: int, lat: float, lng: float):
+        """Open the popup of a vessel clicked on the canvas layer.
+
+        ``index`` is the vessel's position in the vessel_layer the client
+        drew; if the layer changed since, the drawn vessel nearest the click
+        is taken instead.
+        """
+        store = self._store()
+        _, rows = self._map_layers()
+        if not len(rows):
+            return
+        if 0 <= index < len(rows) and (
+            abs(store.column("lat")[rows[index]] - lat) < PACKED_POSITION_TOLERANCE
+            and abs(store.column("lng")[rows[index]] - lng) < PACKED_POSITION_TOLERANCE
+        ):
+            row = rows[index]
+        else:
+            row = store.nearest(lat, lng, 1, rows)[0][0]
+        self.popup_vessel_id = store.values("id", np.array([row]))[0]
+
+    @rx.event
+    def close_vessel_popup(self):
+        self.popup_vessel_id = ""
+
+    def _map_layers(self) -> tuple[list[VesselCluster], np.ndarray]:
+        """Clusters and individually drawn rows for the padded viewport."""
+        if self.timeline_time:
+            return [], np.empty(0, dtype=np.int64)
+        bounds = pad_bounds(self.map_bounds, VIEWPORT_PADDING)
+        selection = self._selection()
+        in_view = np.intersect1d(
+            selection, self._store().within(bounds), assume_unique=True
+        )
+        if self.cluster_zoom > self._store().cluster_index.max_zoom:
+            return [], in_view
+        clusters, singles = self._store().clusters(self.cluster_zoom, selection, bounds)
+        return clusters, np.intersect1d(singles, in_view, assume_unique=True)
+
+    @rx.var(
+        auto_deps=False,
+        deps=FILTER_DEPS + ["map_bounds", "cluster_zoom", "timeline_time"],
+    )
+    def vessel_layer(self) -> PackedVessels:
+        """Filtered vessels in the padded viewport, packed for the canvas layer."""
+        _, rows = self._map_layers()
+        store = self._store()
+        return pack_vessels(
+            store.column("lat")[rows],
+            store.column("lng")[rows],
+            headings_deg(self._track_store(), store.values("id", rows)),
+            store.column("type")[rows],
+            list(store.dictionaries["type"].values),
+        )
+
+    @rx.var(auto_deps=False, deps=FLEET_DEPS + ["popup_vessel_id"])
+    def popup_vessels(self) -> list[Vessel]:
+        """The vessel whose popup is open, if it is still in the fleet."""
+        store = self._store()
+        if self.popup_vessel_id not in store:
+            return []
+        return store.records(np.array([store.row_of(self.popup_vessel_id)]))
+
+    @rx.var(
+        auto_deps=False,
+        deps=FILTER_DEPS + ["map_bounds", "cluster_zoom", "timeline_time", "show_tracks"],
+    )
+    def visible_tracks(self) -> list[VesselTrack]:
+        """Simplified tracks of the individually drawn vessels, when shown."""
+        if not self.show_tracks:
+            return []
+        _, rows = self._map_layers()
+        tracks = self._track_store()
+        visible = []
+        for vessel_id in self._store().values("id", rows):
+            points = tracks.simplified(vessel_id, self.cluster_zoom)
+            if len(points) > 1:
+                visible.append({"id": vessel_id, "points": points})
+        return visible
+
+    @rx.var(
+        auto_deps=False,
+        deps=FILTER_DEPS + ["map_bounds", "cluster_zoom", "timeline_time"],
+    )
+    def vessel_clusters(self) -> list[VesselCluster]:
+        """Marker clusters of filtered vessels in the padded viewport."""
+        clusters, _ = self._map_layers()
+        return clusters
+
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
+    def timeline_start(self) -> int:
+        return int(self._time_range()[0])
+
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
+    def timeline_end(self) -> int:
+        return int(self._time_range()[1])
+
+    @rx.var(auto_deps=False, deps=["timeline_time"])
+    def timeline_label(self) -> str:
+        if not self.timeline_time:
+            return "Live"
+        moment = datetime.datetime.fromtimestamp(self.timeline_time, datetime.timezone.utc)
+        return moment.strftime("%Y-%m-%d %H:%M UTC")
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS + ["map_bounds", "timeline_time"])
+    def timeline_frame(self) -> list[TimelineVessel]:
+        """Filtered vessels in the padded viewport at the timeline time.
+
+        Vessels without any track are shown where they are now; tracked ones
+        are hidden until their first fix.
+        """
+        timeline = self._timeline() if self.timeline_time else None
+        if timeline is None:
+            return []
+        store = self._store()
+        rows = self._selection()
+        codes = store.column("id")[rows]
+        lat, lng, seen = timeline.positions(self.timeline_time, codes)
+        untracked = ~timeline.tracked(codes)
+        lat = np.where(untracked, store.column("lat")[rows], lat)
+        lng = np.where(untracked, store.column("lng")[rows], lng)
+        bounds = pad_bounds(self.map_bounds, VIEWPORT_PADDING)
+        shown = np.flatnonzero((seen | untracked) & intersects(bounds, lat, lng, lat, lng))
+        shown = shown[:MAX_TIMELINE_MARKERS]
+        status_codes, has_status = timeline.status(self.timeline_time, codes[shown])
+        current = store.values("status", rows[shown])
+        statuses = [
+            timeline.statuses[code] if known else now
+            for code, known, now in zip(status_codes.tolist(), has_status.tolist(), current)
+        ]
+        return [
+            {"id": vessel_id, "name": name, "lat": fix_lat, "lng": fix_lng, "status": status}
+            for vessel_id, name, fix_lat, fix_lng, status in zip(
+                store.values("id", rows[shown]),
+                store.values("name", rows[shown]),
+                lat[shown].tolist(),
+                lng[shown].tolist(),
+                statuses,
             )
         ]
 
-    @rx.var
+
+class FilterState(MaritimeState):
+    """Filter options and the summaries derived from the filtered fleet."""
+
+    search_query: str = ""
+
+    @rx.event
+    def set_search_query(self, value: str):
+        self.search_query = value
+
+    @rx.event
+    async def pick_search_match(self, match: SearchMatch):
+        """Filter on the MMSI of a vessel picked from the search results."""
+        self.search_query = ""
+        await self.set_selected_mmsi(match["mmsi"])
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def filtered_vessel_count(self) -> int:
+        """Total number of vessels matching the current filters."""
+        return len(self._selection())
+
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
     def unique_segments(self) -> list[str]:
-        return sorted(list(set((v["segment"] for v in self.vessels))))
+        return self._store().facets.values("segment")
 
-    @rx.var
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
     def unique_vessel_types(self) -> list[str]:
-        return sorted(list(set((v["type"] for v in self.vessels))))
+        return self._store().facets.values("type")
 
-    @rx.var
-    def unique_mmsi(self) -> list[str]:
-        return sorted(list(set((v["mmsi"] for v in self.vessels))))
+    @rx.var(auto_deps=False, deps=FLEET_DEPS + ["search_query"])
+    def search_matches(self) -> list[SearchMatch]:
+        """The vessels whose MMSI starts with, or name resembles, the search query."""
+        _ = self.fleet_version
+        if not self.search_query.strip():
+            return []
+        return SHARED_FLEET.search_index().search(self.search_query, SEARCH_LIMIT)
 
-    @rx.var
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
     def unique_sizebands(self) -> list[str]:
-        return sorted(list(set((v["sizeband"] for v in self.vessels))))
+        return self._store().facets.values("sizeband")
 
-    @rx.var
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
     def unique_origin_ports(self) -> list[str]:
-        return sorted(list(set((v["origin_port"] for v in self.vessels))))
+        return self._store().facets.values("origin_port")
 
-    @rx.var
+    @rx.var(auto_deps=False, deps=FLEET_DEPS)
     def unique_destination_ports(self) -> list[str]:
-        return sorted(list(set((v["destination_port"] for v in self.vessels))))
+        return self._store().facets.values("destination_port")
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def facet_counts(self) -> dict[str, dict[str, int]]:
+        """Vessels each filter option would match, given the other filters."""
+        filters = self._filters()
+        return self._cached(
+            "facet_counts",
+            lambda: {
+                field: self._store().cross_counts(field, filters)
+                for field in (
+                    "segment",
+                    "type",
+                    "sizeband",
+                    "origin_port",
+                    "destination_port",
+                )
+            },
+        )
 
-    @rx.var
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
     def voyage_stats(self) -> dict[str, int | float]:
-        """Calculate statistics for the filtered vessels."""
-        if not self.filtered_vessels:
+        """Statistics for the filtered vessels, shared by sessions with the same filters."""
+        return self._cached("voyage_stats", self._voyage_stats)
+
+    def _voyage_stats(self) -> dict[str, int | float]:
+        """Calculate statistics for the filtered vessels from the aggregate cube."""
+        totals = self._store().aggregate(self._filters())
+        total_voyages = totals["count"]
+        if not total_voyages:
             return {
                 "total_voyages": 0,
                 "avg_duration_days": 0,
                 "total_distance_nm": 0,
                 "total_fuel_mt": 0,
             }
-        total_voyages = len(self.filtered_vessels)
-        total_duration = sum((v["voyage_duration_days"] for v in self.filtered_vessels))
-        avg_duration = round(total_duration / total_voyages, 1)
-        total_distance = sum(
-            (v["distance_travelled_nm"] for v in self.filtered_vessels)
-        )
-        total_fuel = sum((v["fuel_consumption_mt"] for v in self.filtered_vessels))
+        avg_duration = round(totals["voyage_duration_days"] / total_voyages, 1)
         return {
             "total_voyages": total_voyages,
             "avg_duration_days": avg_duration,
-            "total_distance_nm": total_distance,
-            "total_fuel_mt": total_fuel,
+            "total_distance_nm": totals["distance_travelled_nm"],
+            "total_fuel_mt": totals["fuel_consumption_mt"],
         }
 
-    @rx.var
+    def _emissions(self) -> EmissionsReport:
+        return self._cached("emissions", lambda: self._store().emissions(self._filters()))
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def emissions_totals(self) -> dict[str, float]:
+        """Fuel burnt and CO2/SOx/NOx (tonnes) of the filtered vessels."""
+        report = self._emissions()
+        return {key: report[key] for key in ("fuel_mt", "co2_t", "sox_t", "nox_t")}
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def emissions_by_machinery(self) -> list[MachineryEmissions]:
+        return self._emissions()["by_machinery"]
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def emissions_by_port(self) -> list[EmissionsGroup]:
+        return self._emissions()["by_port"]
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def emissions_by_route(self) -> list[EmissionsGroup]:
+        return self._emissions()["by_route"]
+
+
+class DataState(MaritimeState):
+    """The paged vessel and event tables and the nearest-vessels card."""
+
+    events_cursor: str = ""
+    vessel_offset: int = 0
+    vessel_limit: int = VESSEL_PAGE_SIZE
+    vessel_sort_key: str = "name"
+    vessel_sort_desc: bool = False
+    nearby_vessel_id: str = ""
+
+    @rx.event
+    def show_nearby(self, vessel: Vessel):
+        self.nearby_vessel_id = vessel["id"]
+
+    @rx.event
+    def clear_nearby(self):
+        self.nearby_vessel_id = ""
+
+    @rx.event
+    def sort_vessels(self, key: str):
+        if key not in VESSEL_SORT_KEYS:
+            return
+        if key == self.vessel_sort_key:
+            self.vessel_sort_desc = not self.vessel_sort_desc
+        else:
+            self.vessel_sort_key = key
+            self.vessel_sort_desc = False
+        self.vessel_offset = 0
+
+    @rx.event
+    def next_vessel_page(self):
+        start = self._vessel_window_start()
+        if start + self.vessel_limit < len(self._selection()):
+            self.vessel_offset = start + self.vessel_limit
+
+    @rx.event
+    def prev_vessel_page(self):
+        self.vessel_offset = max(self._vessel_window_start() - self.vessel_limit, 0)
+
+    @rx.event
+    def show_older_events(self):
+        self.events_cursor = self.recent_events_next_cursor
+
+    @rx.event
+    def show_latest_events(self):
+        self.events_cursor = ""
+
+    def _vessel_window_start(self) -> int:
+        """The page offset, back to the first page if the fleet shrank under it."""
+        return self.vessel_offset if self.vessel_offset < len(self._selection()) else 0
+
+    @rx.var(
+        auto_deps=False,
+        deps=FILTER_DEPS
+        + ["vessel_offset", "vessel_limit", "vessel_sort_key", "vessel_sort_desc"],
+    )
+    def vessel_page(self) -> list[Vessel]:
+        """The sorted window of filtered vessels shown in the vessel table."""
+        start = self._vessel_window_start()
+
+        def page() -> list[Vessel]:
+            rows = self._store().sorted_rows(
+                self._selection(), self.vessel_sort_key, self.vessel_sort_desc
+            )
+            return self._store().records(rows[start : start + self.vessel_limit])
+
+        return self._cached(
+            "vessel_page",
+            page,
+            self.vessel_sort_key,
+            self.vessel_sort_desc,
+            start,
+            self.vessel_limit,
+        )
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS + ["vessel_offset", "vessel_limit"])
+    def vessel_window_label(self) -> str:
+        total = len(self._selection())
+        if not total:
+            return "No vessels"
+        start = self._vessel_window_start()
+        return f"{start + 1}-{min(start + self.vessel_limit, total)} of {total}"
+
+    @rx.var(auto_deps=False, deps=FLEET_DEPS + ["nearby_vessel_id"])
+    def nearby_vessel_name(self) -> str:
+        store = self._store()
+        if self.nearby_vessel_id not in store:
+            return ""
+        return store.values("name", np.array([store.row_of(self.nearby_vessel_id)]))[0]
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS + ["nearby_vessel_id"])
+    def nearby_vessels(self) -> list[NearbyVessel]:
+        """The filtered vessels nearest the one picked on the map."""
+        store = self._store()
+        if self.nearby_vessel_id not in store:
+            return []
+        row = store.row_of(self.nearby_vessel_id)
+        lat, lng = store.column("lat")[row], store.column("lng")[row]
+        rows, distances = store.nearest(
+            lat, lng, NEARBY_COUNT, self._selection(), exclude=row
+        )
+        return [
+            {"id": vessel_id, "name": name, "distance_nm": round(distance, 1)}
+            for vessel_id, name, distance in zip(
+                store.values("id", rows), store.values("name", rows), distances.tolist()
+            )
+        ]
+
+    def _selected_vessel_ids(self) -> set[str] | None:
+        """Ids of the filtered vessels, or None when no filter is active."""
+        if not any(self._filters().values()):
+            return None
+        return set(self._store().values("id", self._selection()))
+
+    def _recent_events_page(self) -> tuple[list[Event], str]:
+        return self._cached(
+            "recent_events",
+            lambda: self._event_log().recent(
+                self._selected_vessel_ids(), EVENTS_PAGE_SIZE, self.events_cursor
+            ),
+            self.events_cursor,
+        )
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS + ["events_cursor"])
     def recent_events(self) -> list[Event]:
         """Get the most recent events for the filtered vessels."""
-        filtered_vessel_ids = {v["id"] for v in self.filtered_vessels}
-        filtered = [e for e in self.events if e["vessel_id"] in filtered_vessel_ids]
-        return sorted(filtered, key=lambda e: e["timestamp"], reverse=True)
+        events, _ = self._recent_events_page()
+        return events
 
-    @rx.event
-    def fly_to_vessel(self, vessel: Vessel) -> rx.event.EventSpec:
-        map_api = rxe.map.api("maritime_map")
-        return map_api.fly_to(latlng(lat=vessel["lat"], lng=vessel["lng"]), 10.0)
\ No newline at end of file
+    @rx.var(auto_deps=False, deps=FILTER_DEPS)
+    def recent_events_total(self) -> int:
+        """Number of events for the filtered vessels across all pages."""
+        return self._cached(
+            "recent_events_total",
+            lambda: self._event_log().count(self._selected_vessel_ids()),
+        )
+
+    @rx.var(auto_deps=False, deps=FILTER_DEPS + ["events_cursor"])
+    def recent_events_next_cursor(self) -> str:
+        """Cursor of the page after recent_events, empty if it is the last."""
+        _, cursor = self._recent_events_page()
+        return cursor
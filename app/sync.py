@@ -0,0 +1,203 @@
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+from sqlmodel import Session, col, select
+from app.db import get_session
+from app.db_models import EventRecord, VesselRecord
+from app.fleet.events import EventLog
+from app.fleet.store import FleetStore, VESSEL_FIELDS
+from app.repository import BATCH_SIZE, FleetRepository, to_event, to_vessel
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0
+WATERMARK_OVERLAP = datetime.timedelta(seconds=5)
+UPDATE_FIELDS = tuple(field for field in VESSEL_FIELDS if field != "id")
+
+
+@dataclass
+class SyncStats:
+    """Counters and rates of a fleet sync."""
+
+    vessels_added: int = 0
+    vessels_updated: int = 0
+    events_added: int = 0
+    polls: int = 0
+    errors: int = 0
+    last_rows: int = 0
+    last_duration_s: float = 0.0
+    rows_per_second: float = 0.0
+    last_synced_at: float = 0.0
+
+
+class FleetSync:
+    """Keeps an in-memory fleet and event log in step with the database.
+
+    ``load`` streams every vessel and event once through a server-side cursor
+    (psycopg2 named cursor on Postgres, chunked fetches elsewhere). ``poll``
+    then reads only rows past the watermarks: vessels by ``(updated_at, id)``
+    and events by ``seq``, so steady-state load follows the change rate rather
+    than the fleet size. While the vessel watermark is younger than
+    ``overlap`` the poll re-reads that recent window, to catch rows committed
+    late with an older ``updated_at``; re-applying a vessel is idempotent.
+    """
+
+    def __init__(
+        self,
+        store: FleetStore,
+        events: EventLog,
+        batch_size: int = BATCH_SIZE,
+        overlap: datetime.timedelta = WATERMARK_OVERLAP,
+    ):
+        self.store = store
+        self.events = events
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.vessel_watermark: tuple[datetime.datetime, str] | None = None
+        self.event_watermark = 0
+        self.stats = SyncStats()
+
+    def _apply_vessels(self, records: list[VesselRecord]) -> int:
+        if not records:
+            return 0
+        latest = {record.id: record for record in records}
+        last = (records[-1].updated_at, records[-1].id)
+        if self.vessel_watermark is None or last > self.vessel_watermark:
+            self.vessel_watermark = last
+        added = [to_vessel(r) for r in latest.values() if r.id not in self.store]
+        changed = [r for r in latest.values() if r.id in self.store]
+        if added:
+            self.store.append(added)
+            self.stats.vessels_added += len(added)
+        if changed:
+            self.store.update_batch(
+                "id",
+                [record.id for record in changed],
+                {
+                    field: [getattr(record, field) for record in changed]
+                    for field in UPDATE_FIELDS
+                },
+            )
+            self.stats.vessels_updated += len(changed)
+        return len(records)
+
+    def _apply_events(self, records: list[EventRecord]) -> int:
+        if not records:
+            return 0
+        self.event_watermark = records[-1].seq
+        self.events.extend(to_event(record) for record in records)
+        self.stats.events_added += len(records)
+        return len(records)
+
+    def _record(self, rows: int, started: float):
+        duration = time.monotonic() - started
+        self.stats.last_rows = rows
+        self.stats.last_duration_s = duration
+        self.stats.rows_per_second = rows / duration if duration else 0.0
+        self.stats.last_synced_at = time.time()
+
+    def _stream(self, session: Session, query) -> Iterable[list]:
+        result = session.exec(query.execution_options(yield_per=self.batch_size))
+        for partition in result.partitions():
+            yield list(partition)
+
+    def load(self):
+        """Bulk load every vessel and event, streaming in batches."""
+        started = time.monotonic()
+        rows = 0
+        with get_session() as session:
+            vessels = select(VesselRecord).order_by(
+                col(VesselRecord.updated_at), col(VesselRecord.id)
+            )
+            for batch in self._stream(session, vessels):
+                rows += self._apply_vessels(batch)
+            events = select(EventRecord).order_by(col(EventRecord.seq))
+            for batch in self._stream(session, events):
+                rows += self._apply_events(batch)
+        self._record(rows, started)
+        logger.info(f"Fleet sync loaded {rows} rows in {self.stats.last_duration_s:.2f}s")
+
+    def fetch(self) -> tuple[list[VesselRecord], list[EventRecord]]:
+        """Read the vessels and events changed since the watermarks."""
+        after = self.vessel_watermark
+        settled = datetime.datetime.now(datetime.timezone.utc) - self.overlap
+        if after is not None and after[0] > settled:
+            after = (settled, "")
+        with get_session() as session:
+            repository = FleetRepository(session, self.batch_size)
+            vessels = [r for batch in repository.iter_vessels(after) for r in batch]
+            events = [r for batch in repository.iter_events(self.event_watermark) for r in batch]
+            session.expunge_all()
+        return vessels, events
+
+    def apply(self, vessels: list[VesselRecord], events: list[EventRecord]) -> int:
+        return self._apply_vessels(vessels) + self._apply_events(events)
+
+    def poll(self) -> int:
+        """Fetch and apply one round of changes; returns the rows applied."""
+        started = time.monotonic()
+        rows = self.apply(*self.fetch())
+        self.stats.polls += 1
+        self._record(rows, started)
+        return rows
+
+    def watermarks(self) -> dict:
+        """The watermarks as JSON values, for ``resume`` in a later process."""
+        vessel = self.vessel_watermark
+        return {
+            "vessels": [vessel[0].isoformat(), vessel[1]] if vessel else None,
+            "events": self.event_watermark,
+        }
+
+    def resume(self, watermarks: dict):
+        """Continue from saved watermarks; ``run`` then polls instead of loading."""
+        vessel = watermarks.get("vessels")
+        if vessel:
+            self.vessel_watermark = (datetime.datetime.fromisoformat(vessel[0]), vessel[1])
+        self.event_watermark = watermarks.get("events", 0)
+
+    async def _poll(self, on_change: Callable[[], None] | None):
+        started = time.monotonic()
+        try:
+            vessels, events = await asyncio.to_thread(self.fetch)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.exception(f"Fleet sync poll failed: {e}")
+            return
+        rows = self.apply(vessels, events)
+        self.stats.polls += 1
+        self._record(rows, started)
+        if rows and on_change:
+            on_change()
+
+    async def run(
+        self,
+        interval: float = POLL_INTERVAL,
+        on_change: Callable[[], None] | None = None,
+    ):
+        """Load (or catch up from resumed watermarks), then poll forever.
+
+        Database reads run off the event loop. ``on_change`` is called on the
+        loop after the load and after every poll that applied rows.
+        """
+        if self.vessel_watermark is None and not self.event_watermark:
+            await asyncio.to_thread(self.load)
+            if on_change:
+                on_change()
+        else:
+            await self._poll(on_change)
+            logger.info(f"Fleet sync caught up {self.stats.last_rows} rows since the checkpoint")
+        while True:
+            await asyncio.sleep(interval)
+            await self._poll(on_change)
+
+    def metrics(self) -> dict[str, float]:
+        """Current counters plus ``lag_s``, the age of the last completed sync."""
+        metrics = asdict(self.stats)
+        last = self.stats.last_synced_at
+        metrics["lag_s"] = time.time() - last if last else float("inf")
+        metrics["event_watermark"] = self.event_watermark
+        return metrics
@@ -0,0 +1,22 @@
+import pytest
+from app.fleet.events import EventLog
+from app.fleet.shared import SharedFleet
+from app.fleet.store import FleetStore
+from app.fleet.synthetic import SYNTHETIC_EPOCH, generate_events, generate_vessels
+
+
+@pytest.fixture
+def fleet() -> SharedFleet:
+    """A small synthetic fleet with events and a few fixes per tracked vessel."""
+    vessels = generate_vessels(300, seed=7)
+    fleet = SharedFleet(
+        FleetStore.from_records(vessels), EventLog.from_events(generate_events(vessels, 7))
+    )
+    start = SYNTHETIC_EPOCH.timestamp()
+    for i, vessel in enumerate(vessels[:60]):
+        for step in range(3):
+            fleet.tracks.append(
+                vessel["id"], start + 600 * step + i, vessel["lat"] + step * 0.01, vessel["lng"]
+            )
+    fleet.publish()
+    return fleet
@@ -0,0 +1,170 @@
+from functools import reduce
+from operator import xor
+import pytest
+from app.ingest.ais import MAX_PENDING_FRAGMENTS, AISDecodeError, AISDecoder, decode_payload
+
+TYPE_1 = "!AIVDM,1,1,,B,15M67FC000G?ufbE`FepT@3n00Sa,0*5C"
+TYPE_2 = "!AIVDM,1,1,,B,25Cjtd0Oj;Jp7ilG7=UkKBoB0<06,0*60"
+TYPE_5 = (
+    "!AIVDM,2,1,1,A,55?MbV02;H;s<HtKR20EHE:0@T4@Dn2222222216L961O5Gf0NSQEp6ClRp8,0*1C",
+    "!AIVDM,2,2,1,A,88888888880,2*25",
+)
+TYPE_18 = "!AIVDM,1,1,,A,B5NJ;PP005l4ot5Isbl03wsUkP06,0*76"
+TYPE_24_A = "!AIVDM,1,1,,A,H42O55i18tMET00000000000000,2*6D"
+TYPE_24_B = "!AIVDM,1,1,,A,H42O55lti4hhhilD3nink000?050,0*40"
+
+
+def checksummed(body: str) -> str:
+    return f"!{body}*{reduce(xor, body.encode(), 0):02X}"
+
+
+def sentence(payload: str, fill: int = 0, count: int = 1, number: int = 1, seq: str = "") -> str:
+    return checksummed(f"AIVDM,{count},{number},{seq},A,{payload},{fill}")
+
+
+def test_type_1_position_report():
+    assert AISDecoder().decode(TYPE_1) == {
+        "msg_type": 1,
+        "mmsi": "366053209",
+        "nav_status": 3,
+        "sog": 0.0,
+        "lng": pytest.approx(-122.341618, abs=1e-6),
+        "lat": pytest.approx(37.802118, abs=1e-6),
+        "cog": 219.3,
+        "heading": 1,
+    }
+
+
+def test_type_2_position_report():
+    assert AISDecoder().decode(TYPE_2) == {
+        "msg_type": 2,
+        "mmsi": "356302000",
+        "nav_status": 0,
+        "sog": 13.9,
+        "lng": pytest.approx(-71.626143, abs=1e-6),
+        "lat": pytest.approx(40.392358, abs=1e-6),
+        "cog": 87.7,
+        "heading": 91,
+    }
+
+
+def test_type_3_shares_the_type_1_layout():
+    payload = TYPE_1.split(",")[5]
+    message = AISDecoder().decode(sentence("3" + payload[1:]))
+    assert message["msg_type"] == 3
+    assert message["mmsi"] == "366053209"
+    assert message["lat"] == pytest.approx(37.802118, abs=1e-6)
+
+
+def test_type_5_reassembles_fragments():
+    decoder = AISDecoder()
+    assert decoder.decode(TYPE_5[0]) is None
+    assert decoder.decode(TYPE_5[1]) == {
+        "msg_type": 5,
+        "mmsi": "351759000",
+        "imo": "9134270",
+        "callsign": "3FOF8",
+        "shipname": "EVER DIADEM",
+        "ship_type": 70,
+        "draught": 12.2,
+        "destination": "NEW YORK",
+    }
+
+
+def test_fragments_are_kept_apart_by_sequence_id():
+    decoder = AISDecoder()
+    first = sentence(TYPE_5[0].split(",")[5], 0, 2, 1, "7")
+    second = sentence(TYPE_5[1].split(",")[5], 2, 2, 2, "7")
+    assert decoder.decode(first) is None
+    assert decoder.decode(TYPE_5[0]) is None
+    assert decoder.decode(second)["mmsi"] == "351759000"
+    assert decoder.decode(TYPE_5[1])["shipname"] == "EVER DIADEM"
+
+
+def test_out_of_order_fragment_is_rejected():
+    decoder = AISDecoder()
+    with pytest.raises(AISDecodeError):
+        decoder.decode(TYPE_5[1])
+    assert decoder.decode(TYPE_5[0]) is None
+    assert decoder.decode(TYPE_5[1])["msg_type"] == 5
+
+
+def test_pending_fragments_are_bounded():
+    decoder = AISDecoder()
+    payload = TYPE_5[0].split(",")[5]
+    for seq in range(MAX_PENDING_FRAGMENTS + 10):
+        decoder.decode(sentence(payload, 0, 2, 1, str(seq)))
+    assert len(decoder._fragments) == MAX_PENDING_FRAGMENTS
+
+
+def test_type_18_class_b_position_report():
+    message = AISDecoder().decode(TYPE_18)
+    assert message == {
+        "msg_type": 18,
+        "mmsi": "367430530",
+        "sog": 0.0,
+        "lng": pytest.approx(-122.26732, abs=1e-6),
+        "lat": pytest.approx(37.785035, abs=1e-6),
+        "cog": 0.0,
+    }
+    assert "heading" not in message
+
+
+def test_type_24_static_data_parts():
+    decoder = AISDecoder()
+    assert decoder.decode(TYPE_24_A) == {
+        "msg_type": 24,
+        "mmsi": "271041815",
+        "part": 0,
+        "shipname": "PROGUY",
+    }
+    assert decoder.decode(TYPE_24_B) == {
+        "msg_type": 24,
+        "mmsi": "271041815",
+        "part": 1,
+        "ship_type": 60,
+        "callsign": "TC6163",
+    }
+
+
+def test_tag_block_time_becomes_the_timestamp():
+    message = AISDecoder().decode(f"\\s:station,c:1700000000*5A\\{TYPE_1}")
+    assert message["timestamp"] == 1700000000.0
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        TYPE_1[:-2] + "00",
+        TYPE_1.replace("15M67", "15M68"),
+        TYPE_1[:-3],
+    ],
+)
+def test_bad_checksum_is_rejected(line):
+    with pytest.raises(AISDecodeError):
+        AISDecoder().decode(line)
+
+
+def test_checksum_can_be_skipped():
+    line = TYPE_1[:-2] + "00"
+    assert AISDecoder(verify_checksum=False).decode(line)["mmsi"] == "366053209"
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47",
+        checksummed("AIVDM,1,1,,A,15M67FC000G?ufbE`FepT@3n00Sa,0,extra"),
+        checksummed("AIVDM,x,1,,A,15M67FC000G?ufbE`FepT@3n00Sa,0"),
+        sentence("15M67FC0"),
+        sentence("15M67FC000G?ufbE`FepT@3n00SX"),
+        f"\\c:abc*00\\{TYPE_1}",
+    ],
+)
+def test_malformed_sentences_are_rejected(line):
+    with pytest.raises(AISDecodeError):
+        AISDecoder().decode(line)
+
+
+def test_unsupported_types_decode_to_none():
+    assert decode_payload("E>jHC=c6:W2h22R`@1:WdP00000Opbl::kM:00003vP000") is None
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from app.fleet.bitmap import ARRAY_LIMIT, CHUNK_BITS, Bitmap
+
+CHUNK = 1 << CHUNK_BITS
+
+
+def positions(seed: int, *counts: int) -> np.ndarray:
+    """Random sorted positions, ``counts[i]`` of them in chunk ``i``."""
+    rng = np.random.default_rng(seed)
+    return np.concatenate(
+        [rng.choice(CHUNK, count, replace=False) + i * CHUNK for i, count in enumerate(counts)]
+    ).astype(np.int64)
+
+
+def container_kinds(bitmap: Bitmap) -> list[str]:
+    return [
+        "bitmap" if bitmap._containers[key].dtype == np.uint64 else "array"
+        for key in sorted(bitmap._containers)
+    ]
+
+
+def assert_holds(bitmap: Bitmap, expected: np.ndarray):
+    expected = np.unique(expected)
+    assert np.array_equal(bitmap.to_array(), expected)
+    assert len(bitmap) == len(expected)
+
+
+def test_containers_switch_kind_across_the_array_limit():
+    bitmap = Bitmap.from_positions(np.arange(0, 2 * ARRAY_LIMIT, 2))
+    assert container_kinds(bitmap) == ["array"]
+
+    bitmap.add(2 * ARRAY_LIMIT)
+    assert container_kinds(bitmap) == ["bitmap"]
+    assert 2 * ARRAY_LIMIT in bitmap
+    bitmap.add(2 * ARRAY_LIMIT)
+    assert len(bitmap) == ARRAY_LIMIT + 1
+
+    bitmap.discard(0)
+    assert container_kinds(bitmap) == ["array"]
+    assert 0 not in bitmap
+    assert_holds(bitmap, np.arange(2, 2 * ARRAY_LIMIT + 1, 2))
+
+    bitmap.discard(1)
+    assert len(bitmap) == ARRAY_LIMIT
+
+
+def test_emptied_chunks_are_dropped():
+    bitmap = Bitmap.from_positions([5, CHUNK + 5])
+    bitmap.discard(5)
+    bitmap.discard(5)
+    assert_holds(bitmap, np.array([CHUNK + 5]))
+    bitmap.discard(CHUNK + 5)
+    assert not bitmap
+    assert len(bitmap.to_array()) == 0
+
+
+@pytest.mark.parametrize(
+    "left_counts, right_counts",
+    [
+        ((100, 0, 3000), (200, 50, 2000)),
+        ((100, 6000, 5000), (9000, 80, 5000)),
+        ((8000, 7000, 0), (5000, 5000, 100)),
+    ],
+)
+def test_set_operations_match_a_brute_force_scan(left_counts, right_counts):
+    left = positions(1, *left_counts)
+    right = positions(2, *right_counts)
+    left_bitmap, right_bitmap = Bitmap.from_positions(left), Bitmap.from_positions(right)
+
+    assert_holds(left_bitmap & right_bitmap, np.intersect1d(left, right))
+    assert_holds(right_bitmap & left_bitmap, np.intersect1d(left, right))
+    assert_holds(left_bitmap | right_bitmap, np.union1d(left, right))
+    assert_holds(left_bitmap, left)
+    assert_holds(right_bitmap, right)
+
+
+def test_set_operation_results_switch_kind_across_the_array_limit():
+    dense = Bitmap.from_positions(np.arange(ARRAY_LIMIT * 2))
+    sparse = Bitmap.from_positions(np.arange(0, ARRAY_LIMIT * 4, 4))
+    assert container_kinds(sparse) == ["array"]
+    assert container_kinds(dense & dense) == ["bitmap"]
+    assert container_kinds(dense & sparse) == ["array"]
+    assert container_kinds(sparse | Bitmap.from_positions([1])) == ["bitmap"]
+    assert container_kinds(sparse | Bitmap.from_positions([4])) == ["array"]
+
+
+def test_selections_match_a_brute_force_scan(fleet):
+    store = fleet.store
+    records = store.records()
+    for record in records[:20]:
+        store.update(record["id"], {"segment": records[-1]["segment"], "type": records[0]["type"]})
+    for record in records[20:30]:
+        store.remove(record["id"])
+
+    filters = [
+        {"segment": records[-1]["segment"]},
+        {"segment": records[-1]["segment"], "type": records[0]["type"]},
+        {"sizeband": records[40]["sizeband"], "origin_port": records[40]["origin_port"]},
+        {"mmsi": records[50]["mmsi"]},
+    ]
+    remaining = store.records()
+    for wanted in filters:
+        expected = [
+            row
+            for row, record in enumerate(remaining)
+            if all(record[field] == value for field, value in wanted.items())
+        ]
+        assert store.select(wanted).tolist() == expected
@@ -0,0 +1,128 @@
+import threading
+import time
+import numpy as np
+import pytest
+from app.fleet.cache import ResultCache
+
+
+class Counted:
+    """A compute function counting its calls."""
+
+    def __init__(self, value=None):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hits_return_the_stored_result():
+    cache, compute = ResultCache(), Counted([1, 2, 3])
+    assert cache.get_or_compute("key", compute) == [1, 2, 3]
+    assert cache.get_or_compute("key", compute) is compute.value
+    assert compute.calls == 1
+    counters = cache.counters()
+    assert (counters["hits"], counters["misses"], counters["entries"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_at_the_bound():
+    cache = ResultCache(max_entries=2)
+    cache.get_or_compute("a", Counted("a"))
+    cache.get_or_compute("b", Counted("b"))
+    cache.get_or_compute("a", Counted("a"))
+    cache.get_or_compute("c", Counted("c"))
+    assert len(cache) == 2
+    assert cache.counters()["evictions"] == 1
+
+    kept, evicted = Counted("a"), Counted("b")
+    cache.get_or_compute("a", kept)
+    cache.get_or_compute("b", evicted)
+    assert (kept.calls, evicted.calls) == (0, 1)
+
+
+def test_entries_are_evicted_past_the_byte_bound():
+    cache = ResultCache(max_bytes=2000)
+    for key in range(3):
+        cache.get_or_compute(key, Counted(np.zeros(100)))
+    assert len(cache) == 2
+    assert cache.counters()["bytes"] == 1600
+
+    too_big = Counted(np.zeros(1000))
+    cache.get_or_compute("big", too_big)
+    cache.get_or_compute("big", too_big)
+    assert too_big.calls == 2
+    assert len(cache) == 2
+
+
+def test_arrays_are_stored_read_only():
+    array = ResultCache().get_or_compute("key", Counted(np.arange(3)))
+    with pytest.raises(ValueError, match="read-only"):
+        array[0] = 1
+
+
+def test_concurrent_misses_compute_once():
+    cache, release = ResultCache(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(threading.get_ident())
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.counters()["waits"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    counters = cache.counters()
+    assert (counters["misses"], counters["waits"], counters["hits"]) == (1, 3, 0)
+
+
+def test_failed_compute_is_not_stored():
+    cache = ResultCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", Counted(1)) == 1
+
+
+def test_invalidate_drops_entries_and_results_in_flight():
+    cache = ResultCache()
+    cache.get_or_compute("a", Counted("a"))
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.counters()["invalidations"] == 1
+
+    def compute():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_compute("b", compute) == "stale"
+    assert len(cache) == 0
+
+
+def test_shared_results_are_recomputed_once_the_version_advances(fleet):
+    compute = Counted("result")
+    fleet.cached("name", ("filter",), compute)
+    fleet.cached("name", ("filter",), compute)
+    assert compute.calls == 1
+
+    fleet.publish()
+    fleet.cached("name", ("filter",), compute)
+    assert compute.calls == 2
+    assert len(fleet.results) == 1
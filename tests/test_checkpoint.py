@@ -0,0 +1,119 @@
+import asyncio
+import json
+import numpy as np
+from app.fleet.checkpoint import KEEP_CHECKPOINTS, MANIFEST, CheckpointWriter, load_checkpoint
+from app.fleet.shared import SharedFleet
+from tests.test_snapshot import assert_same_fleet
+
+WATERMARKS = {"sync": {"vessels": ["2024-01-01T00:00:00", "vessel_1"], "events": 12}}
+
+
+def checkpoint(fleet: SharedFleet, directory) -> None:
+    writer = CheckpointWriter(directory)
+    writer.write(*writer.capture(fleet, WATERMARKS))
+
+
+def apply_changes(fleet: SharedFleet):
+    """The same writes a warm-started fleet receives from sync and ingest."""
+    store, events, tracks = fleet.store, fleet.events, fleet.tracks
+    records = store.records()
+    store.append([{**records[0], "id": "vessel_new", "mmsi": "999000001", "name": "New Arrival"}])
+    store.update(records[1]["id"], {"lat": 10.5, "lng": -20.25, "status": "At Port"})
+    store.update(records[2]["id"], {"destination_port": "Port of Nowhere"})
+    store.update_batch(
+        "mmsi",
+        [records[3]["mmsi"], records[4]["mmsi"], "unknown"],
+        {"lat": [1.0, 2.0, 3.0], "lng": [4.0, 5.0, 6.0], "status": ["At Anchor", None, None]},
+    )
+    store.remove(records[5]["id"])
+
+    def event(n: int, vessel_id: str, timestamp: str) -> dict:
+        return {
+            "id": f"event_new_{n}",
+            "vessel_id": vessel_id,
+            "timestamp": timestamp,
+            "event_type": "Arrival",
+            "location": "Port of Nowhere",
+            "vessel_name": "",
+        }
+
+    events.append(event(0, records[1]["id"], "2030-01-01T00:00:00Z"))
+    events.extend(
+        [
+            event(1, records[2]["id"], "2030-01-02T00:00:00Z"),
+            event(2, "vessel_new", "2000-01-01T00:00:00Z"),
+        ]
+    )
+    tracks.append(records[1]["id"], 2e9, 10.5, -20.25)
+    tracks.append("vessel_new", 2e9, 0.0, 0.0)
+    fleet.publish()
+
+
+def test_checkpoint_reload_matches_the_fleet(fleet, tmp_path):
+    asyncio.run(fleet.wait_timeline())
+    checkpoint(fleet, tmp_path)
+    loaded = load_checkpoint(tmp_path)
+
+    assert loaded.version == fleet.version
+    assert loaded.watermarks == WATERMARKS
+    assert_same_fleet(
+        loaded.store, loaded.events, loaded.tracks, fleet.store, fleet.events, fleet.tracks
+    )
+    meta, arrays = loaded.timeline.to_arrays()
+    expected_meta, expected_arrays = fleet.current_timeline().to_arrays()
+    assert meta == expected_meta
+    for name, array in expected_arrays.items():
+        assert np.array_equal(arrays[name], array)
+
+
+def test_checkpoint_leaves_out_a_timeline_of_older_data(fleet, tmp_path):
+    asyncio.run(fleet.wait_timeline())
+    apply_changes(fleet)
+    checkpoint(fleet, tmp_path)
+    assert load_checkpoint(tmp_path).timeline is None
+
+
+def test_warm_fleet_takes_writes_and_checkpoints_again(fleet, tmp_path):
+    checkpoint(fleet, tmp_path)
+    loaded = load_checkpoint(tmp_path)
+    warm = SharedFleet(loaded.store, loaded.events)
+    warm.publish(tracks=loaded.tracks, version=loaded.version)
+
+    apply_changes(fleet)
+    apply_changes(warm)
+    assert_same_fleet(warm.store, warm.events, warm.tracks, fleet.store, fleet.events, fleet.tracks)
+
+    checkpoint(warm, tmp_path)
+    reloaded = load_checkpoint(tmp_path)
+    assert reloaded.file != loaded.file
+    assert_same_fleet(
+        reloaded.store, reloaded.events, reloaded.tracks, fleet.store, fleet.events, fleet.tracks
+    )
+    assert len(reloaded.store) == len(fleet.store)
+    assert reloaded.events.recent(limit=1)[0][0]["id"] == "event_new_1"
+
+
+def test_old_checkpoints_are_pruned(fleet, tmp_path):
+    for _ in range(KEEP_CHECKPOINTS + 2):
+        checkpoint(fleet, tmp_path)
+    manifest = json.loads((tmp_path / MANIFEST).read_text())
+    kept = [entry["file"] for entry in manifest["checkpoints"]]
+    assert len(kept) == KEEP_CHECKPOINTS
+    assert sorted(path.name for path in tmp_path.glob("checkpoint-*.fleet")) == kept
+
+
+def test_unreadable_checkpoint_falls_back_to_an_older_one(fleet, tmp_path):
+    checkpoint(fleet, tmp_path)
+    older = load_checkpoint(tmp_path).file
+    apply_changes(fleet)
+    checkpoint(fleet, tmp_path)
+    newest = load_checkpoint(tmp_path).file
+    (tmp_path / newest).write_bytes(b"truncated")
+
+    loaded = load_checkpoint(tmp_path)
+    assert loaded.file == older
+    assert "vessel_new" not in {record["id"] for record in loaded.store.records()}
+
+
+def test_no_checkpoint_yet(tmp_path):
+    assert load_checkpoint(tmp_path) is None
@@ -0,0 +1,80 @@
+from itertools import combinations
+import numpy as np
+from app.fleet.cube import AggregateCube
+from app.fleet.store import CUBE_FIELDS, METRIC_FIELDS
+
+
+def brute_force(records: list[dict], filters: dict[str, str]) -> dict[str, int]:
+    matching = [
+        record
+        for record in records
+        if all(record[field] == value for field, value in filters.items())
+    ]
+    return {
+        "count": len(matching),
+        **{field: sum(record[field] for record in matching) for field in METRIC_FIELDS},
+    }
+
+
+def every_filter(record: dict) -> list[dict[str, str]]:
+    """Filters on every subset of the cube's fields, with the record's values."""
+    return [
+        {field: record[field] for field in fields}
+        for size in range(len(CUBE_FIELDS) + 1)
+        for fields in combinations(CUBE_FIELDS, size)
+    ]
+
+
+def test_rows_added_one_at_a_time_or_in_bulk_agree():
+    rng = np.random.default_rng(3)
+    codes = rng.integers(0, 4, size=(200, 3))
+    values = rng.integers(0, 100, size=(200, 2))
+    bulk, single = AggregateCube("abc", "xy"), AggregateCube("abc", "xy")
+    bulk.add(codes, values)
+    for row_codes, row_values in zip(codes.tolist(), values.tolist()):
+        single.add_row(row_codes, row_values)
+    assert bulk._cells == single._cells
+
+    query = {"a": 1, "c": 2}
+    rows = (codes[:, 0] == 1) & (codes[:, 2] == 2)
+    assert bulk.query(query) == [int(rows.sum()), *values[rows].sum(axis=0).tolist()]
+
+
+def test_removed_rows_leave_no_empty_cells():
+    cube = AggregateCube("ab", "x")
+    codes, values = np.array([[0, 1], [0, 2], [1, 2]]), np.array([[5], [7], [9]])
+    cube.add(codes, values)
+    cube.add(codes[:2], values[:2], sign=-1)
+    assert cube.query({"a": 0}) == [0, 0]
+    assert cube.query({}) == [1, 9]
+    cube.add_row([1, 2], [9], sign=-1)
+    assert len(cube) == 0
+
+
+def test_aggregates_follow_updates_and_removals(fleet):
+    store = fleet.store
+    records = store.records()
+    for i, record in enumerate(records[:30]):
+        donor = records[-1 - i]
+        store.update(
+            record["id"],
+            {
+                "segment": donor["segment"],
+                "origin_port": donor["origin_port"],
+                "voyage_duration_days": record["voyage_duration_days"] + 5,
+                "fuel_consumption_mt": 0,
+            },
+        )
+    store.update_batch(
+        "id",
+        [record["id"] for record in records[30:40]],
+        {"type": [records[0]["type"]] * 10, "distance_travelled_nm": list(range(10))},
+    )
+    for record in records[40:50]:
+        store.remove(record["id"])
+    store.append([{**records[45], "id": "vessel_new", "mmsi": "999000001"}])
+
+    remaining = store.records()
+    for record in (records[0], records[35], records[-1], remaining[-1]):
+        for filters in every_filter(record):
+            assert store.aggregate(filters) == brute_force(remaining, filters), filters
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from app.fleet.events import EventLog
+from app.fleet.snapshot import (
+    KEEP_GENERATIONS,
+    FleetEncoder,
+    SnapshotReader,
+    SnapshotWriter,
+    build_fleet,
+    read_segment,
+    write_segment,
+)
+from app.fleet.store import FILTER_FIELDS, FleetStore
+from app.fleet.tracks import TrackStore
+
+
+def assert_same_fleet(
+    store: FleetStore,
+    events: EventLog,
+    tracks: TrackStore,
+    expected_store: FleetStore,
+    expected_events: EventLog,
+    expected_tracks: TrackStore,
+):
+    assert store.records() == expected_store.records()
+    for field in FILTER_FIELDS:
+        assert store.facets.counts(field) == expected_store.facets.counts(field)
+    vessel = expected_store.records()[0]
+    filters = {"segment": vessel["segment"], "type": vessel["type"]}
+    assert np.array_equal(store.select(filters), expected_store.select(filters))
+    assert store.cross_counts("origin_port", filters) == expected_store.cross_counts(
+        "origin_port", filters
+    )
+    assert store.aggregate(filters) == expected_store.aggregate(filters)
+
+    assert len(events) == len(expected_events)
+    assert list(events.timed()) == list(expected_events.timed())
+    assert events.recent(limit=20) == expected_events.recent(limit=20)
+    assert events.recent({vessel["id"]}, 5) == expected_events.recent({vessel["id"]}, 5)
+
+    actual = dict(tracks.items())
+    wanted = dict(expected_tracks.items())
+    assert actual.keys() == wanted.keys()
+    for vessel_id, points in wanted.items():
+        assert np.array_equal(actual[vessel_id], points)
+
+
+def test_segment_round_trip(fleet, tmp_path):
+    header, arrays = FleetEncoder().encode(fleet.store, fleet.events, fleet.tracks)
+    write_segment(tmp_path / "fleet.snap", header, arrays)
+    read_header, read_arrays = read_segment(tmp_path / "fleet.snap")
+
+    assert read_header["versions"] == header["versions"]
+    assert read_arrays.keys() == arrays.keys()
+    for name, array in arrays.items():
+        assert read_arrays[name].dtype == array.dtype
+        assert np.array_equal(read_arrays[name], array)
+    assert_same_fleet(
+        *build_fleet(read_header, read_arrays), fleet.store, fleet.events, fleet.tracks
+    )
+
+
+def test_read_only_segment_rejects_writes(fleet, tmp_path):
+    header, arrays = FleetEncoder().encode(fleet.store, fleet.events, fleet.tracks)
+    write_segment(tmp_path / "fleet.snap", header, arrays)
+    store, _, _ = build_fleet(*read_segment(tmp_path / "fleet.snap"))
+    with pytest.raises(ValueError, match="read-only"):
+        store.update(store.records()[0]["id"], {"lat": 1.0})
+
+
+def test_unknown_segment_format_is_refused(fleet, tmp_path):
+    path = tmp_path / "fleet.snap"
+    path.write_bytes(b"not a fleet segment" * 4)
+    with pytest.raises(ValueError, match="Unsupported"):
+        read_segment(path)
+
+
+def test_writer_publishes_generations_to_readers(fleet, tmp_path):
+    writer = SnapshotWriter(tmp_path)
+    reader = SnapshotReader(tmp_path)
+    assert reader.current() is None
+
+    generation = writer.write(*writer.capture(fleet))
+    assert reader.current()[:2] == (generation, fleet.version)
+    first = reader.load(generation)
+    assert_same_fleet(
+        first.store, first.events, first.tracks, fleet.store, fleet.events, fleet.tracks
+    )
+
+    vessel = fleet.store.records()[0]
+    fleet.store.update(vessel["id"], {"lat": 1.5, "lng": 2.5, "status": "At Anchor"})
+    fleet.events.append(
+        {
+            "id": "event_new",
+            "vessel_id": vessel["id"],
+            "timestamp": "2030-01-01T00:00:00Z",
+            "event_type": "At Anchor",
+            "location": "Anchorage",
+            "vessel_name": vessel["name"],
+        }
+    )
+    fleet.tracks.append(vessel["id"], 2e9, 1.5, 2.5)
+    fleet.tracks.append("vessel_new", 2e9, 0.5, 0.5)
+    fleet.publish()
+    generation = writer.write(*writer.capture(fleet))
+    assert reader.current()[:2] == (generation, fleet.version)
+    second = reader.load(generation, first)
+    assert_same_fleet(
+        second.store, second.events, second.tracks, fleet.store, fleet.events, fleet.tracks
+    )
+    assert second.events.recent(limit=1)[0][0]["id"] == "event_new"
+
+    for _ in range(KEEP_GENERATIONS + 1):
+        generation = writer.write(*writer.capture(fleet))
+    assert len(list(tmp_path.glob("fleet-*.snap"))) == KEEP_GENERATIONS
+    writer.close()
+    assert SnapshotReader(tmp_path).current()[0] == generation
@@ -0,0 +1,142 @@
+import asyncio
+import numpy as np
+import pytest
+from app.fleet.dictionary import Dictionary
+from app.fleet.timeline import ARRAY_FIELDS, Timeline, TimelineSource
+from app.fleet.tracks import TrackStore
+
+
+def ids(*vessel_ids: str) -> Dictionary:
+    dictionary = Dictionary()
+    for vessel_id in vessel_ids:
+        dictionary.encode(vessel_id)
+    return dictionary
+
+
+def event(vessel_id: str, event_type: str) -> dict:
+    return {"vessel_id": vessel_id, "event_type": event_type}
+
+
+@pytest.fixture
+def timeline() -> Timeline:
+    """Two vessels with two fixes and two events each, "b" after "a"."""
+    tracks = TrackStore(retention_s=1e9)
+    tracks.append("a", 10.0, 0.0, 0.0)
+    tracks.append("a", 20.0, 10.0, 20.0)
+    tracks.append("b", 30.0, -50.0, -50.0)
+    tracks.append("b", 40.0, -60.0, -60.0)
+    events = [
+        (10, event("a", "Departure")),
+        (15, event("a", "Arrival")),
+        (30, event("b", "Departure")),
+        (35, event("b", "At Anchor")),
+    ]
+    return Timeline(ids("a", "b"), tracks, events)
+
+
+def test_positions_interpolate_between_fixes(timeline):
+    lat, lng, seen = timeline.positions(15.0, np.array([0]))
+    assert seen.tolist() == [True]
+    assert lat.tolist() == [5.0]
+    assert lng.tolist() == [10.0]
+
+
+def test_positions_at_a_fix_are_the_fix(timeline):
+    lat, lng, seen = timeline.positions(10.0, np.array([0]))
+    assert (lat.tolist(), lng.tolist(), seen.tolist()) == ([0.0], [0.0], [True])
+    lat, lng, seen = timeline.positions(30.0, np.array([1]))
+    assert (lat.tolist(), lng.tolist(), seen.tolist()) == ([-50.0], [-50.0], [True])
+
+
+def test_positions_before_a_vessels_first_fix_are_unseen(timeline):
+    _, _, seen = timeline.positions(25.0, np.array([0, 1]))
+    assert seen.tolist() == [True, False]
+
+
+def test_positions_of_unknown_vessels_are_unseen(timeline):
+    _, _, seen = timeline.positions(15.0, np.array([2]))
+    assert seen.tolist() == [False]
+    assert timeline.tracked(np.array([0, 1, 2])).tolist() == [True, True, False]
+
+
+def test_positions_cross_the_antimeridian_the_short_way():
+    tracks = TrackStore(retention_s=1e9)
+    tracks.append("a", 0.0, 0.0, 170.0)
+    tracks.append("a", 10.0, 0.0, -170.0)
+    timeline = Timeline(ids("a"), tracks, [])
+    assert timeline.positions(2.5, np.array([0]))[1].tolist() == [175.0]
+    assert timeline.positions(7.5, np.array([0]))[1].tolist() == [-175.0]
+
+
+def test_status_is_the_latest_events(timeline):
+    statuses, seen = timeline.status(12.0, np.array([0, 1]))
+    assert seen.tolist() == [True, False]
+    assert timeline.statuses[statuses[0]] == "In Transit"
+    statuses, seen = timeline.status(35.0, np.array([0, 1]))
+    assert seen.tolist() == [True, True]
+    assert [timeline.statuses[i] for i in statuses] == ["At Port", "At Anchor"]
+
+
+def test_positions_past_the_end_hold_each_vessel_at_its_last_fix(timeline):
+    lat, lng, seen = timeline.positions(150.0, np.array([0, 1]))
+    assert seen.tolist() == [True, True]
+    assert lat.tolist() == [10.0, -60.0]
+    assert lng.tolist() == [20.0, -60.0]
+
+
+def test_positions_before_the_start_are_unseen(timeline):
+    _, _, seen = timeline.positions(-150.0, np.array([0, 1]))
+    assert seen.tolist() == [False, False]
+
+
+def test_status_past_the_end_is_each_vessels_latest(timeline):
+    statuses, seen = timeline.status(150.0, np.array([0, 1]))
+    assert seen.tolist() == [True, True]
+    assert [timeline.statuses[i] for i in statuses] == ["At Port", "At Anchor"]
+
+
+def test_status_before_the_start_is_unknown(timeline):
+    _, seen = timeline.status(-150.0, np.array([0, 1]))
+    assert seen.tolist() == [False, False]
+
+
+def assert_same_timeline(timeline: Timeline, expected: Timeline):
+    meta, arrays = timeline.to_arrays()
+    expected_meta, expected_arrays = expected.to_arrays()
+    assert meta == expected_meta
+    for name in ARRAY_FIELDS:
+        assert np.array_equal(arrays[name], expected_arrays[name]), name
+
+
+def test_arrays_round_trip(timeline):
+    restored = Timeline.from_arrays(*timeline.to_arrays())
+    assert_same_timeline(restored, timeline)
+    codes = np.array([0, 1])
+    for t in (5.0, 15.0, 35.0, 150.0):
+        for actual, expected in zip(restored.positions(t, codes), timeline.positions(t, codes)):
+            assert np.array_equal(actual, expected)
+        for actual, expected in zip(restored.status(t, codes), timeline.status(t, codes)):
+            assert np.array_equal(actual, expected)
+
+
+def test_source_builds_again_from_what_changed(fleet):
+    ids = fleet.store.dictionaries["id"]
+    source = TimelineSource()
+    source.take(ids, fleet.tracks, fleet.events)
+    assert_same_timeline(source.build(), Timeline(ids, fleet.tracks, fleet.events.timed()))
+
+    vessel_ids = fleet.store.values("id", np.arange(3))
+    fleet.tracks.append(vessel_ids[0], 2e9, 1.0, 2.0)
+    fleet.tracks.append(vessel_ids[1], 2e9, 3.0, 4.0)
+    fleet.events.append(
+        {**event(vessel_ids[2], "At Anchor"), "timestamp": "2000-01-01T00:00:00Z"}
+    )
+    source.take(ids, fleet.tracks, fleet.events)
+    assert_same_timeline(source.build(), Timeline(ids, fleet.tracks, fleet.events.timed()))
+
+
+def test_shared_fleet_builds_its_timeline_on_request(fleet):
+    assert fleet.current_timeline() is None
+    timeline = asyncio.run(fleet.wait_timeline())
+    assert fleet.current_timeline() is timeline
+    assert fleet.time_range() == (timeline.start, timeline.end)